@@ -0,0 +1,127 @@
+"""
+Benchmark: one document per reading vs the bucketed layout
+(`[Buckets]`, common/buckets.py) for the raw sensor collection.
+
+Compares BSON bytes stored per reading and the time to turn stored
+documents into the pipeline's DataFrame (per-reading dicts vs bucket
+column arrays). Documents are built and encoded in memory, no MongoDB
+needed.
+
+    python benchmarks/bench_buckets.py
+    python benchmarks/bench_buckets.py --rows 100000 --sectors 5 --interval 10
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import bson
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from common import buckets
+
+SETORES = ["Setor Central", "Setor Bueno", "Setor Jaó", "Jardim Goiás", "Setor Norte Ferroviário"]
+
+
+def make_readings(n_rows, n_sectors, interval_s):
+    rng = np.random.default_rng(0)
+    start = datetime(2026, 1, 1)
+    temp, hum = rng.normal(30, 4, n_rows).tolist(), rng.uniform(15, 90, n_rows).tolist()
+    gases, pm = rng.uniform(50, 1000, n_rows).tolist(), rng.uniform(0, 90, n_rows).tolist()
+    return [
+        {
+            "timestamp": start + timedelta(seconds=(i // n_sectors) * interval_s),
+            "localizacao": SETORES[i % n_sectors],
+            "temperatura": temp[i],
+            "humidade": hum[i],
+            "gases_ppm": gases[i],
+            "pm25": pm[i],
+            "latitude": -16.68 + (i % n_sectors) * 0.01,
+            "longitude": -49.26 + (i % n_sectors) * 0.01,
+            "origem_dado": "AI_RandomForest_V4",
+        }
+        for i in range(n_rows)
+    ]
+
+
+class MemoryBuckets:
+    """Collection stand-in applying BucketWriter's $push upserts to dicts."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def update_one(self, flt, update, upsert=False):
+        key = (flt["localizacao"], flt["inicio"])
+        docs = self.docs.setdefault(key, [])
+        if not docs or docs[-1]["n"] >= flt["n"]["$lt"]:
+            docs.append({"_id": bson.ObjectId(), "localizacao": key[0], "inicio": key[1], "n": 0,
+                         "t": [], "v": {}, "outros": [], **update["$setOnInsert"]})
+        doc = docs[-1]
+        for path, spec in update["$push"].items():
+            target = doc["v"].setdefault(path[2:], []) if path.startswith("v.") else doc[path]
+            target.extend(spec["$each"])
+        doc["n"] += update["$inc"]["n"]
+        doc["primeiro"] = min(doc.get("primeiro", update["$min"]["primeiro"]), update["$min"]["primeiro"])
+        doc["ultimo"] = max(doc.get("ultimo", update["$max"]["ultimo"]), update["$max"]["ultimo"])
+
+    def all(self):
+        return [doc for docs in self.docs.values() for doc in docs]
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--sectors", type=int, default=5)
+    parser.add_argument("--interval", type=int, default=5, help="seconds between readings of a sector")
+    parser.add_argument("--batch", type=int, default=5, help="readings per append (simulator: one per sector)")
+    args = parser.parse_args()
+
+    readings = make_readings(args.rows, args.sectors, args.interval)
+    for doc in readings:
+        doc["_id"] = bson.ObjectId()
+
+    store = MemoryBuckets()
+    writer = buckets.BucketWriter("raw", coll=store)
+    plain = [{k: v for k, v in doc.items() if k != "_id"} for doc in readings]
+    for i in range(0, len(plain), args.batch):
+        writer.append(plain[i:i + args.batch])
+    bucket_docs = store.all()
+
+    encoded_docs = [bson.encode(doc) for doc in readings]
+    encoded_buckets = [bson.encode(doc) for doc in bucket_docs]
+    doc_bytes = sum(len(b) for b in encoded_docs)
+    bucket_bytes = sum(len(b) for b in encoded_buckets)
+
+    t_docs, df_docs = timed(lambda: pd.DataFrame([bson.decode(b) for b in encoded_docs]).drop(columns="_id"))
+    t_buckets, df_buckets = timed(lambda: buckets.unpack([bson.decode(b) for b in encoded_buckets], "raw"))
+    assert len(df_docs) == len(df_buckets) == args.rows
+
+    print(f"{args.rows:,} readings, {args.sectors} sectors, {len(bucket_docs):,} buckets "
+          f"({buckets.BUCKET_CONFIG['BUCKET_MINUTES']} min, max {buckets.BUCKET_CONFIG['MAX_READINGS']})")
+    print(f"{'layout':<20} | {'documents':>10} | {'BSON total':>11} | {'bytes/reading':>13} | {'decode -> DataFrame':>19}")
+    print("-" * 86)
+    for label, n_docs, size, seconds in [
+        ("one per reading", len(encoded_docs), doc_bytes, t_docs),
+        ("buckets", len(encoded_buckets), bucket_bytes, t_buckets),
+    ]:
+        print(f"{label:<20} | {n_docs:>10,} | {size / 2**20:>8.1f} MB | {size / args.rows:>13.1f} | {seconds:>18.3f}s")
+    print(f"\nStorage: {doc_bytes / bucket_bytes:.1f}x smaller, decode: {t_docs / t_buckets:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
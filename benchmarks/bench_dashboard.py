@@ -0,0 +1,157 @@
+"""
+Benchmark: dashboard render cost per section and per interaction.
+
+Builds every section with the pure builders in src/dashboard/figures.py
+(plus the JSON / Arrow serialization Streamlit sends to the browser) on
+synthetic analytics rows, then sums, for common interactions, what a
+top-to-bottom rerun rebuilds (data load included) vs what the memoized
+sections of app.py rebuild. No MongoDB or Streamlit server needed.
+
+    python benchmarks/bench_dashboard.py
+    python benchmarks/bench_dashboard.py --rows 15000 100000 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "dashboard"))
+import figures  # noqa: E402
+
+SETORES = list(figures.RAIOS_SETORES)
+
+
+def make_analytics(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    end = datetime.now().replace(microsecond=0)
+    carga = rng.gamma(4, 15, n_rows)
+    anomalia = rng.random(n_rows) < 0.03
+    idade = np.sort(rng.integers(0, 7 * 86400, n_rows))[::-1]  # seconds before `end`, oldest first
+    return pd.DataFrame(
+        {
+            "timestamp": pd.Timestamp(end) - pd.to_timedelta(idade, unit="s"),
+            "localizacao": rng.choice(SETORES, n_rows),
+            "temperatura": rng.normal(28, 4, n_rows),
+            "humidade": rng.uniform(15, 90, n_rows),
+            "pm25": rng.uniform(0, 90, n_rows),
+            "gases_ppm": rng.uniform(50, 1000, n_rows),
+            "latitude": -16.68 + rng.normal(0, 0.01, n_rows),
+            "longitude": -49.26 + rng.normal(0, 0.01, n_rows),
+            "carga_poluente": carga,
+            "carga_estimada": carga + rng.normal(0, 5, n_rows),
+            "anomalia_detectada": anomalia,
+            "tipo_anomalia": np.where(anomalia, "Poeira Alta", "Normal"),
+        }
+    )
+
+
+def make_forecast():
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    return pd.DataFrame(
+        [
+            {"localizacao": s, "timestamp_previsto": start + timedelta(hours=h), "carga_poluente": 50.0 + h}
+            for s in SETORES
+            for h in range(1, 25)
+        ]
+    )
+
+
+def make_cells(n_cells=400, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "lat_centro": -16.68 + rng.normal(0, 0.02, n_cells),
+            "lon_centro": -49.26 + rng.normal(0, 0.02, n_cells),
+            "carga_poluente_media": rng.uniform(10, 120, n_cells),
+            "setores": [[SETORES[i % len(SETORES)]] for i in range(n_cells)],
+        }
+    )
+
+
+def section_builders(df_raw, inicio, fim, filtro_local, df_forecast, df_cells):
+    """Section name -> zero-argument callable doing its build + serialization, as app.py renders it."""
+    df_view = figures.filtrar_leituras(df_raw, inicio, fim, filtro_local)
+
+    def mapa():
+        df_mapa, _ = figures.dados_mapa(df_view, pd.DataFrame(), filtro_local)
+        return figures.deck_mapa(df_mapa, df_cells, filtro_local).to_json()
+
+    def barras():
+        return [
+            figures.figura_barras(df_view, "pm25", "PM2.5", "µg/m³", "Blues").to_json(),
+            figures.figura_barras(df_view, "gases_ppm", "Gases", "PPM", "Oranges").to_json(),
+        ]
+
+    records = df_raw.to_dict("records")
+
+    def carga():
+        # Cursor documents -> DataFrame, as get_data did on every rerun (network time excluded)
+        df = pd.DataFrame(records)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        return df.sort_values("timestamp")
+
+    return {
+        "carga dos dados": carga,
+        "disponibilidade": lambda: figures.figura_disponibilidade(df_raw).to_json(),
+        "filtro": lambda: figures.filtrar_leituras(df_raw, inicio, fim, filtro_local),
+        "mapa + KPIs": mapa,
+        "evolução": lambda: figures.figura_evolucao(df_view, df_forecast, filtro_local).to_json(),
+        "barras": barras,
+        "alertas": lambda: pa.Table.from_pandas(figures.tabela_alertas(df_view)),
+    }
+
+
+# Sections a full top-to-bottom rerun rebuilds vs the memoized layout, per interaction
+INTERACTIONS = {
+    "hour slider": ["filtro", "mapa + KPIs", "evolução", "barras"],
+    "sector filter": ["filtro", "mapa + KPIs", "evolução", "barras"],
+    "back to a seen filter": [],
+    "switch details view": ["alertas"],
+}
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[15000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df_forecast, df_cells = make_forecast(), make_cells()
+    for rows in args.rows:
+        df_raw = make_analytics(rows)
+        fim = df_raw["timestamp"].max()
+        inicio = fim.normalize() - timedelta(days=1)
+        builders = section_builders(df_raw, inicio, fim, SETORES[0], df_forecast, df_cells)
+        costs = {name: timed(fn, args.repeat) for name, fn in builders.items()}
+
+        print(f"\n{rows:,} analytics rows")
+        print(f"{'section':<18} | {'build + serialize':>17}")
+        print("-" * 38)
+        for name, seconds in costs.items():
+            print(f"{name:<18} | {seconds * 1000:>14.1f} ms")
+
+        # Top-to-bottom script: data load and every section on every interaction
+        full = sum(costs.values())
+        print(f"\n{'interaction':<22} | {'full rerun':>11} | {'memoized':>9}")
+        print("-" * 50)
+        for interaction, rebuilt in INTERACTIONS.items():
+            memo = sum(costs[name] for name in rebuilt)
+            print(f"{interaction:<22} | {full * 1000:>8.1f} ms | {memo * 1000:>6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
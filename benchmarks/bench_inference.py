@@ -0,0 +1,94 @@
+"""
+Benchmark: single-call `model.predict` vs chunked parallel predict.
+
+Uses the same RandomForestRegressor settings and features as
+`AirQualityPipeline.detect_anomalies`.
+
+    python benchmarks/bench_inference.py
+    python benchmarks/bench_inference.py --rows 100000 1000000 --chunk-size 50000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "analytics"))
+from inference import predict_chunked  # noqa: E402
+
+FEATURES = ["temperatura", "humidade", "hora_do_dia", "dia_da_semana"]
+
+
+def make_features(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "temperatura": rng.normal(30, 4, n_rows),
+            "humidade": rng.uniform(15, 90, n_rows),
+            "hora_do_dia": rng.integers(0, 24, n_rows),
+            "dia_da_semana": rng.integers(0, 7, n_rows),
+        }
+    )
+
+
+def train_model(n_train=10000):
+    X = make_features(n_train, seed=42)
+    y = (
+        40
+        + 30 * np.exp(-((X["hora_do_dia"] - 18) ** 2) / 5)
+        + X["temperatura"] * 0.8
+        - X["humidade"] * 0.1
+        + np.random.default_rng(1).normal(0, 3, n_train)
+    )
+    model = RandomForestRegressor(n_estimators=50, max_depth=10, random_state=42, n_jobs=-1)
+    model.fit(X, y)
+    return model
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = train_model()
+    print(f"CPUs: {os.cpu_count()} | chunk_size={args.chunk_size} | best of {args.repeat}\n")
+    print(f"{'rows':>10} | {'mode':<22} | {'seconds':>8} | {'rows/s':>12} | {'speedup':>7}")
+    print("-" * 72)
+
+    for n_rows in args.rows:
+        X = make_features(n_rows)
+
+        t_single, baseline = timed(lambda: model.predict(X), args.repeat)
+        print(f"{n_rows:>10} | {'predict (n_jobs=-1)':<22} | {t_single:>8.3f} | {n_rows / t_single:>12,.0f} | {1.0:>6.2f}x")
+
+        for backend in ("thread", "process"):
+            t_chunk, result = timed(
+                lambda: predict_chunked(
+                    model, X, chunk_size=args.chunk_size, n_workers=args.workers, backend=backend
+                ),
+                args.repeat,
+            )
+            assert np.allclose(result, baseline), f"{backend} predictions differ from baseline"
+            label = f"chunked ({backend})"
+            print(f"{n_rows:>10} | {label:<22} | {t_chunk:>8.3f} | {n_rows / t_chunk:>12,.0f} | {t_single / t_chunk:>6.2f}x")
+        print("-" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: peak memory of one pipeline cycle, whole batch in memory vs
+chunked streaming (`[App] processing_chunk_size`).
+
+Raw readings are generated lazily by a stand-in cursor and analytics
+writes are discarded, so the numbers cover only the pipeline's own
+DataFrames. Each case runs in a fresh process; the model is trained
+before tracing starts. Needs a config.ini at the repository root.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --rows 10000 100000 500000 --chunk-size 20000
+"""
+import os
+import sys
+import time
+import resource
+import argparse
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "analytics"))
+
+SETORES = ["Setor Central", "Setor Bueno", "Setor Jaó", "Jardim Goiás", "Setor Norte Ferroviário"]
+
+
+class SyntheticCursor:
+    """Raw cursor stand-in: yields readings newest first without holding them."""
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self._limit = 0
+        self._docs = None
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._docs is None:
+            self._docs = self._generate()
+        return next(self._docs)
+
+    def _generate(self):
+        rng = np.random.default_rng(0)
+        n = min(self.n_rows, self._limit or self.n_rows)
+        now = datetime.now()
+        for start in range(0, n, 1000):
+            k = min(1000, n - start)
+            temp = rng.normal(30, 4, k).tolist()
+            hum = rng.uniform(15, 90, k).tolist()
+            gases = rng.uniform(50, 1000, k).tolist()
+            pm = rng.uniform(0, 90, k).tolist()
+            for i in range(k):
+                yield {
+                    "timestamp": now - timedelta(seconds=start + i),
+                    "localizacao": SETORES[i % len(SETORES)],
+                    "temperatura": temp[i],
+                    "humidade": hum[i],
+                    "gases_ppm": gases[i],
+                    "pm25": pm[i],
+                    "latitude": -16.68 + i % 7 * 0.01,
+                    "longitude": -49.26 + i % 5 * 0.01,
+                    "origem_dado": "AI_RandomForest_V4",
+                }
+
+
+class SyntheticRaw:
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+
+    def find(self, *args, **kwargs):
+        return SyntheticCursor(self.n_rows)
+
+
+class NullCollection:
+    def __init__(self):
+        self.inserted = 0
+
+    def insert_many(self, records, **kwargs):
+        self.inserted += len(records)
+
+    def delete_many(self, *args, **kwargs):
+        pass
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+
+def run_case(rows, chunk_size):
+    import pipeline
+    from pipeline import AirQualityPipeline, CONFIG
+
+    CONFIG["MAX_BATCH_ROWS"] = rows
+    CONFIG["PROCESSING_CHUNK_SIZE"] = chunk_size
+    db = defaultdict(NullCollection)
+    db[CONFIG["MONGO_COLLECTION_RAW"]] = SyntheticRaw(rows)
+
+    p = AirQualityPipeline(db=db)
+    p.forecaster = None
+    p.alerts = None
+    pipeline.logger.disabled = True
+
+    # Train outside the measurement
+    sample = AirQualityPipeline.clean_raw(pd.DataFrame(list(SyntheticCursor(5000))))
+    p.detect_anomalies(p.process_and_classify(sample))
+    p.retrain_enabled = False
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    tracemalloc.start()
+    started = time.perf_counter()
+    p.run_cycle()
+    elapsed = time.perf_counter() - started
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return {
+        "traced_peak_mb": traced_peak / 2**20,
+        "rss_growth_mb": rss_peak - rss_before,
+        "seconds": elapsed,
+        "saved": db[CONFIG["MONGO_COLLECTION_ANALYTICS"]].inserted,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 250000])
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} | {'mode':<14} | {'traced peak':>12} | {'RSS growth':>11} | {'time':>8} | saved")
+    print("-" * 75)
+    for rows in args.rows:
+        for label, chunk_size in [("in memory", 0), (f"chunks {args.chunk_size}", args.chunk_size)]:
+            # Fresh process per case: peak RSS never goes down within a process
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                r = executor.submit(run_case, rows, chunk_size).result()
+            print(
+                f"{rows:>9,} | {label:<14} | {r['traced_peak_mb']:>9.1f} MB | "
+                f"{r['rss_growth_mb']:>8.1f} MB | {r['seconds']:>7.2f}s | {r['saved']:,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: JSON vs compact binary MQTT payloads (src/ingestion/wire_format.py).
+
+Compares bytes per reading and bridge-side decode cost (payload -> Mongo
+documents) for JSON, gzip JSON and the fixed struct layout.
+
+    python benchmarks/bench_wire_format.py
+    python benchmarks/bench_wire_format.py --readings 100000 --batch 200
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "ingestion"))
+from wire_format import encode_columns, decode_columns, columns_to_documents  # noqa: E402
+
+
+def make_columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    return {
+        "timestamp": now - rng.integers(0, 86400, n),
+        "dispositivo": np.array([f"esp32-{i:03d}".encode() for i in rng.integers(0, 500, n)], dtype="S16"),
+        "temperatura": rng.normal(30, 4, n).astype(np.float32),
+        "humidade": rng.uniform(15, 90, n).astype(np.float32),
+        "gases_ppm": rng.uniform(100, 800, n).astype(np.float32),
+        "pm25": rng.uniform(1, 90, n).astype(np.float32),
+    }
+
+
+def json_messages(columns, batch):
+    docs = columns_to_documents(columns)
+    messages = []
+    for start in range(0, len(docs), batch):
+        chunk = [
+            {**doc, "timestamp": doc["timestamp"].isoformat()} for doc in docs[start:start + batch]
+        ]
+        messages.append(json.dumps(chunk).encode())
+    return messages
+
+
+def binary_messages(columns, batch):
+    n = len(columns["timestamp"])
+    return [
+        encode_columns({k: v[start:start + batch] for k, v in columns.items()})
+        for start in range(0, n, batch)
+    ]
+
+
+def decode_json(messages):
+    docs = []
+    for message in messages:
+        for doc in json.loads(message.decode()):
+            doc["timestamp"] = datetime.fromisoformat(doc["timestamp"])
+            docs.append(doc)
+    return docs
+
+
+def decode_gzip_json(messages):
+    return decode_json([gzip.decompress(m) for m in messages])
+
+
+def decode_binary(messages):
+    docs = []
+    for message in messages:
+        docs.extend(columns_to_documents(decode_columns(message)))
+    return docs
+
+
+def decode_binary_columns_only(messages):
+    return [decode_columns(message) for message in messages]
+
+
+def timed(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=100, help="Readings per MQTT message")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    columns = make_columns(args.readings)
+    js = json_messages(columns, args.batch)
+    gz = [gzip.compress(m) for m in js]
+    bn = binary_messages(columns, args.batch)
+
+    cases = [
+        ("json", js, decode_json),
+        ("json+gzip", gz, decode_gzip_json),
+        ("binary -> documents", bn, decode_binary),
+        ("binary -> columns", bn, decode_binary_columns_only),
+    ]
+
+    print(f"{args.readings:,} readings, {args.batch} per message, best of {args.repeat}\n")
+    print(f"{'format':<22} | {'bytes/reading':>13} | {'decode s':>9} | {'readings/s':>12}")
+    print("-" * 66)
+    for name, messages, decoder in cases:
+        size = sum(len(m) for m in messages) / args.readings
+        seconds = timed(decoder, messages, args.repeat)
+        print(f"{name:<22} | {size:>13.1f} | {seconds:>9.3f} | {args.readings / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import os
+import sys
+import logging
+import configparser
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common import mongo
+
+# ==============================================================================
+# CONFIGURAÇÕES
+# ==============================================================================
+
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+ALERT_CONFIG = {
+    "COLLECTION": mongo.COLLECTIONS["alerts"][1],
+    # Hysteresis: a state is entered above *_enter and left only below *_exit
+    "ELEVATED_ENTER": config.getfloat("Alerts", "elevated_enter", fallback=75.0),
+    "ELEVATED_EXIT": config.getfloat("Alerts", "elevated_exit", fallback=60.0),
+    "CRITICAL_ENTER": config.getfloat("Alerts", "critical_enter", fallback=100.0),
+    "CRITICAL_EXIT": config.getfloat("Alerts", "critical_exit", fallback=85.0),
+    "RECOVERY_READINGS": config.getint("Alerts", "recovery_readings", fallback=3),
+    "DIGEST_MINUTES": config.getint(
+        "Alerts", "digest_minutes", fallback=config.getint("App", "email_cooldown_minutes", fallback=5)
+    ),
+}
+
+NORMAL, ELEVATED, CRITICAL, RECOVERING = "normal", "elevado", "critico", "recuperando"
+
+logger = logging.getLogger(__name__)
+
+
+def next_state(state, carga, calm, cfg=ALERT_CONFIG):
+    """
+    One transition of the sector state machine. Returns (state, streak).
+    While recovering, the streak counts readings in a row below the
+    elevated exit (> 0) or still at or above it (< 0); otherwise it is 0.
+    """
+    if carga >= cfg["CRITICAL_ENTER"]:
+        return CRITICAL, 0
+
+    if state == NORMAL:
+        return (ELEVATED if carga >= cfg["ELEVATED_ENTER"] else NORMAL), 0
+    if state == ELEVATED:
+        return (NORMAL if carga < cfg["ELEVATED_EXIT"] else ELEVATED), 0
+    if state == CRITICAL:
+        return (RECOVERING if carga < cfg["CRITICAL_EXIT"] else CRITICAL), 0
+
+    # RECOVERING: back to normal after N consecutive readings below the elevated
+    # exit; settled in the elevated band after N consecutive readings that are
+    # not, or right away once the index reaches the elevated entry again
+    if carga >= cfg["ELEVATED_ENTER"]:
+        return ELEVATED, 0
+    if carga < cfg["ELEVATED_EXIT"]:
+        calm = max(calm, 0) + 1
+        return (NORMAL, 0) if calm >= cfg["RECOVERY_READINGS"] else (RECOVERING, calm)
+    calm = min(calm, 0) - 1
+    return (ELEVATED, 0) if -calm >= cfg["RECOVERY_READINGS"] else (RECOVERING, calm)
+
+
+class AlertManager:
+    """
+    Per-sector alert state (normal -> elevado -> critico -> recuperando)
+    persisted in the alerts collection.
+
+    Each sector keeps the timestamp of the last reading it has seen, so a
+    reading is evaluated once even though the pipeline re-reads the same
+    window every cycle. State transitions are queued and sent as one digest
+    every DIGEST_MINUTES, or right away when a sector turns critical.
+    """
+
+    def __init__(self, db, scope="all"):
+        self.coll = db[ALERT_CONFIG["COLLECTION"]]
+        self.digest_id = f"digest:{scope}"
+        self.states = {}
+
+    def begin_cycle(self):
+        # Another worker may have handled these sectors since the last cycle
+        self.states = {}
+
+    def _load(self, sectors):
+        missing = [s for s in sectors if s not in self.states]
+        if not missing:
+            return
+        for doc in self.coll.find({"tipo": "setor", "setor": {"$in": missing}}):
+            self.states[doc["setor"]] = doc
+        for setor in missing:
+            self.states.setdefault(
+                setor,
+                {"setor": setor, "estado": NORMAL, "calmas": 0, "ultima_leitura": None, "desde": None},
+            )
+
+    def unseen(self, df):
+        """Rows newer than the last reading each sector has already evaluated."""
+        if df.empty:
+            return df
+        self._load(df["localizacao"].unique().tolist())
+        last_seen = df["localizacao"].map(
+            {s: st["ultima_leitura"] for s, st in self.states.items() if st["ultima_leitura"] is not None}
+        )
+        last_seen = pd.to_datetime(last_seen)
+        return df[last_seen.isna() | (df["timestamp"] > last_seen)]
+
+    def observe(self, df):
+        """Run new readings through the state machine; returns the transitions."""
+        new = self.unseen(df[["timestamp", "localizacao", "carga_poluente"]])
+        if new.empty:
+            return []
+
+        events = []
+        for setor, rows in new.sort_values("timestamp").groupby("localizacao", sort=False):
+            st = self.states[setor]
+            state, calm = st["estado"], st.get("calmas", 0)
+            for ts, carga in zip(rows["timestamp"], rows["carga_poluente"].to_numpy()):
+                new_state, calm = next_state(state, carga, calm)
+                if new_state != state:
+                    events.append(
+                        {
+                            "setor": setor,
+                            "de": state,
+                            "para": new_state,
+                            "timestamp": ts.to_pydatetime(),
+                            "carga_poluente": float(carga),
+                        }
+                    )
+                    st["desde"] = ts.to_pydatetime()
+                    state = new_state
+
+            st.update(estado=state, calmas=calm, ultima_leitura=rows["timestamp"].iloc[-1].to_pydatetime())
+            self.coll.update_one(
+                {"_id": f"setor:{setor}"},
+                {
+                    "$set": {
+                        "tipo": "setor",
+                        "setor": setor,
+                        "estado": state,
+                        "calmas": calm,
+                        "desde": st["desde"],
+                        "ultima_leitura": st["ultima_leitura"],
+                    }
+                },
+                upsert=True,
+            )
+
+        if events:
+            self.coll.update_one(
+                {"_id": self.digest_id},
+                {"$push": {"pendentes": {"$each": events}}, "$set": {"tipo": "digest"}},
+                upsert=True,
+            )
+            logger.info(f"🚦 Alertas: {len(events)} mudanças de estado em {len(new)} leituras novas.")
+        return events
+
+    def flush(self, send, now=None):
+        """Send queued transitions as one digest when due. `send(subject, html)` returns True on success."""
+        now = now or datetime.now()
+        digest = self.coll.find_one({"_id": self.digest_id}) or {}
+        pending = digest.get("pendentes", [])
+        if not pending:
+            return False
+
+        last_sent = digest.get("ultimo_envio") or datetime.min
+        urgent = any(e["para"] == CRITICAL for e in pending)
+        if not urgent and now - last_sent < timedelta(minutes=ALERT_CONFIG["DIGEST_MINUTES"]):
+            return False
+
+        subject = f"🚨 ALERTA AMBIENTAL - Resumo {now.strftime('%H:%M')} ({len(pending)} eventos)"
+        if not send(subject, self.render(pending)):
+            return False  # keep the queue for the next cycle
+
+        self.coll.update_one(
+            {"_id": self.digest_id},
+            {
+                "$pull": {"pendentes": {"timestamp": {"$lte": max(e["timestamp"] for e in pending)}}},
+                "$set": {"ultimo_envio": now},
+            },
+        )
+        return True
+
+    def render(self, events):
+        eventos = pd.DataFrame(events)[["timestamp", "setor", "de", "para", "carga_poluente"]]
+        ativos = pd.DataFrame(
+            [
+                {"setor": s, "estado": st["estado"], "desde": st["desde"]}
+                for s, st in sorted(self.states.items())
+                if st["estado"] != NORMAL
+            ]
+        )
+        return f"""
+        <h3>Alerta de Qualidade do Ar</h3>
+        <p>Mudanças de estado por setor desde o último resumo:</p>
+        {eventos.sort_values("timestamp").to_html(index=False)}
+        <p>Setores fora do estado normal:</p>
+        {ativos.to_html(index=False) if not ativos.empty else "<p>Nenhum.</p>"}
+        <p><i>Este é um alerta automático. Próximo resumo em até {ALERT_CONFIG['DIGEST_MINUTES']} minutos, ou imediatamente se algum setor entrar em estado crítico.</i></p>
+        """
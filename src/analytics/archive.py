@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import glob
+import argparse
+import itertools
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pipeline import config, logger, mongo, buckets
+
+# ==============================================================================
+# CONFIGURAÇÕES DE ARQUIVAMENTO (HOT = MONGO / COLD = PARQUET)
+# ==============================================================================
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+ARCHIVE_CONFIG = {
+    # A relative archive_dir is taken from the repo root (like config.ini), not the cwd
+    "ARCHIVE_DIR": os.path.join(REPO_ROOT, config.get("Archive", "archive_dir", fallback="archive")),
+    "MAX_AGE_DAYS": config.getint("Archive", "max_age_days", fallback=30),
+    "BATCH_SIZE": config.getint("Archive", "batch_size", fallback=50000),
+    "COMPRESSION": config.get("Archive", "compression", fallback="zstd"),
+}
+
+# Raw collections (common/mongo.py logical names) and the field holding each reading's time
+ARCHIVE_TARGETS = {
+    "sensores_atlas": {"name": "raw", "time_field": "timestamp"},
+    "iot_raw": {"name": "iot_raw", "time_field": "received_at"},
+    "local_sensores": {"name": "local_sensores", "time_field": "created_at"},
+}
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def is_bucketed(target):
+    return buckets.enabled(ARCHIVE_TARGETS[target]["name"])
+
+
+def get_collection(target):
+    name = ARCHIVE_TARGETS[target]["name"]
+    if buckets.enabled(name):
+        return buckets.get_collection(name, workload="analytics")
+    return mongo.get_collection(name, workload="analytics")
+
+
+def archive_path(target):
+    # Same directory for both layouts: archived readings are always one row per reading
+    collection = mongo.COLLECTIONS[ARCHIVE_TARGETS[target]["name"]][1]
+    return os.path.join(ARCHIVE_CONFIG["ARCHIVE_DIR"], collection)
+
+
+def _normalize_for_parquet(df):
+    """Parquet needs one type per column: ObjectId -> str, nested dict/list -> JSON text."""
+    df["_id"] = df["_id"].astype(str)
+    for col in df.columns[df.dtypes == object]:
+        if df[col].map(lambda v: isinstance(v, (dict, list))).any():
+            df[col] = df[col].map(
+                lambda v: json.dumps(v, default=str, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+            )
+    return df
+
+
+# ==============================================================================
+# ARCHIVAL JOB
+# ==============================================================================
+
+
+def archive_collection(target, max_age_days=None, dry_run=False, coll=None):
+    """
+    Move readings older than `max_age_days` from Mongo into
+    <archive_dir>/<collection>/date=YYYY-MM-DD/part-*.parquet.
+
+    Each batch is written to disk before its _ids are deleted, so a crash
+    can at worst leave a reading in both tiers (read_range / iter_range de-duplicate).
+    """
+    spec = ARCHIVE_TARGETS[target]
+    time_field = spec["time_field"]
+    max_age_days = max_age_days if max_age_days is not None else ARCHIVE_CONFIG["MAX_AGE_DAYS"]
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    coll = coll if coll is not None else get_collection(target)
+    base_dir = archive_path(target)
+
+    bucketed = is_bucketed(target)
+    if bucketed:
+        # Whole buckets whose newest reading is past the cutoff
+        sort_field, batch = "ultimo", max(1, ARCHIVE_CONFIG["BATCH_SIZE"] // buckets.BUCKET_CONFIG["MAX_READINGS"])
+    else:
+        sort_field, batch = time_field, ARCHIVE_CONFIG["BATCH_SIZE"]
+    coll.create_index(sort_field)
+    query = {sort_field: {"$lt": cutoff}}
+
+    if dry_run:
+        if bucketed:
+            count = buckets.count_since(coll, query)
+        else:
+            count = coll.count_documents(query)
+        logger.info(f"🧊 [{target}] {count} leituras anteriores a {cutoff:%Y-%m-%d} seriam arquivadas.")
+        return count
+
+    total = 0
+    while True:
+        docs = list(coll.find(query).sort(sort_field, 1).limit(batch))
+        if not docs:
+            break
+
+        ids = [doc["_id"] for doc in docs]
+        if bucketed:
+            raw = buckets.unpack(docs, ARCHIVE_TARGETS[target]["name"], with_ids=True)
+        else:
+            raw = pd.DataFrame(docs)
+        df = _normalize_for_parquet(raw)
+        df[time_field] = pd.to_datetime(df[time_field], errors="coerce")
+        del docs
+
+        stamp = int(datetime.now().timestamp() * 1000)
+        for day, part in df.groupby(df[time_field].dt.strftime("%Y-%m-%d")):
+            day_dir = os.path.join(base_dir, f"date={day}")
+            os.makedirs(day_dir, exist_ok=True)
+            pq.write_table(
+                pa.Table.from_pandas(part, preserve_index=False),
+                os.path.join(day_dir, f"part-{stamp}.parquet"),
+                compression=ARCHIVE_CONFIG["COMPRESSION"],
+            )
+
+        coll.delete_many({"_id": {"$in": ids}})
+        total += len(df)
+        logger.info(f"🧊 [{target}] {len(df)} leituras arquivadas ({total} no total).")
+
+    logger.info(f"✅ [{target}] Arquivamento concluído: {total} leituras movidas para {base_dir}.")
+    return total
+
+
+# ==============================================================================
+# QUERY HELPER (HOT + COLD)
+# ==============================================================================
+
+
+def _cold_filter(time_field, start, end, query):
+    expr = (
+        (ds.field("date") >= start.strftime("%Y-%m-%d"))
+        & (ds.field("date") <= end.strftime("%Y-%m-%d"))
+        & (ds.field(time_field) >= pa.scalar(start, type=pa.timestamp("us")))
+        & (ds.field(time_field) < pa.scalar(end, type=pa.timestamp("us")))
+    )
+    for field, value in (query or {}).items():
+        if isinstance(value, dict) and set(value) == {"$in"}:
+            expr = expr & ds.field(field).isin(value["$in"])
+        elif isinstance(value, dict):
+            raise ValueError(f"Unsupported operator for archived data: {field}={value}")
+        else:
+            expr = expr & (ds.field(field) == value)
+    return expr
+
+
+def read_cold(target, start, end, query=None, columns=None):
+    base_dir = archive_path(target)
+    if not glob.glob(os.path.join(base_dir, "date=*")):
+        return pd.DataFrame()
+
+    time_field = ARCHIVE_TARGETS[target]["time_field"]
+    dataset = ds.dataset(base_dir, format="parquet", partitioning=PARTITIONING)
+    if columns is not None:
+        columns = [c for c in dict.fromkeys(list(columns) + ["_id", time_field]) if c in dataset.schema.names]
+
+    table = dataset.to_table(columns=columns, filter=_cold_filter(time_field, start, end, query))
+    df = table.to_pandas()
+    return df.drop(columns=["date"], errors="ignore")
+
+
+def iter_cold(target, start, end, chunk_size, query=None):
+    base_dir = archive_path(target)
+    if not glob.glob(os.path.join(base_dir, "date=*")):
+        return
+
+    time_field = ARCHIVE_TARGETS[target]["time_field"]
+    dataset = ds.dataset(base_dir, format="parquet", partitioning=PARTITIONING)
+    for batch in dataset.to_batches(filter=_cold_filter(time_field, start, end, query), batch_size=chunk_size):
+        if batch.num_rows:
+            yield batch.to_pandas().drop(columns=["date"], errors="ignore")
+
+
+def _iter_hot_documents(coll, mongo_query, chunk_size):
+    cursor = coll.find(mongo_query).batch_size(chunk_size)
+    while True:
+        docs = list(itertools.islice(cursor, chunk_size))
+        if not docs:
+            return
+        df = pd.DataFrame(docs)
+        df["_id"] = df["_id"].astype(str)
+        yield df
+
+
+def read_range(target, start, end, query=None, columns=None, coll=None):
+    """
+    Readings in [start, end) for `target`, transparently merging the hot
+    Mongo collection with the Parquet archive when the window reaches past
+    the oldest hot reading. `query` supports equality and $in filters.
+    """
+    time_field = ARCHIVE_TARGETS[target]["time_field"]
+    coll = coll if coll is not None else get_collection(target)
+
+    if is_bucketed(target):
+        hot = buckets.find_range(coll, ARCHIVE_TARGETS[target]["name"], start, end, query, with_ids=True)
+        if columns is not None and not hot.empty:
+            hot = hot[[c for c in dict.fromkeys(["_id", *columns, time_field]) if c in hot.columns]]
+        oldest_hot = buckets.oldest(coll)
+    else:
+        mongo_query = dict(query or {})
+        mongo_query[time_field] = {"$gte": start, "$lt": end}
+        projection = {c: 1 for c in list(columns) + [time_field]} if columns is not None else None
+        hot = pd.DataFrame(list(coll.find(mongo_query, projection)))
+        if not hot.empty:
+            hot["_id"] = hot["_id"].astype(str)
+        oldest_hot = coll.find_one({}, {time_field: 1}, sort=[(time_field, 1)])
+        oldest_hot = oldest_hot[time_field] if oldest_hot else None
+
+    needs_cold = oldest_hot is None or start < oldest_hot
+
+    frames = [hot]
+    if needs_cold:
+        frames.append(read_cold(target, start, end, query, columns))
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    df[time_field] = pd.to_datetime(df[time_field], errors="coerce")
+    return (
+        df.drop_duplicates(subset="_id")
+        .sort_values(time_field)
+        .reset_index(drop=True)
+    )
+
+
+def iter_range(target, start, end, chunk_size, query=None, coll=None):
+    """
+    read_range as a stream of DataFrames of at most about `chunk_size` rows:
+    the archive first (pyarrow batches), then the hot collection (cursor
+    batches), with memory bounded by the chunk size instead of the window.
+    Chunks are not time-ordered. Only readings at or after the oldest hot
+    one can be in both tiers, so just those archived _ids are remembered to
+    drop their hot copies.
+    """
+    spec = ARCHIVE_TARGETS[target]
+    time_field = spec["time_field"]
+    coll = coll if coll is not None else get_collection(target)
+
+    bucketed = is_bucketed(target)
+    if bucketed:
+        oldest_hot = buckets.oldest(coll)
+    else:
+        oldest_hot = coll.find_one({}, {time_field: 1}, sort=[(time_field, 1)])
+        oldest_hot = oldest_hot[time_field] if oldest_hot else None
+
+    archived_ids = set()
+    if oldest_hot is None or start < oldest_hot:
+        for df in iter_cold(target, start, end, chunk_size, query):
+            if oldest_hot is not None:
+                archived_ids.update(df.loc[df[time_field] >= oldest_hot, "_id"])
+            yield df
+
+    if bucketed:
+        hot = buckets.iter_range(coll, spec["name"], start, end, query, with_ids=True, chunk_size=chunk_size)
+    else:
+        mongo_query = dict(query or {})
+        mongo_query[time_field] = {"$gte": start, "$lt": end}
+        hot = _iter_hot_documents(coll, mongo_query, chunk_size)
+
+    for df in hot:
+        df[time_field] = pd.to_datetime(df[time_field], errors="coerce")
+        if archived_ids:
+            df = df[~df["_id"].isin(archived_ids)].reset_index(drop=True)
+        if not df.empty:
+            yield df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old raw readings from MongoDB to Parquet")
+    parser.add_argument("--target", choices=list(ARCHIVE_TARGETS), action="append")
+    parser.add_argument("--max-age-days", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    for target in args.target or list(ARCHIVE_TARGETS):
+        try:
+            archive_collection(target, args.max_age_days, dry_run=args.dry_run)
+        except Exception as e:
+            logger.error(f"❌ [{target}] Archival failed: {e}")
+            sys.exit(1)
@@ -0,0 +1,199 @@
+import os
+import sys
+import configparser
+
+import numpy as np
+from sklearn.ensemble import IsolationForest, RandomForestRegressor
+
+from inference import predict_chunked, _single_threaded
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common.forest import compile_forest
+
+# ==============================================================================
+# CONFIGURAÇÕES
+# ==============================================================================
+
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+DETECTOR_CONFIG = {
+    # "baseline" (supervised RandomForest) or "isolation" (IsolationForest on a reservoir sample)
+    "KIND": config.get("Detector", "kind", fallback="baseline"),
+    "RESERVOIR_SIZE": config.getint("Detector", "reservoir_size", fallback=20000),
+    "N_ESTIMATORS": config.getint("Detector", "isolation_estimators", fallback=100),
+    "CONTAMINATION": config.getfloat("Detector", "contamination", fallback=0.02),
+    "SEED": config.getint("Detector", "seed", fallback=42),
+}
+
+FEATURES = ["temperatura", "humidade", "hora_do_dia", "dia_da_semana"]
+# Deviation from the expected index above which a reading is "acima do padrão"
+DESVIO_LIMITE = 25.0
+
+
+# ==============================================================================
+# DETECTORS
+# ==============================================================================
+#
+# Every detector exposes the same calls used by AirQualityPipeline.detect_anomalies:
+#   update(df)  - sees each reading once: the rows newer than the pipeline
+#                 watermark (cheap; e.g. feeds a sample)
+#   fit(df)     - (re)trains, on the retrain cadence
+#   score(df)   - (carga_estimada, desvio_modelo, acima_padrao) arrays
+#   trained     - True once fit() succeeded
+
+
+class BaselineDetector:
+    """
+    Supervised baseline: a RandomForest predicts the expected pollution index
+    from the conditions (temperature, humidity, hour, weekday); readings more
+    than DESVIO_LIMITE above it are flagged.
+    """
+
+    kind = "baseline"
+
+    def __init__(self, inference=None, compiled=False, model=None):
+        self.inference = inference or {}
+        self.compiled = compiled
+        self.model = model
+        self.scoring_model = model
+
+    @property
+    def trained(self):
+        return self.scoring_model is not None
+
+    def update(self, df):
+        pass
+
+    def fit(self, df):
+        self.model = RandomForestRegressor(n_estimators=50, max_depth=10, random_state=42, n_jobs=-1)
+        self.model.fit(df[FEATURES], df["carga_poluente"])
+        self.scoring_model = compile_forest(self.model) if self.compiled else self.model
+
+    def score(self, df):
+        estimada = predict_chunked(self.scoring_model, df[FEATURES], **self.inference)
+        desvio = df["carga_poluente"].to_numpy() - estimada
+        return estimada, desvio, desvio > DESVIO_LIMITE
+
+    def single_threaded(self):
+        """Copy for pool workers (frozen model, n_jobs=1)."""
+        return BaselineDetector(inference=self.inference, model=_single_threaded(self.scoring_model))
+
+
+class Reservoir:
+    """Uniform fixed-size sample of every row seen so far (Algorithm R, vectorized per batch)."""
+
+    def __init__(self, size, n_columns, seed=None):
+        self.size = size
+        self.rows = np.empty((size, n_columns), dtype=np.float64)
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        fill = min(max(self.size - self.seen, 0), len(values))
+        self.rows[self.seen:self.seen + fill] = values[:fill]
+
+        rest = values[fill:]
+        if len(rest):
+            # Row number i (0-based, over the whole stream) replaces a random slot with probability size/(i+1)
+            positions = self.seen + fill + np.arange(len(rest))
+            slots = self.rng.integers(0, positions + 1)
+            keep = slots < self.size
+            # Fancy assignment keeps the last write per slot, as sequential replacement would
+            self.rows[slots[keep]] = rest[keep]
+        self.seen += len(values)
+
+    def sample(self):
+        return self.rows[:min(self.seen, self.size)]
+
+
+class _DecisionScores:
+    """predict() -> IsolationForest.decision_function, so predict_chunked can score in batch."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, X):
+        return self.model.decision_function(X)
+
+
+class IsolationDetector:
+    """
+    Unsupervised, low-cost mode: an IsolationForest trained on a bounded
+    reservoir sample of the stream instead of the whole batch. The index
+    enters as its deviation from the sample median for the hour (reported as
+    `carga_estimada`), so rush-hour levels are not outliers by themselves.
+    A reading is "acima do padrão" when it is isolated (decision score < 0)
+    and above that median.
+    """
+
+    kind = "isolation"
+    columns = ["temperatura", "humidade", "hora_do_dia", "carga_poluente"]
+
+    def __init__(self, inference=None, reservoir_size=None, n_estimators=None, contamination=None, seed=None):
+        self.inference = inference or {}
+        self.n_estimators = n_estimators or DETECTOR_CONFIG["N_ESTIMATORS"]
+        self.contamination = contamination or DETECTOR_CONFIG["CONTAMINATION"]
+        self.seed = DETECTOR_CONFIG["SEED"] if seed is None else seed
+        self.reservoir = Reservoir(
+            reservoir_size or DETECTOR_CONFIG["RESERVOIR_SIZE"], len(self.columns), self.seed
+        )
+        self.model = None
+        self.hourly_median = None
+
+    @property
+    def trained(self):
+        return self.model is not None
+
+    def update(self, df):
+        self.reservoir.add(df[self.columns].to_numpy(dtype=np.float64))
+
+    def _features(self, X):
+        """[temperatura, humidade, hora, carga] -> same columns with carga replaced by its hourly deviation."""
+        X = X.copy()
+        X[:, 3] -= self.hourly_median[X[:, 2].astype(np.int64) % 24]
+        return X
+
+    def fit(self, df):
+        sample = self.reservoir.sample()
+        if not len(sample):
+            self.update(df)
+            sample = self.reservoir.sample()
+
+        horas = sample[:, 2].astype(np.int64)
+        carga = sample[:, 3]
+        mediana_geral = np.median(carga)
+        self.hourly_median = np.array(
+            [np.median(carga[horas == h]) if (horas == h).any() else mediana_geral for h in range(24)]
+        )
+
+        model = IsolationForest(
+            n_estimators=self.n_estimators,
+            contamination=self.contamination,
+            random_state=self.seed,
+            n_jobs=1,
+        )
+        model.fit(self._features(sample))
+        self.model = model
+
+    def score(self, df):
+        X = self._features(df[self.columns].to_numpy(dtype=np.float64))
+        scores = predict_chunked(_DecisionScores(self.model), X, **self.inference)
+        desvio = X[:, 3]
+        estimada = df["carga_poluente"].to_numpy() - desvio
+        return estimada, desvio, (scores < 0) & (desvio > 0)
+
+    def single_threaded(self):
+        return self
+
+
+DETECTORS = {"baseline": BaselineDetector, "isolation": IsolationDetector}
+
+
+def make_detector(kind=None, **kwargs):
+    kind = kind or DETECTOR_CONFIG["KIND"]
+    if kind not in DETECTORS:
+        raise ValueError(f"Unknown anomaly detector '{kind}' (use {', '.join(DETECTORS)})")
+    return DETECTORS[kind](**kwargs)
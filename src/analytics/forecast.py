@@ -0,0 +1,165 @@
+import os
+import sys
+import logging
+import configparser
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+
+from quality import vector_index
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common import mongo
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "simulation"))
+from simulator import DigitalTwinAI, FEATURES, SETORES, GOIANIA_LAT, GOIANIA_LON, get_clima_real
+
+# ==============================================================================
+# CONFIGURAÇÕES
+# ==============================================================================
+
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+FORECAST_CONFIG = {
+    "HORIZON_HOURS": config.getint("Forecast", "horizon_hours", fallback=24),
+    "COLLECTION": mongo.COLLECTIONS["forecast"][1],
+}
+
+# Open-Meteo hours and the twin's hour / weekday features are Goiânia local time
+FUSO_LOCAL = "America/Sao_Paulo"
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastService:
+    """
+    Short-horizon (1-24 h) per-sector forecast of pm25, gases_ppm and carga_poluente.
+
+    Reuses the digital-twin model and its features (hour, weekday,
+    temperature, humidity, fator_local). The whole sector x horizon grid is
+    scored in one batch and written once per cycle to the forecast
+    collection, which the dashboard reads.
+    """
+
+    def __init__(self, db, sectors=None, horizon_hours=None):
+        self.db = db
+        self.sectors = list(sectors) if sectors is not None else None
+        self.horizon_hours = horizon_hours or FORECAST_CONFIG["HORIZON_HOURS"]
+        self.twin = DigitalTwinAI()
+
+    def get_weather_forecast(self, hours):
+        """Hourly temperature/humidity for the next hours (Open-Meteo), indexed by tz-aware FUSO_LOCAL hour."""
+        url = (
+            "https://api.open-meteo.com/v1/forecast"
+            f"?latitude={GOIANIA_LAT}&longitude={GOIANIA_LON}"
+            "&hourly=temperature_2m,relative_humidity_2m"
+            f"&forecast_hours={hours + 1}"
+            f"&timezone={FUSO_LOCAL}"
+        )
+        try:
+            response = requests.get(url, timeout=5)
+            response.raise_for_status()
+            hourly = response.json()["hourly"]
+            return pd.DataFrame(
+                {
+                    "temp": hourly["temperature_2m"],
+                    "umidade": hourly["relative_humidity_2m"],
+                },
+                # Naive wall-clock times in the requested timezone
+                index=pd.to_datetime(hourly["time"]).tz_localize(FUSO_LOCAL),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Weather forecast unavailable, using persistence: {e}")
+            return None
+
+    def build_grid(self, now=None):
+        """
+        One row per (sector, horizon) with the digital-twin features. Target
+        hours are built in FUSO_LOCAL, like the weather forecast, whatever the
+        server's timezone; `timestamp_previsto` is stored as naive server-local
+        time, like the readings' `timestamp`. A naive `now` is server-local.
+        """
+        now = pd.Timestamp(now or datetime.now())
+        if now.tzinfo is None:
+            now = now.tz_localize(datetime.now().astimezone().tzinfo)
+        base_hour = now.tz_convert(FUSO_LOCAL).floor("h")
+        horizons = np.arange(1, self.horizon_hours + 1)
+        targets = pd.DatetimeIndex([base_hour + pd.Timedelta(hours=int(h)) for h in horizons])
+
+        weather = self.get_weather_forecast(self.horizon_hours)
+        if weather is not None:
+            weather = weather.reindex(targets)
+            missing = weather.isna().any(axis=1)
+            if missing.any():
+                logger.warning(
+                    f"⚠️ Weather forecast misses {int(missing.sum())} of {len(targets)} target hours "
+                    f"(first: {targets[missing.to_numpy()][0]}); using persistence."
+                )
+                weather = None
+        if weather is None:
+            clima = get_clima_real()
+            weather = pd.DataFrame(
+                {"temp": clima["temp_base"], "umidade": clima["hum_base"]}, index=targets
+            )
+
+        sectors = {
+            nome: dados
+            for nome, dados in SETORES.items()
+            if self.sectors is None or nome in self.sectors
+        }
+        if not sectors:
+            return pd.DataFrame()
+        n_sectors = len(sectors)
+
+        grid = pd.DataFrame(
+            {
+                "localizacao": np.repeat(list(sectors.keys()), len(targets)),
+                "timestamp_previsto": np.tile(
+                    targets.tz_convert(now.tzinfo).tz_localize(None).to_pydatetime(), n_sectors
+                ),
+                "horizonte_h": np.tile(horizons, n_sectors),
+                "hora": np.tile(targets.hour, n_sectors),
+                "dia_semana": np.tile(targets.weekday, n_sectors),
+                "temp": np.concatenate(
+                    [weather["temp"].to_numpy() + d["temp_offset"] for d in sectors.values()]
+                ),
+                "umidade": np.tile(weather["umidade"].to_numpy(), n_sectors),
+                "fator_local": np.repeat([d["fator"] for d in sectors.values()], len(targets)),
+            }
+        )
+        return grid
+
+    def compute(self, now=None):
+        now = now or datetime.now()
+        grid = self.build_grid(now)
+        if grid.empty:
+            return grid
+
+        pm25, gases = self.twin.prever_base(grid[FEATURES])
+        grid["pm25"] = np.round(pm25, 2)
+        grid["gases_ppm"] = np.round(gases, 0)
+        grid["carga_poluente"] = vector_index(grid["pm25"], grid["gases_ppm"])
+        grid["temperatura"] = grid["temp"].round(2)
+        grid["humidade"] = grid["umidade"]
+        grid["gerado_em"] = now
+
+        return grid.drop(columns=FEATURES)
+
+    def save(self, df):
+        coll = self.db[FORECAST_CONFIG["COLLECTION"]]
+        scope = {} if self.sectors is None else {"localizacao": {"$in": self.sectors}}
+        coll.delete_many(scope)
+        records = df.to_dict("records")
+        if records:
+            coll.insert_many(records)
+            logger.info(f"🔮 Forecast: {len(records)} previsões ({self.horizon_hours}h) atualizadas.")
+
+    def run(self, now=None):
+        try:
+            self.save(self.compute(now))
+        except Exception as e:
+            logger.error(f"Error computing forecast: {e}")
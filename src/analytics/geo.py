@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# GEOHASH (VETORIZADO) E AGREGAÇÃO POR CÉLULA
+# ==============================================================================
+
+_BASE32 = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+
+
+def _quantize(lat, lon, precision):
+    n_bits = 5 * precision
+    lon_bits = (n_bits + 1) // 2  # geohash starts with a longitude bit
+    lat_bits = n_bits // 2
+    q_lon = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64)
+    q_lat = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64)
+    q_lon = np.clip(q_lon, 0, (1 << lon_bits) - 1)
+    q_lat = np.clip(q_lat, 0, (1 << lat_bits) - 1)
+    return q_lat, q_lon, lat_bits, lon_bits
+
+
+def encode(lat, lon, precision=6):
+    """Geohash strings for arrays of coordinates (precision 6 ≈ 1.2 km x 0.6 km cells)."""
+    q_lat, q_lon, lat_bits, lon_bits = _quantize(lat, lon, precision)
+
+    # Interleave: even bit positions (from the MSB) are longitude, odd are latitude
+    code = np.zeros(q_lat.shape, dtype=np.int64)
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            bit = (q_lon >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (q_lat >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+
+    out = _BASE32[(code >> (5 * (precision - 1))) & 31]
+    for k in range(1, precision):
+        out = np.char.add(out, _BASE32[(code >> (5 * (precision - 1 - k))) & 31])
+    return out
+
+
+def cell_center(lat, lon, precision=6):
+    """Center of the geohash cell containing each coordinate."""
+    q_lat, q_lon, lat_bits, lon_bits = _quantize(lat, lon, precision)
+    lat_c = -90.0 + (q_lat + 0.5) * (180.0 / (1 << lat_bits))
+    lon_c = -180.0 + (q_lon + 0.5) * (360.0 / (1 << lon_bits))
+    return lat_c, lon_c
+
+
+def aggregate_cells(df, precision=6, window_minutes=60):
+    """
+    Per-cell aggregates of the most recent `window_minutes` of readings,
+    using each reading's own latitude/longitude.
+    """
+    df = df.dropna(subset=["latitude", "longitude"])
+    if df.empty:
+        return pd.DataFrame()
+
+    recent = df[df["timestamp"] >= df["timestamp"].max() - pd.Timedelta(minutes=window_minutes)]
+    lat = recent["latitude"].to_numpy(dtype=np.float64)
+    lon = recent["longitude"].to_numpy(dtype=np.float64)
+    lat_c, lon_c = cell_center(lat, lon, precision)
+
+    cells = recent.assign(geohash=encode(lat, lon, precision), lat_centro=lat_c, lon_centro=lon_c)
+    agg = (
+        cells.groupby("geohash")
+        .agg(
+            lat_centro=("lat_centro", "first"),
+            lon_centro=("lon_centro", "first"),
+            n_leituras=("carga_poluente", "size"),
+            carga_poluente_media=("carga_poluente", "mean"),
+            carga_poluente_max=("carga_poluente", "max"),
+            pm25_media=("pm25", "mean"),
+            gases_ppm_media=("gases_ppm", "mean"),
+            anomalias=("anomalia_detectada", "sum"),
+            setores=("localizacao", lambda s: sorted(s.unique())),
+            ultima_leitura=("timestamp", "max"),
+        )
+        .reset_index()
+    )
+    agg["anomalias"] = agg["anomalias"].astype(int)
+    for col in ["carga_poluente_media", "carga_poluente_max", "pm25_media", "gases_ppm_media"]:
+        agg[col] = agg[col].round(2)
+    # GeoJSON point for the 2dsphere index
+    agg["centro"] = [
+        {"type": "Point", "coordinates": [float(lo), float(la)]}
+        for la, lo in zip(agg["lat_centro"], agg["lon_centro"])
+    ]
+    return agg
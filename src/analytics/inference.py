@@ -0,0 +1,78 @@
+import os
+import copy
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+# ==============================================================================
+# CHUNKED / PARALLEL INFERENCE
+# ==============================================================================
+
+# Model held by each process-pool worker. It is sent once through the pool
+# initializer instead of being re-pickled with every task.
+_WORKER_MODEL = None
+
+
+def _single_threaded(model):
+    """
+    Shallow copy of a fitted ensemble with n_jobs=1.
+
+    The fitted trees (`estimators_`) are shared with the original model, so
+    this is cheap; it only prevents every chunk from spawning its own
+    joblib thread pool on top of ours.
+    """
+    clone = copy.copy(model)
+    if hasattr(clone, "n_jobs"):
+        clone.n_jobs = 1
+    return clone
+
+
+def _init_worker(model):
+    global _WORKER_MODEL
+    _WORKER_MODEL = _single_threaded(model)
+
+
+def _predict_in_worker(X_chunk):
+    return _WORKER_MODEL.predict(X_chunk)
+
+
+def _chunks(X, chunk_size):
+    n_rows = len(X)
+    if hasattr(X, "iloc"):
+        return [X.iloc[i:i + chunk_size] for i in range(0, n_rows, chunk_size)]
+    return [X[i:i + chunk_size] for i in range(0, n_rows, chunk_size)]
+
+
+def predict_chunked(model, X, chunk_size=50000, n_workers=0, backend="thread"):
+    """
+    Score `X` in fixed-size chunks across a worker pool, preserving row order.
+
+    backend="thread"  -> ThreadPoolExecutor; the model is shared in memory
+                         (sklearn tree traversal releases the GIL).
+    backend="process" -> ProcessPoolExecutor; the model is shipped once per
+                         worker through the pool initializer.
+
+    Batches that fit in a single chunk go straight to `model.predict`.
+    """
+    n_rows = len(X)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    if n_rows <= chunk_size or n_workers == 1:
+        return model.predict(X)
+
+    chunks = _chunks(X, chunk_size)
+    n_workers = min(n_workers, len(chunks))
+
+    if backend == "process":
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(model,)
+        ) as executor:
+            results = list(executor.map(_predict_in_worker, chunks))
+    elif backend == "thread":
+        local_model = _single_threaded(model)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(local_model.predict, chunks))
+    else:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    return np.concatenate(results)
@@ -1,276 +1,587 @@
-import os
-import sys
-import time
-import math
-import logging
-import smtplib
-import pymongo
-import pandas as pd
-import numpy as np
-from urllib.parse import quote_plus
-from datetime import datetime, timedelta
-import configparser
-
-from sklearn.ensemble import IsolationForest, RandomForestRegressor
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-# ==============================================================================
-# CONFIGURAÇÕES
-# ==============================================================================
-
-config = configparser.ConfigParser()
-config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
-config.read(config_path, encoding="utf-8")
-
-MONGO_USER = config.get("MongoAtlas", "user")
-MONGO_PASS = config.get("MongoAtlas", "password")
-MONGO_CLUSTER = config.get("MongoAtlas", "cluster")
-
-user_encoded = quote_plus(MONGO_USER)
-pass_encoded = quote_plus(MONGO_PASS)
-
-CONFIG = {
-    "MONGO_CONNECTION_URI": f"mongodb+srv://{user_encoded}:{pass_encoded}@{MONGO_CLUSTER}",
-    "MONGO_DATABASE": config.get("MongoAtlas", "db_monitoramento", fallback="Monitoramento_do_Ar"),
-    "MONGO_COLLECTION_RAW": config.get("MongoAtlas", "collection_sensores", fallback="Leituras_Sensores"),
-    "MONGO_COLLECTION_ANALYTICS": config.get("MongoAtlas", "collection_analiticas", fallback="Leituras_Analiticas"),
-    "SMTP_SERVER": config.get("SMTP", "server"),
-    "SMTP_PORT": config.getint("SMTP", "port"),
-    "EMAIL_SENDER": config.get("SMTP", "sender"),
-    "EMAIL_PASSWORD": config.get("SMTP", "password"),
-    "EMAIL_RECEIVER": [email.strip() for email in config.get("SMTP", "receivers").split(",")],
-    "UPDATE_INTERVAL": config.getint("App", "update_interval", fallback=300),
-    "RETRAIN_INTERVAL_MINUTES": config.getint("App", "retrain_interval_minutes", fallback=5),
-    "EMAIL_COOLDOWN_MINUTES": config.getint("App", "email_cooldown_minutes", fallback=5),
-}
-
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-logger = logging.getLogger(__name__)
-
-
-class AirQualityPipeline:
-    def __init__(self):
-        self.model = None
-        self.last_retrain_time = datetime.min
-        self.last_email_sent = datetime.min
-
-        try:
-            self.mongo_client = pymongo.MongoClient(CONFIG["MONGO_CONNECTION_URI"])
-            self.mongo_client.admin.command("ping")
-            self.db = self.mongo_client[CONFIG["MONGO_DATABASE"]]
-            logger.info("✅ Pipeline connected to MongoDB.")
-        except Exception as e:
-            logger.error(f"❌ Critical Mongo error: {e}")
-            sys.exit(1)
-
-    def get_data(self):
-        """Read raw data generated by the simulator."""
-        try:
-            collection = self.db[CONFIG["MONGO_COLLECTION_RAW"]]
-
-            cursor = collection.find({}, {"_id": 0}).sort("timestamp", -1).limit(10000)
-            df = pd.DataFrame(list(cursor))
-
-            if df.empty:
-                return None
-
-            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-            cols_num = ["temperatura", "humidade", "gases_ppm", "pm25"]
-            for col in cols_num:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-            return df.dropna(subset=cols_num).sort_values("timestamp")
-        except Exception as e:
-            logger.error(f"Error reading data: {e}")
-            return None
-
-    def process_and_classify(self, df):
-        """
-        1. Create human-readable classification (Excellent/Good/Moderate/Poor)
-        2. Compute unified vectorial air quality index
-        3. Prepare temporal features
-        """
-
-        def classify_quality(row):
-            pm, gas, temp = row["pm25"], row["gases_ppm"], row["temperatura"]
-            if pm > 55 or gas > 800 or (temp < 14 or temp > 30):
-                return "Ruim"
-            elif (35 < pm <= 55) or (500 < gas <= 800):
-                return "Moderada"
-            elif (12 <= pm <= 35) or (300 <= gas <= 500):
-                return "Boa"
-            else:
-                return "Excelente"
-
-        def compute_vector_index(row):
-            LIMITE_PM = 35.0
-            LIMITE_GAS = 500.0
-            norm_pm = row["pm25"] / LIMITE_PM
-            norm_gas = row["gases_ppm"] / LIMITE_GAS
-            indice = math.sqrt(norm_pm**2 + norm_gas**2) * 50.0
-            return round(indice, 2)
-
-        df = df.copy()
-        df["classificacao_ar"] = df.apply(classify_quality, axis=1)
-        df["carga_poluente"] = df.apply(compute_vector_index, axis=1)
-
-        df["hora_do_dia"] = df["timestamp"].dt.hour
-        df["dia_da_semana"] = df["timestamp"].dt.weekday
-
-        return df
-
-    def detect_anomalies(self, df):
-        """
-        Detect anomalies using a RandomForestRegressor as a baseline model.
-        """
-        if df.empty:
-            return df
-
-        features = ["temperatura", "humidade", "hora_do_dia", "dia_da_semana"]
-        X = df[features]
-        y = df["carga_poluente"]
-
-        now = datetime.now()
-        minutes_since_train = (now - self.last_retrain_time).total_seconds() / 60
-
-        if self.model is None or minutes_since_train > CONFIG["RETRAIN_INTERVAL_MINUTES"]:
-            logger.info(f"🧠 Training anomaly model (last train: {int(minutes_since_train)} min ago)...")
-            try:
-                self.model = RandomForestRegressor(
-                    n_estimators=50, max_depth=10, random_state=42, n_jobs=-1
-                )
-                self.model.fit(X, y)
-                self.last_retrain_time = now
-            except Exception as e:
-                logger.error(f"Error training model: {e}")
-
-        if self.model:
-            df["carga_estimada"] = self.model.predict(X)
-            df["desvio_modelo"] = df["carga_poluente"] - df["carga_estimada"]
-        else:
-            df["carga_estimada"] = df["carga_poluente"]
-            df["desvio_modelo"] = 0
-
-        def check_anomaly(row):
-            reasons = []
-            is_anomaly = False
-
-            if row["desvio_modelo"] > 25.0:
-                reasons.append(f"Poluição acima do padrão para {row['hora_do_dia']}h")
-                is_anomaly = True
-
-            if row["carga_poluente"] > 100:
-                reasons.append("Índice Vetorial Crítico")
-                is_anomaly = True
-            elif row["pm25"] > 55:
-                reasons.append("Poeira Alta")
-                is_anomaly = True
-            elif row["gases_ppm"] > 800:
-                reasons.append("Gases Altos")
-                is_anomaly = True
-
-            tipo = ", ".join(reasons) if is_anomaly else "Normal"
-            return is_anomaly, tipo
-
-        result = df.apply(check_anomaly, axis=1)
-        df["anomalia_detectada"] = result.apply(lambda x: x[0])
-        df["tipo_anomalia"] = result.apply(lambda x: x[1])
-
-        return df
-
-    def save_to_mongo(self, df):
-        """Persist processed DataFrame in analytics collection."""
-        try:
-            coll = self.db[CONFIG["MONGO_COLLECTION_ANALYTICS"]]
-            coll.delete_many({})
-
-            cols_to_drop = ["hora_do_dia", "dia_da_semana"]
-            df_save = df.drop(columns=[c for c in cols_to_drop if c in df.columns])
-
-            records = df_save.to_dict("records")
-            if records:
-                coll.insert_many(records)
-                logger.info(f"💾 Analytics: {len(records)} registros atualizados.")
-        except Exception as e:
-            logger.error(f"Error saving to Mongo: {e}")
-
-    def send_alert_email(self, anomaly_records):
-        """Send e-mail alert with cooldown to avoid spam."""
-        critical = anomaly_records[anomaly_records["carga_poluente"] > 100]
-
-        if critical.empty:
-            return
-
-        now = datetime.now()
-        minutes_since_email = (now - self.last_email_sent).total_seconds() / 60
-
-        if minutes_since_email < CONFIG["EMAIL_COOLDOWN_MINUTES"]:
-            logger.info(
-                "⏳ Critical alert detected but e-mail in cooldown "
-                f"({int(minutes_since_email)}/{CONFIG['EMAIL_COOLDOWN_MINUTES']} min)."
-            )
-            return
-
-        logger.info(f"📧 Sending alert for {len(critical)} critical records...")
-
-        msg = MIMEMultipart()
-        msg["From"] = CONFIG["EMAIL_SENDER"]
-        msg["To"] = ", ".join(CONFIG["EMAIL_RECEIVER"])
-        msg["Subject"] = f"🚨 ALERTA AMBIENTAL - {now.strftime('%H:%M')}"
-
-        html_table = critical[
-            ["timestamp", "localizacao", "carga_poluente", "tipo_anomalia"]
-        ].tail(5).to_html(index=False)
-
-        body = f"""
-        <h3>Alerta de Qualidade do Ar</h3>
-        <p>O sistema detectou índices vetoriais acima do limite de segurança (100).</p>
-        {html_table}
-        <p><i>Este é um alerta automático. Próximo aviso somente em {CONFIG['EMAIL_COOLDOWN_MINUTES']} minutos se persistir.</i></p>
-        """
-        msg.attach(MIMEText(body, "html"))
-
-        try:
-            server = smtplib.SMTP(CONFIG["SMTP_SERVER"], CONFIG["SMTP_PORT"])
-            server.starttls()
-            server.login(CONFIG["EMAIL_SENDER"], CONFIG["EMAIL_PASSWORD"])
-            server.sendmail(CONFIG["EMAIL_SENDER"], CONFIG["EMAIL_RECEIVER"], msg.as_string())
-            server.quit()
-
-            self.last_email_sent = now
-            logger.info("✅ E-mail enviado com sucesso.")
-        except Exception as e:
-            logger.error(f"Failed to send email: {e}")
-
-    def run_cycle(self):
-        df = self.get_data()
-        if df is None:
-            return
-
-        df = self.process_and_classify(df)
-        df = self.detect_anomalies(df)
-
-        anomalies = df[df["anomalia_detectada"] == True]
-        if not anomalies.empty:
-            count = len(anomalies)
-            logger.warning(f"⚠️ {count} anomalias detectadas no lote.")
-            self.send_alert_email(anomalies)
-
-        self.save_to_mongo(df)
-
-    def start(self):
-        logger.info("--- Optimized AI Pipeline Started ---")
-        try:
-            while True:
-                self.run_cycle()
-                logger.info(f"💤 Sleeping for {CONFIG['UPDATE_INTERVAL']}s...")
-                time.sleep(CONFIG["UPDATE_INTERVAL"])
-        except KeyboardInterrupt:
-            logger.info("Pipeline stopped.")
-
-
-if __name__ == "__main__":
-    pipeline = AirQualityPipeline()
-    pipeline.start()
-
+import os
+import sys
+import logging
+import smtplib
+import itertools
+import pymongo
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import configparser
+
+from detectors import make_detector, Reservoir
+from quality import vector_index, classify_quality, anomaly_labels
+from alerts import AlertManager
+import geo
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common.scheduler import AdaptiveScheduler
+from common import mongo, buckets
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# ==============================================================================
+# CONFIGURAÇÕES
+# ==============================================================================
+
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+CONFIG = {
+    # URIs, names and pool settings live in common/mongo.py
+    "MONGO_DATABASE": mongo.TARGETS["atlas"][1],
+    "MONGO_COLLECTION_RAW": mongo.COLLECTIONS["raw"][1],
+    # Raw readings stored as per-sector time buckets ([Buckets] collections includes "raw")
+    "RAW_BUCKETS": buckets.enabled("raw"),
+    "MONGO_COLLECTION_RAW_BUCKETS": mongo.COLLECTIONS["raw_buckets"][1],
+    "MONGO_COLLECTION_ANALYTICS": mongo.COLLECTIONS["analytics"][1],
+    "MONGO_COLLECTION_CELLS": mongo.COLLECTIONS["cells"][1],
+    "MONGO_COLLECTION_METRICS": mongo.COLLECTIONS["metrics"][1],
+    "MONGO_COLLECTION_LATEST": mongo.COLLECTIONS["latest"][1],
+    "SMTP_SERVER": config.get("SMTP", "server"),
+    "SMTP_PORT": config.getint("SMTP", "port"),
+    "EMAIL_SENDER": config.get("SMTP", "sender"),
+    "EMAIL_PASSWORD": config.get("SMTP", "password"),
+    "EMAIL_RECEIVER": [email.strip() for email in config.get("SMTP", "receivers").split(",")],
+    "UPDATE_INTERVAL": config.getint("App", "update_interval", fallback=300),
+    "MAX_BATCH_ROWS": config.getint("App", "max_batch_rows", fallback=10000),
+    "PROCESSING_CHUNK_SIZE": config.getint("App", "processing_chunk_size", fallback=0),
+    # Chunked cycles: rows sampled uniformly across all chunks to (re)train the detector
+    "TRAIN_SAMPLE_ROWS": config.getint("App", "train_sample_rows", fallback=50000),
+    "MIN_INTERVAL": config.getint("App", "min_interval", fallback=60),
+    "MAX_INTERVAL": config.getint("App", "max_interval", fallback=900),
+    "BACKLOG_HIGH": config.getint("App", "backlog_high", fallback=500),
+    "BACKLOG_LOW": config.getint("App", "backlog_low", fallback=0),
+    "RETRAIN_INTERVAL_MINUTES": config.getint("App", "retrain_interval_minutes", fallback=5),
+    "INFERENCE_CHUNK_SIZE": config.getint("App", "inference_chunk_size", fallback=50000),
+    "INFERENCE_WORKERS": config.getint("App", "inference_workers", fallback=0),
+    "INFERENCE_BACKEND": config.get("App", "inference_backend", fallback="thread"),
+    "COMPILED_INFERENCE": config.getboolean("App", "compiled_inference", fallback=False),
+    "ANOMALY_DETECTOR": config.get("Detector", "kind", fallback="baseline"),
+    "FORECAST_ENABLED": config.getboolean("Forecast", "enabled", fallback=False),
+    "GEOHASH_PRECISION": config.getint("Geo", "geohash_precision", fallback=6),
+    "GEO_CELL_WINDOW_MINUTES": config.getint("Geo", "cell_window_minutes", fallback=60),
+}
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Model features that are not persisted in the analytics collection
+DERIVED_COLUMNS = ["hora_do_dia", "dia_da_semana"]
+ALERT_COLUMNS = ["timestamp", "localizacao", "carga_poluente"]
+# Columns the detectors train on (detectors.FEATURES + index; IsolationDetector.columns is a subset)
+TRAIN_COLUMNS = ["temperatura", "humidade", "hora_do_dia", "dia_da_semana", "carga_poluente"]
+# Fields kept per sector in the latest-state collection (dashboard KPIs + map)
+LATEST_COLUMNS = [
+    "timestamp", "localizacao", "temperatura", "humidade", "gases_ppm", "pm25",
+    "latitude", "longitude", "geohash", "classificacao_ar", "carga_poluente",
+    "anomalia_detectada", "tipo_anomalia",
+]
+
+
+def iter_record_batches(df, batch_size=5000, exclude=()):
+    """
+    Rows of `df` as lists of dicts, `batch_size` rows at a time, instead of
+    materializing df.to_dict("records") for the whole frame.
+    """
+    columns = [c for c in df.columns if c not in exclude]
+    for start in range(0, len(df), batch_size):
+        part = df.iloc[start:start + batch_size]
+        values = [part[col].tolist() for col in columns]
+        yield [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def latest_per_sector(df, day_start):
+    """
+    Newest row of each sector plus `anomalias_abertas`: real anomalies
+    (statistical deviations excluded) since `day_start`, the same count the
+    dashboard shows for its default "today" view. Indexed by localizacao.
+    """
+    latest = df.loc[
+        df.groupby("localizacao")["timestamp"].idxmax(), [c for c in LATEST_COLUMNS if c in df.columns]
+    ].set_index("localizacao")
+    real = (
+        df["anomalia_detectada"].astype(bool)
+        & (df["tipo_anomalia"] != "Desvio Estatístico")
+        & (df["timestamp"] >= day_start)
+    )
+    latest["anomalias_abertas"] = real.groupby(df["localizacao"]).sum().astype(int)
+    return latest
+
+
+def merge_latest(parts):
+    """Combine latest_per_sector() results of several chunks: newest row wins, counts add up."""
+    combined = pd.concat(parts)
+    counts = combined.groupby(level=0)["anomalias_abertas"].sum()
+    latest = combined.sort_values("timestamp").groupby(level=0).tail(1)
+    latest["anomalias_abertas"] = counts
+    return latest
+
+
+class AirQualityPipeline:
+    def __init__(self, sectors=None, db=None, connect=True):
+        self.detector = self.new_detector()
+        self.retrain_enabled = True
+        self.last_retrain_time = datetime.min
+        self.watermark = None  # newest raw timestamp processed so far
+        # Sharded mode: restrict the pipeline to a subset of `localizacao` values
+        self.sectors = list(sectors) if sectors is not None else None
+
+        self.db = db
+        self.forecaster = None
+        self.alerts = None
+        self.geo_indexes_ready = False
+        if db is None and not connect:
+            return  # offline use (e.g. rescore.py): scoring methods only
+
+        if db is None:
+            try:
+                self.db = mongo.get_database("atlas", workload="analytics")
+                self.db.client.admin.command("ping")
+                logger.info("✅ Pipeline connected to MongoDB.")
+            except Exception as e:
+                logger.error(f"❌ Critical Mongo error: {e}")
+                sys.exit(1)
+
+        self.alerts = AlertManager(
+            self.db, scope="all" if self.sectors is None else ",".join(self.sectors)
+        )
+
+        if CONFIG["FORECAST_ENABLED"]:
+            from forecast import ForecastService
+
+            self.forecaster = ForecastService(self.db, sectors=self.sectors)
+
+    def _sector_query(self):
+        """Mongo filter restricting reads/deletes to the assigned sectors."""
+        if self.sectors is None:
+            return {}
+        return {"localizacao": {"$in": self.sectors}}
+
+    def get_data(self):
+        """Read raw data generated by the simulator."""
+        try:
+            if CONFIG["RAW_BUCKETS"]:
+                # Buckets unpack straight into column arrays, no per-reading documents
+                df = buckets.read_latest(
+                    self.db[CONFIG["MONGO_COLLECTION_RAW_BUCKETS"]], "raw",
+                    self._sector_query(), CONFIG["MAX_BATCH_ROWS"],
+                )
+                return None if df.empty else self.clean_raw(df)
+
+            collection = self.db[CONFIG["MONGO_COLLECTION_RAW"]]
+
+            cursor = (
+                collection.find(self._sector_query(), {"_id": 0})
+                .sort("timestamp", -1)
+                .limit(CONFIG["MAX_BATCH_ROWS"])
+            )
+            df = pd.DataFrame(list(cursor))
+
+            if df.empty:
+                return None
+
+            return self.clean_raw(df)
+        except Exception as e:
+            logger.error(f"Error reading data: {e}")
+            return None
+
+    def iter_raw_chunks(self, chunk_size):
+        """
+        Newest-first raw readings as cleaned DataFrames of at most `chunk_size`
+        rows (about `chunk_size`, whole buckets, with the bucketed layout).
+        """
+        if CONFIG["RAW_BUCKETS"]:
+            for df in buckets.iter_latest(
+                self.db[CONFIG["MONGO_COLLECTION_RAW_BUCKETS"]], "raw",
+                self._sector_query(), chunk_size, CONFIG["MAX_BATCH_ROWS"],
+            ):
+                yield self.clean_raw(df)
+            return
+
+        cursor = (
+            self.db[CONFIG["MONGO_COLLECTION_RAW"]]
+            .find(self._sector_query(), {"_id": 0})
+            .sort("timestamp", -1)
+            .limit(CONFIG["MAX_BATCH_ROWS"])
+            .batch_size(chunk_size)
+        )
+        while True:
+            docs = list(itertools.islice(cursor, chunk_size))
+            if not docs:
+                return
+            df = pd.DataFrame(docs)
+            del docs
+            yield self.clean_raw(df)
+
+    @staticmethod
+    def clean_raw(df):
+        """Parse timestamps, enforce numeric types and sort chronologically."""
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        cols_num = ["temperatura", "humidade", "gases_ppm", "pm25"]
+        for col in cols_num:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+        return df.dropna(subset=cols_num).sort_values("timestamp")
+
+    def process_and_classify(self, df):
+        """
+        1. Create human-readable classification (Excellent/Good/Moderate/Poor)
+        2. Compute unified vectorial air quality index
+        3. Prepare temporal features
+        """
+
+        # Columns are added in place: callers hand over a frame they own
+        df["classificacao_ar"] = classify_quality(df["pm25"], df["gases_ppm"], df["temperatura"])
+        df["carga_poluente"] = vector_index(df["pm25"], df["gases_ppm"])
+
+        df["hora_do_dia"] = df["timestamp"].dt.hour
+        df["dia_da_semana"] = df["timestamp"].dt.weekday
+
+        return df
+
+    @staticmethod
+    def new_detector(kind=None):
+        """Anomaly detector of `kind` ([Detector] kind by default), see detectors.py."""
+        kind = kind or CONFIG["ANOMALY_DETECTOR"]
+        options = {
+            "inference": {
+                "chunk_size": CONFIG["INFERENCE_CHUNK_SIZE"],
+                "n_workers": CONFIG["INFERENCE_WORKERS"],
+                "backend": CONFIG["INFERENCE_BACKEND"],
+            }
+        }
+        if kind == "baseline":
+            options["compiled"] = CONFIG["COMPILED_INFERENCE"]
+        return make_detector(kind, **options)
+
+    def feed_detector(self, df):
+        # Each cycle re-reads the newest MAX_BATCH_ROWS; only rows past the
+        # watermark are new, so the rest must not be fed (and sampled) again
+        self.detector.update(df if self.watermark is None else df[df["timestamp"] > self.watermark])
+
+    def training_due(self):
+        minutes_since_train = (datetime.now() - self.last_retrain_time).total_seconds() / 60
+        return not self.detector.trained or (
+            self.retrain_enabled and minutes_since_train > CONFIG["RETRAIN_INTERVAL_MINUTES"]
+        )
+
+    def train_detector(self, df):
+        now = datetime.now()
+        minutes_since_train = (now - self.last_retrain_time).total_seconds() / 60
+        logger.info(
+            f"🧠 Training anomaly model [{self.detector.kind}] on {len(df)} rows "
+            f"(last train: {int(minutes_since_train)} min ago)..."
+        )
+        try:
+            self.detector.fit(df)
+            self.last_retrain_time = now
+        except Exception as e:
+            logger.error(f"Error training model: {e}")
+
+    def training_sample(self, chunk_size):
+        """
+        Uniform sample (at most TRAIN_SAMPLE_ROWS) of the whole cycle window,
+        built in one extra pass over the chunks, which also feeds the
+        detector. Chunks arrive newest first, so training on the first one
+        alone would only see the most recent hours.
+        """
+        reservoir = Reservoir(CONFIG["TRAIN_SAMPLE_ROWS"], len(TRAIN_COLUMNS))
+        for chunk in self.iter_raw_chunks(chunk_size):
+            if chunk.empty:
+                continue
+            chunk = self.process_and_classify(chunk)
+            self.feed_detector(chunk)
+            reservoir.add(chunk[TRAIN_COLUMNS].to_numpy(dtype=np.float64))
+        return pd.DataFrame(reservoir.sample(), columns=TRAIN_COLUMNS)
+
+    def detect_anomalies(self, df, train=True, update=True):
+        """
+        Detect anomalies with the configured detector: the RandomForest
+        baseline or the IsolationForest reservoir mode ([Detector] kind).
+        `train=False` scores with the current model even when a retrain is
+        due (chunked cycles train once, beforehand, on a sample).
+        """
+        if df.empty:
+            return df
+
+        detector = self.detector
+        if update:
+            self.feed_detector(df)
+        if train and self.training_due():
+            self.train_detector(df)
+
+        acima_padrao = None
+        if detector.trained:
+            df["carga_estimada"], df["desvio_modelo"], acima_padrao = detector.score(df)
+        else:
+            df["carga_estimada"] = df["carga_poluente"]
+            df["desvio_modelo"] = 0
+
+        df["anomalia_detectada"], df["tipo_anomalia"] = anomaly_labels(
+            df["desvio_modelo"], df["carga_poluente"], df["pm25"], df["gases_ppm"], df["hora_do_dia"],
+            acima_padrao,
+        )
+
+        return df
+
+    def save_to_mongo(self, df):
+        """Persist processed DataFrame in analytics collection."""
+        try:
+            coll = self.db[CONFIG["MONGO_COLLECTION_ANALYTICS"]]
+            coll.delete_many(self._sector_query())
+
+            total = 0
+            for records in iter_record_batches(df, exclude=DERIVED_COLUMNS):
+                coll.insert_many(records)
+                total += len(records)
+            if total:
+                logger.info(f"💾 Analytics: {total} registros atualizados.")
+        except Exception as e:
+            logger.error(f"Error saving to Mongo: {e}")
+
+    def add_geohash(self, df):
+        """Bucket each reading by the geohash of its real latitude/longitude."""
+        if "latitude" not in df.columns or "longitude" not in df.columns:
+            return df
+        df["latitude"] = pd.to_numeric(df["latitude"], errors="coerce")
+        df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
+        has_coords = df["latitude"].notna() & df["longitude"].notna()
+        df["geohash"] = None
+        df.loc[has_coords, "geohash"] = geo.encode(
+            df.loc[has_coords, "latitude"], df.loc[has_coords, "longitude"], CONFIG["GEOHASH_PRECISION"]
+        )
+        return df
+
+    def save_geo_cells(self, df):
+        """Pre-aggregate the latest window per geohash cell for the dashboard map."""
+        if "geohash" not in df.columns:
+            return
+        try:
+            coll = self.db[CONFIG["MONGO_COLLECTION_CELLS"]]
+            if not self.geo_indexes_ready:
+                coll.create_index([("centro", pymongo.GEOSPHERE)])
+                self.db[CONFIG["MONGO_COLLECTION_ANALYTICS"]].create_index("geohash")
+                self.geo_indexes_ready = True
+
+            cells = geo.aggregate_cells(
+                df, CONFIG["GEOHASH_PRECISION"], CONFIG["GEO_CELL_WINDOW_MINUTES"]
+            )
+            scope = {} if self.sectors is None else {"setores": {"$in": self.sectors}}
+            coll.delete_many(scope)
+            records = cells.to_dict("records")
+            if records:
+                coll.insert_many(records)
+                logger.info(f"🗺️ Mapa: {len(records)} células agregadas.")
+        except Exception as e:
+            logger.error(f"Error saving geo cells: {e}")
+
+    def save_latest_state(self, latest):
+        """Upsert one document per sector (_id = localizacao) into the latest-state collection."""
+        if latest is None or latest.empty:
+            return
+        try:
+            coll = self.db[CONFIG["MONGO_COLLECTION_LATEST"]]
+            now = datetime.now()
+            latest = latest.reset_index()
+            for batch in iter_record_batches(latest):
+                for doc in batch:
+                    if self.alerts is not None and doc["localizacao"] in self.alerts.states:
+                        doc["estado_alerta"] = self.alerts.states[doc["localizacao"]]["estado"]
+                    doc["atualizado_em"] = now
+                    coll.update_one({"_id": doc["localizacao"]}, {"$set": doc}, upsert=True)
+            logger.info(f"📌 Estado atual: {len(latest)} setores atualizados.")
+        except Exception as e:
+            logger.error(f"Error saving latest state: {e}")
+
+    def send_email(self, subject, html):
+        """Send an HTML e-mail to the configured receivers. Returns True on success."""
+        msg = MIMEMultipart()
+        msg["From"] = CONFIG["EMAIL_SENDER"]
+        msg["To"] = ", ".join(CONFIG["EMAIL_RECEIVER"])
+        msg["Subject"] = subject
+        msg.attach(MIMEText(html, "html"))
+
+        try:
+            server = smtplib.SMTP(CONFIG["SMTP_SERVER"], CONFIG["SMTP_PORT"])
+            server.starttls()
+            server.login(CONFIG["EMAIL_SENDER"], CONFIG["EMAIL_PASSWORD"])
+            server.sendmail(CONFIG["EMAIL_SENDER"], CONFIG["EMAIL_RECEIVER"], msg.as_string())
+            server.quit()
+
+            logger.info("✅ E-mail enviado com sucesso.")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send email: {e}")
+            return False
+
+    def process_alerts(self, df):
+        """Feed unseen readings to the per-sector alert states and send the digest when due."""
+        if self.alerts is None or df.empty:
+            return
+        try:
+            self.alerts.observe(df)
+            self.alerts.flush(self.send_email)
+        except Exception as e:
+            logger.error(f"Error processing alerts: {e}")
+
+    def run_cycle(self):
+        if self.alerts is not None:
+            self.alerts.begin_cycle()
+        if CONFIG["PROCESSING_CHUNK_SIZE"] > 0:
+            return self.run_cycle_chunked()
+
+        df = self.get_data()
+        if df is None:
+            return None
+
+        df = self.process_and_classify(df)
+        df = self.detect_anomalies(df)
+
+        anomalies = int(df["anomalia_detectada"].sum())
+        if anomalies:
+            logger.warning(f"⚠️ {anomalies} anomalias detectadas no lote.")
+        self.process_alerts(df)
+
+        df = self.add_geohash(df)
+        self.save_to_mongo(df)
+        self.save_geo_cells(df)
+        self.save_latest_state(latest_per_sector(df, df["timestamp"].max().normalize()))
+
+        if self.forecaster is not None:
+            self.forecaster.sectors = self.sectors
+            self.forecaster.run()
+
+        return df
+
+    def run_cycle_chunked(self):
+        """
+        Same cycle as run_cycle, streamed in chunks of PROCESSING_CHUNK_SIZE
+        rows (read -> classify -> detect -> save), so peak memory follows the
+        chunk size instead of the batch size. Only readings the alert states
+        have not seen yet and the rows inside the geo-cell window are kept
+        across chunks; the latter are returned. When a retrain is due, an
+        extra pass first draws the detector's training sample (at most
+        TRAIN_SAMPLE_ROWS) from the whole window.
+        """
+        chunk_size = CONFIG["PROCESSING_CHUNK_SIZE"]
+        window = pd.Timedelta(minutes=CONFIG["GEO_CELL_WINDOW_MINUTES"])
+        coll = self.db[CONFIG["MONGO_COLLECTION_ANALYTICS"]]
+
+        newest = None
+        recent, unseen, latest = [], [], []
+        total = anomalies = 0
+        try:
+            # Train once, before scoring, on a sample of every chunk
+            fed = self.training_due()
+            if fed:
+                sample = self.training_sample(chunk_size)
+                if not sample.empty:
+                    self.train_detector(sample)
+
+            for chunk in self.iter_raw_chunks(chunk_size):
+                if chunk.empty:
+                    continue
+                if newest is None:
+                    coll.delete_many(self._sector_query())
+                    newest = chunk["timestamp"].max()  # chunks arrive newest first
+
+                chunk = self.process_and_classify(chunk)
+                chunk = self.add_geohash(self.detect_anomalies(chunk, train=False, update=not fed))
+                for records in iter_record_batches(chunk, exclude=DERIVED_COLUMNS):
+                    coll.insert_many(records)
+                total += len(chunk)
+
+                flagged = chunk["anomalia_detectada"].to_numpy(dtype=bool)
+                anomalies += int(flagged.sum())
+                if self.alerts is not None:
+                    new = self.alerts.unseen(chunk[ALERT_COLUMNS])
+                    if not new.empty:
+                        unseen.append(new)
+
+                latest.append(latest_per_sector(chunk, newest.normalize()))
+
+                in_window = chunk["timestamp"] >= newest - window
+                if in_window.any():
+                    recent.append(chunk.loc[in_window].drop(columns=DERIVED_COLUMNS))
+        except Exception as e:
+            logger.error(f"Error in chunked cycle: {e}")
+
+        if total == 0:
+            return None
+        logger.info(f"💾 Analytics: {total} registros atualizados (blocos de {chunk_size}).")
+
+        if anomalies:
+            logger.warning(f"⚠️ {anomalies} anomalias detectadas no lote.")
+        if unseen:
+            self.process_alerts(pd.concat(unseen, ignore_index=True))
+
+        df = pd.concat(recent, ignore_index=True) if recent else pd.DataFrame()
+        if not df.empty:
+            self.save_geo_cells(df)
+        if latest:
+            self.save_latest_state(merge_latest(latest))
+
+        if self.forecaster is not None:
+            self.forecaster.sectors = self.sectors
+            self.forecaster.run()
+
+        return df
+
+    def count_raw_since(self, since, cap):
+        """Raw readings of the assigned sectors newer than `since` (all when None), capped at `cap`."""
+        query = self._sector_query()
+        if CONFIG["RAW_BUCKETS"]:
+            return buckets.count_since(
+                self.db[CONFIG["MONGO_COLLECTION_RAW_BUCKETS"]], query, since, cap
+            )
+        if since is not None:
+            query["timestamp"] = {"$gt": since}
+        return self.db[CONFIG["MONGO_COLLECTION_RAW"]].count_documents(query, limit=cap)
+
+    def count_backlog(self):
+        """Raw rows that arrived since the last cycle's watermark (capped at BACKLOG_HIGH to keep the count cheap)."""
+        return self.count_raw_since(self.watermark, CONFIG["BACKLOG_HIGH"])
+
+    def publish_metrics(self, metrics):
+        metrics["watermark"] = self.watermark
+        metrics["atualizado_em"] = datetime.now()
+        if self.watermark is not None:
+            # Data lag: how far behind "now" the newest processed reading is
+            metrics["data_lag_s"] = round((datetime.now() - self.watermark).total_seconds(), 1)
+        self.db[CONFIG["MONGO_COLLECTION_METRICS"]].update_one(
+            {"_id": "pipeline" if self.sectors is None else "pipeline:" + ",".join(self.sectors)},
+            {"$set": metrics},
+            upsert=True,
+        )
+
+    def _scheduled_cycle(self):
+        df = self.run_cycle()
+        if df is not None and not df.empty:
+            self.watermark = df["timestamp"].max().to_pydatetime()
+
+    def start(self):
+        logger.info("--- Optimized AI Pipeline Started ---")
+        scheduler = AdaptiveScheduler(
+            self._scheduled_cycle,
+            base_interval=CONFIG["UPDATE_INTERVAL"],
+            min_interval=CONFIG["MIN_INTERVAL"],
+            max_interval=CONFIG["MAX_INTERVAL"],
+            backlog_fn=self.count_backlog,
+            backlog_high=CONFIG["BACKLOG_HIGH"],
+            backlog_low=CONFIG["BACKLOG_LOW"],
+            on_metrics=self.publish_metrics,
+            name="pipeline",
+            logger=logger,
+        )
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            logger.info("Pipeline stopped.")
+
+
+if __name__ == "__main__":
+    pipeline = AirQualityPipeline()
+    pipeline.start()
+
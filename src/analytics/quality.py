@@ -0,0 +1,68 @@
+import numpy as np
+
+# ==============================================================================
+# ÍNDICE VETORIAL UNIFICADO
+# ==============================================================================
+
+LIMITE_PM = 35.0
+LIMITE_GAS = 500.0
+
+
+def vector_index(pm25, gases_ppm):
+    """
+    Unified vectorial pollution index (0-50 = within both limits, >100 = critical).
+    Works on scalars, NumPy arrays and pandas Series.
+    """
+    norm_pm = np.asarray(pm25, dtype=np.float64) / LIMITE_PM
+    norm_gas = np.asarray(gases_ppm, dtype=np.float64) / LIMITE_GAS
+    return np.round(np.sqrt(norm_pm**2 + norm_gas**2) * 50.0, 2)
+
+
+# ==============================================================================
+# CLASSIFICAÇÃO E REGRAS DE ANOMALIA (VETORIZADAS)
+# ==============================================================================
+
+
+def classify_quality(pm25, gases_ppm, temperatura):
+    """Human-readable class (Excelente/Boa/Moderada/Ruim) for whole columns at once."""
+    pm = np.asarray(pm25, dtype=np.float64)
+    gas = np.asarray(gases_ppm, dtype=np.float64)
+    temp = np.asarray(temperatura, dtype=np.float64)
+    return np.select(
+        [
+            (pm > 55) | (gas > 800) | (temp < 14) | (temp > 30),
+            ((pm > 35) & (pm <= 55)) | ((gas > 500) & (gas <= 800)),
+            ((pm >= 12) & (pm <= 35)) | ((gas >= 300) & (gas <= 500)),
+        ],
+        ["Ruim", "Moderada", "Boa"],
+        default="Excelente",
+    ).astype(object)
+
+
+def anomaly_labels(desvio_modelo, carga_poluente, pm25, gases_ppm, hora_do_dia, acima_padrao=None):
+    """
+    Anomaly flag and reason text per row:
+    deviation from the model above 25 (or the detector's own `acima_padrao`
+    flags), plus at most one of critical index > 100 / PM2.5 > 55 / gases > 800.
+    """
+    carga = np.asarray(carga_poluente, dtype=np.float64)
+    pm = np.asarray(pm25, dtype=np.float64)
+    gas = np.asarray(gases_ppm, dtype=np.float64)
+
+    if acima_padrao is None:
+        acima_padrao = np.asarray(desvio_modelo, dtype=np.float64) > 25.0
+    else:
+        acima_padrao = np.asarray(acima_padrao, dtype=bool)
+    limite = np.select(
+        [carga > 100, pm > 55, gas > 800],
+        ["Índice Vetorial Crítico", "Poeira Alta", "Gases Altos"],
+        default="",
+    ).astype(object)
+    tem_limite = limite != ""
+
+    horas = np.asarray(hora_do_dia).astype(np.int64).astype(str).astype(object)
+    padrao = "Poluição acima do padrão para " + horas + "h"
+
+    tipo = np.where(tem_limite, limite, "Normal").astype(object)
+    tipo = np.where(acima_padrao, np.where(tem_limite, padrao + ", " + limite, padrao), tipo)
+    return acima_padrao | tem_limite, tipo
@@ -0,0 +1,244 @@
+import os
+import sys
+import time
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pipeline import AirQualityPipeline, CONFIG, config, logger, mongo, iter_record_batches
+from detectors import BaselineDetector
+from archive import PARTITIONING, iter_range
+
+# ==============================================================================
+# RE-SCORING OFFLINE DE HISTÓRICO
+# ==============================================================================
+#
+# Streams a date range in bounded chunks, runs the same
+# classify -> index -> anomaly logic as AirQualityPipeline with one frozen
+# model, and writes the result to a versioned analytics collection or a
+# Parquet file. At most `workers * 2` chunks are in memory at once.
+
+RESCORE_CONFIG = {
+    "CHUNK_SIZE": config.getint("Rescore", "chunk_size", fallback=20000),
+    "WORKERS": config.getint("Rescore", "workers", fallback=0),
+    "TRAIN_ROWS": config.getint("Rescore", "train_rows", fallback=10000),
+    "COLLECTION_PREFIX": config.get(
+        "Rescore", "collection_prefix", fallback=CONFIG["MONGO_COLLECTION_ANALYTICS"]
+    ),
+}
+
+DROP_COLUMNS = ["hora_do_dia", "dia_da_semana"]
+
+
+# ==============================================================================
+# SOURCES
+# ==============================================================================
+
+
+def iter_mongo_chunks(start, end, chunk_size):
+    """Parquet archive batches, then hot-collection cursor batches (archive.iter_range)."""
+    for df in iter_range("sensores_atlas", start, end, chunk_size):
+        yield df.drop(columns=["_id"], errors="ignore")
+
+
+def iter_file_chunks(path, start, end, chunk_size):
+    """Parquet file / archive directory (pyarrow batches) or CSV (pandas chunksize)."""
+    if path.endswith(".csv"):
+        for chunk in pd.read_csv(path, chunksize=chunk_size, parse_dates=["timestamp"]):
+            chunk = chunk[(chunk["timestamp"] >= start) & (chunk["timestamp"] < end)]
+            if not chunk.empty:
+                yield chunk
+        return
+
+    partitioning = PARTITIONING if os.path.isdir(path) else None
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+    time_filter = (ds.field("timestamp") >= pa.scalar(start, type=pa.timestamp("us"))) & (
+        ds.field("timestamp") < pa.scalar(end, type=pa.timestamp("us"))
+    )
+    for batch in dataset.to_batches(filter=time_filter, batch_size=chunk_size):
+        if batch.num_rows:
+            yield batch.to_pandas().drop(columns=["_id", "date"], errors="ignore")
+
+
+# ==============================================================================
+# SINKS
+# ==============================================================================
+
+
+class MongoSink:
+    def __init__(self, version, start, end):
+        name = f"{RESCORE_CONFIG['COLLECTION_PREFIX']}_{version}"
+        self.coll = mongo.get_database("atlas", workload="analytics")[name]
+        self.version = version
+        self.coll.create_index("timestamp")
+        # Idempotent re-runs: replace this version's rows for the range
+        self.coll.delete_many({"timestamp": {"$gte": start, "$lt": end}})
+        self.target = name
+
+    def write(self, df):
+        for records in iter_record_batches(df):
+            self.coll.insert_many(records, ordered=False)
+
+    def close(self):
+        pass
+
+
+class ParquetSink:
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self.writer = None
+        self.target = path
+
+    def write(self, df):
+        if df.empty:
+            return
+        if self.writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        else:
+            df = df.reindex(columns=self.writer.schema.names)
+            table = pa.Table.from_pandas(df, preserve_index=False).cast(self.writer.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# ==============================================================================
+# WORKERS
+# ==============================================================================
+
+_WORKER_PIPELINE = None
+_WORKER_VERSION = None
+
+
+def _init_worker(detector, version):
+    global _WORKER_PIPELINE, _WORKER_VERSION
+    pipeline = AirQualityPipeline(connect=False)
+    pipeline.detector = detector.single_threaded()
+    pipeline.retrain_enabled = False  # frozen model for the whole run
+    _WORKER_PIPELINE = pipeline
+    _WORKER_VERSION = version
+
+
+def score_chunk(df):
+    pipeline = _WORKER_PIPELINE
+    df = AirQualityPipeline.clean_raw(df)
+    if df.empty:
+        return df
+    df = pipeline.process_and_classify(df)
+    df = pipeline.detect_anomalies(df)
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    df["versao_regras"] = _WORKER_VERSION
+    return df
+
+
+def load_model(path):
+    """Frozen baseline detector from a RandomForest .pkl or compiled .npz."""
+    if path.endswith(".npz"):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+        from common.forest import CompiledForest
+
+        return BaselineDetector(model=CompiledForest.load(path))
+
+    import joblib
+
+    return BaselineDetector(model=joblib.load(path))
+
+
+def train_on_sample(chunks, train_rows):
+    """Train the detector on the first `train_rows` rows; returns (detector, chunks incl. the buffered ones)."""
+    buffered, n_rows = [], 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        n_rows += len(chunk)
+        if n_rows >= train_rows:
+            break
+
+    if not buffered:
+        return None, iter(())
+
+    sample = AirQualityPipeline.clean_raw(pd.concat(buffered, ignore_index=True).head(train_rows))
+    trainer = AirQualityPipeline(connect=False)
+    trainer.detect_anomalies(trainer.process_and_classify(sample))
+    return trainer.detector, itertools.chain(buffered, chunks)
+
+
+def rescore(chunks, sink, detector=None, workers=0, train_rows=None):
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+
+    if detector is None:
+        detector, chunks = train_on_sample(chunks, train_rows or RESCORE_CONFIG["TRAIN_ROWS"])
+        if detector is None:
+            logger.warning("Nenhum dado no intervalo solicitado.")
+            return 0
+
+    total = anomalies = 0
+    in_flight = deque()
+
+    def drain_one():
+        nonlocal total, anomalies
+        df = in_flight.popleft().result()
+        sink.write(df)
+        total += len(df)
+        anomalies += int(df["anomalia_detectada"].sum()) if not df.empty else 0
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(detector, sink.version)
+    ) as executor:
+        for chunk in chunks:
+            in_flight.append(executor.submit(score_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    sink.close()
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"✅ Re-scoring concluído: {total} leituras, {anomalies} anomalias, "
+        f"{elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} leituras/s) -> {sink.target}"
+    )
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline historical re-scoring")
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat)
+    parser.add_argument("--end", required=True, type=datetime.fromisoformat)
+    parser.add_argument("--version", required=True, help="Rules/model version label, e.g. v2")
+    parser.add_argument("--input", help="Parquet file, archive directory or CSV (default: Mongo + archive)")
+    parser.add_argument("--output", help="Parquet file (default: versioned Mongo collection)")
+    parser.add_argument(
+        "--model", help="Frozen baseline model (.pkl or compiled .npz); default: train [Detector] kind on the first rows"
+    )
+    parser.add_argument("--chunk-size", type=int, default=RESCORE_CONFIG["CHUNK_SIZE"])
+    parser.add_argument("--workers", type=int, default=RESCORE_CONFIG["WORKERS"])
+    args = parser.parse_args()
+
+    if args.input:
+        source = iter_file_chunks(args.input, args.start, args.end, args.chunk_size)
+    else:
+        source = iter_mongo_chunks(args.start, args.end, args.chunk_size)
+
+    if args.output:
+        output = ParquetSink(args.output, args.version)
+    else:
+        output = MongoSink(args.version, args.start, args.end)
+
+    rescore(
+        source,
+        output,
+        detector=load_model(args.model) if args.model else None,
+        workers=args.workers,
+    )
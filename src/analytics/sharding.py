@@ -0,0 +1,285 @@
+import os
+import sys
+import time
+import zlib
+import socket
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from pipeline import AirQualityPipeline, CONFIG, config, logger, mongo
+
+# ==============================================================================
+# CONFIGURAÇÕES DE SHARDING
+# ==============================================================================
+
+# Explicit partition: shards separated by ";" and sectors by ",".
+# Example: "Setor Central,Setor Bueno; Setor Jaó; Jardim Goiás"
+_PARTITION_RAW = config.get("Sharding", "partition", fallback="").strip()
+EXPLICIT_PARTITION = [
+    [setor.strip() for setor in shard.split(",") if setor.strip()]
+    for shard in _PARTITION_RAW.split(";")
+    if shard.strip()
+]
+
+SHARD_CONFIG = {
+    "NUM_SHARDS": len(EXPLICIT_PARTITION) or config.getint("Sharding", "num_shards", fallback=4),
+    "WORKERS": config.getint("Sharding", "workers", fallback=2),
+    "LEASE_SECONDS": config.getint("Sharding", "lease_seconds", fallback=CONFIG["UPDATE_INTERVAL"] * 2),
+    "COLLECTION_SHARDS": mongo.COLLECTIONS["shards"][1],
+}
+
+
+def shard_of(setor, num_shards):
+    """Stable hash partition (crc32) of a sector name. Python's hash() is salted per process."""
+    return zlib.crc32(setor.encode("utf-8")) % num_shards
+
+
+class ShardPartition:
+    """Maps shard ids to the `localizacao` values they own."""
+
+    def __init__(self, num_shards, explicit=None):
+        self.num_shards = num_shards
+        self.explicit = explicit or []
+
+    def sectors_for(self, shard_id, known_sectors):
+        if self.explicit:
+            return list(self.explicit[shard_id])
+        return sorted(s for s in known_sectors if shard_of(s, self.num_shards) == shard_id)
+
+
+# ==============================================================================
+# WORKER
+# ==============================================================================
+
+
+class ShardWorker:
+    """
+    Runs get/classify/detect/save only for the shards it holds a lease on.
+
+    Leases, heartbeats and per-shard watermarks live in the shards collection,
+    so workers can join or leave at any time: each worker claims at most its
+    fair share of shards and expired leases are picked up by the survivors.
+    """
+
+    def __init__(self, worker_index):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{worker_index}"
+        self.partition = ShardPartition(SHARD_CONFIG["NUM_SHARDS"], EXPLICIT_PARTITION)
+        self.lease = timedelta(seconds=SHARD_CONFIG["LEASE_SECONDS"])
+        self.pipelines = {}
+
+        try:
+            self.db = mongo.get_database("atlas", workload="analytics")
+            self.db.client.admin.command("ping")
+        except Exception as e:
+            logger.error(f"❌ [{self.worker_id}] Critical Mongo error: {e}")
+            sys.exit(1)
+
+        self.shards = self.db[SHARD_CONFIG["COLLECTION_SHARDS"]]
+        # Sector discovery: both raw layouts keep `localizacao` at the top level
+        self.raw = self.db[
+            CONFIG["MONGO_COLLECTION_RAW_BUCKETS"] if CONFIG["RAW_BUCKETS"] else CONFIG["MONGO_COLLECTION_RAW"]
+        ]
+        self._ensure_shard_docs()
+
+    def _ensure_shard_docs(self):
+        for shard_id in range(self.partition.num_shards):
+            try:
+                self.shards.update_one(
+                    {"_id": f"shard:{shard_id}"},
+                    {
+                        "$setOnInsert": {
+                            "tipo": "shard",
+                            "owner": None,
+                            "lease_expires": datetime.min,
+                            "watermark": None,
+                        }
+                    },
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                pass  # another worker created it first
+
+    # --- membership ----------------------------------------------------------
+
+    def heartbeat(self):
+        now = datetime.utcnow()
+        self.shards.update_one(
+            {"_id": f"worker:{self.worker_id}"},
+            {"$set": {"tipo": "worker", "heartbeat": now}},
+            upsert=True,
+        )
+
+    def fair_share(self):
+        alive_since = datetime.utcnow() - self.lease
+        active = self.shards.count_documents({"tipo": "worker", "heartbeat": {"$gte": alive_since}})
+        active = max(active, 1)
+        return -(-self.partition.num_shards // active)  # ceil
+
+    def leave(self):
+        self.shards.update_many(
+            {"tipo": "shard", "owner": self.worker_id},
+            {"$set": {"owner": None, "lease_expires": datetime.min}},
+        )
+        self.shards.delete_one({"_id": f"worker:{self.worker_id}"})
+
+    # --- leases --------------------------------------------------------------
+
+    def owned_shards(self):
+        now = datetime.utcnow()
+        cursor = self.shards.find(
+            {"tipo": "shard", "owner": self.worker_id, "lease_expires": {"$gt": now}}
+        )
+        return sorted(int(doc["_id"].split(":")[1]) for doc in cursor)
+
+    def acquire(self, shard_id):
+        """Take (or renew) the lease if it is free, expired or already ours."""
+        now = datetime.utcnow()
+        doc = self.shards.find_one_and_update(
+            {
+                "_id": f"shard:{shard_id}",
+                "$or": [{"owner": self.worker_id}, {"lease_expires": {"$lt": now}}],
+            },
+            {"$set": {"owner": self.worker_id, "lease_expires": now + self.lease}},
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc
+
+    def release(self, shard_id):
+        self.shards.update_one(
+            {"_id": f"shard:{shard_id}", "owner": self.worker_id},
+            {"$set": {"owner": None, "lease_expires": datetime.min}},
+        )
+        self.pipelines.pop(shard_id, None)
+
+    def rebalance(self):
+        owned = self.owned_shards()
+        share = self.fair_share()
+
+        for shard_id in owned[share:]:
+            logger.info(f"↪️ [{self.worker_id}] Releasing shard {shard_id} (fair share = {share}).")
+            self.release(shard_id)
+        owned = owned[:share]
+
+        for shard_id in range(self.partition.num_shards):
+            if len(owned) >= share:
+                break
+            if shard_id not in owned and self.acquire(shard_id):
+                logger.info(f"🔒 [{self.worker_id}] Acquired shard {shard_id}.")
+                owned.append(shard_id)
+
+        return sorted(owned)
+
+    # --- processing ----------------------------------------------------------
+
+    def process_shard(self, shard_id, known_sectors):
+        doc = self.acquire(shard_id)  # renew before working
+        if doc is None:
+            logger.warning(f"[{self.worker_id}] Lost lease on shard {shard_id}.")
+            self.pipelines.pop(shard_id, None)
+            return
+
+        sectors = self.partition.sectors_for(shard_id, known_sectors)
+        if not sectors:
+            return
+
+        pipeline = self.pipelines.get(shard_id)
+        if pipeline is None:
+            pipeline = AirQualityPipeline(sectors=sectors, db=self.db)
+            self.pipelines[shard_id] = pipeline
+        pipeline.sectors = sectors
+
+        watermark = doc.get("watermark")
+        if watermark is not None and not pipeline.count_raw_since(watermark, 1):
+            logger.info(f"[{self.worker_id}] Shard {shard_id}: sem dados novos.")
+            return
+        pipeline.watermark = watermark
+
+        df = pipeline.run_cycle()
+        if df is None or df.empty:
+            return
+
+        new_watermark = df["timestamp"].max().to_pydatetime()
+        # Fenced write: only advance the watermark if we still own the lease
+        self.shards.update_one(
+            {"_id": f"shard:{shard_id}", "owner": self.worker_id},
+            {"$set": {"watermark": new_watermark}},
+        )
+
+    def run(self, stop_event=None):
+        logger.info(f"--- Shard worker {self.worker_id} started ---")
+        try:
+            while stop_event is None or not stop_event.is_set():
+                started = time.monotonic()
+                self.heartbeat()
+                owned = self.rebalance()
+
+                if owned:
+                    known_sectors = [] if EXPLICIT_PARTITION else self.raw.distinct("localizacao")
+                    for shard_id in owned:
+                        self.process_shard(shard_id, known_sectors)
+
+                elapsed = time.monotonic() - started
+                time.sleep(max(0.0, CONFIG["UPDATE_INTERVAL"] - elapsed))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.leave()
+            logger.info(f"Shard worker {self.worker_id} stopped.")
+
+
+def run_worker(worker_index):
+    ShardWorker(worker_index).run()
+
+
+# ==============================================================================
+# COORDINATOR
+# ==============================================================================
+
+
+def start_coordinator(num_workers):
+    """Spawn N worker processes and restart any that die."""
+    logger.info(
+        f"--- Sharded pipeline: {num_workers} workers / {SHARD_CONFIG['NUM_SHARDS']} shards ---"
+    )
+    processes = {}
+
+    def spawn(index):
+        proc = multiprocessing.Process(target=run_worker, args=(index,), name=f"shard-worker-{index}")
+        proc.start()
+        processes[index] = proc
+
+    for index in range(num_workers):
+        spawn(index)
+
+    try:
+        while True:
+            time.sleep(5)
+            for index, proc in list(processes.items()):
+                if not proc.is_alive():
+                    logger.warning(f"⚠️ Worker {index} exited (code {proc.exitcode}). Restarting...")
+                    spawn(index)
+    except KeyboardInterrupt:
+        logger.info("Stopping workers...")
+        for proc in processes.values():
+            proc.join(timeout=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded AirQualityPipeline coordinator")
+    parser.add_argument("--workers", type=int, default=SHARD_CONFIG["WORKERS"])
+    parser.add_argument(
+        "--worker-only",
+        type=int,
+        metavar="INDEX",
+        help="Run a single worker in this process (e.g. on another host)",
+    )
+    args = parser.parse_args()
+
+    if args.worker_only is not None:
+        run_worker(args.worker_only)
+    else:
+        start_coordinator(args.workers)
@@ -0,0 +1,333 @@
+import os
+import configparser
+from datetime import timedelta
+
+import pandas as pd
+
+from common import mongo
+
+# ==============================================================================
+# BUCKETED TIME-SERIES LAYOUT FOR RAW READINGS
+# ==============================================================================
+#
+# Optional storage layout: one document per series (sector / device) and time
+# bucket instead of one document per reading. Static metadata is stored once
+# per bucket and readings are appended as parallel column arrays:
+#
+#   {"localizacao": "Setor Central", "inicio": <bucket start>, "n": 12,
+#    "primeiro": <oldest reading>, "ultimo": <newest reading>,
+#    "meta": {"latitude": ..., "longitude": ..., "origem_dado": ...},
+#    "t": [<timestamps>], "v": {"pm25": [...], "gases_ppm": [...], ...},
+#    "outros": [<fields outside the layout, or null>]}
+#
+# Every $push appends to all columns (null where a reading lacks a field), so
+# position i of every array is reading i. A bucket never holds more than
+# `max_readings`: a batch that does not fit in the open bucket of its period
+# opens a new document. (series, inicio) is deliberately not unique, since a
+# busy period spans several buckets, so two writers (scaled-out bridges) that
+# both open the first bucket of a period at the same moment each create one.
+# Readers take any number of buckets per period; the cost is only a
+# half-filled extra document.
+
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+BUCKET_CONFIG = {
+    # Logical raw collections (common/mongo.py) stored as buckets, e.g. "raw, iot_raw"
+    "COLLECTIONS": {
+        name.strip() for name in config.get("Buckets", "collections", fallback="").split(",") if name.strip()
+    },
+    "BUCKET_MINUTES": config.getint("Buckets", "bucket_minutes", fallback=60),
+    "MAX_READINGS": config.getint("Buckets", "max_readings", fallback=1000),
+}
+
+# Per raw collection: series key, time field, static metadata and measurement columns
+LAYOUTS = {
+    "raw": {
+        "series": "localizacao",
+        "time": "timestamp",
+        "meta": ["latitude", "longitude", "origem_dado"],
+        "fields": ["temperatura", "humidade", "gases_ppm", "pm25"],
+        "default_series": None,
+    },
+    "iot_raw": {
+        "series": "dispositivo",
+        "time": "received_at",
+        "meta": [],
+        "fields": ["timestamp", "temperatura", "humidade", "gases_ppm", "pm25"],
+        "default_series": "desconhecido",
+    },
+    "local_sensores": {
+        "series": "dispositivo",
+        "time": "created_at",
+        "meta": [],
+        "fields": ["temperatura", "umidade_ar", "umidade_solo"],
+        "default_series": "http",
+    },
+}
+
+
+def enabled(name):
+    return name in BUCKET_CONFIG["COLLECTIONS"]
+
+
+def get_collection(name, workload="analytics", appname=None):
+    return mongo.get_collection(f"{name}_buckets", workload, appname)
+
+
+def bucket_start(ts):
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    width = timedelta(minutes=BUCKET_CONFIG["BUCKET_MINUTES"])
+    return day + ((ts - day) // width) * width
+
+
+# ==============================================================================
+# WRITE
+# ==============================================================================
+
+
+class BucketWriter:
+    """
+    Appends readings to the bucket collection of `name` with one $push
+    upsert per (series, bucket) group. insert_one / insert_many mirror the
+    Collection calls for writers that do not use the result.
+    """
+
+    def __init__(self, name, workload="ingest", appname=None, coll=None):
+        self.layout = LAYOUTS[name]
+        self.coll = coll if coll is not None else get_collection(name, workload, appname)
+        self.known = {"_id", self.layout["series"], self.layout["time"], *self.layout["meta"], *self.layout["fields"]}
+        self.indexes_ready = False
+
+    def ensure_indexes(self):
+        if not self.indexes_ready:
+            self.coll.create_index([(self.layout["series"], 1), ("inicio", 1)])
+            self.coll.create_index([("ultimo", -1)])
+            self.indexes_ready = True
+
+    def append(self, docs):
+        """Append readings; returns the number of bucket upserts issued."""
+        self.ensure_indexes()
+        series, time_field = self.layout["series"], self.layout["time"]
+        max_readings = BUCKET_CONFIG["MAX_READINGS"]
+
+        groups = {}
+        for doc in docs:
+            key = (doc.get(series) or self.layout["default_series"], bucket_start(doc[time_field]))
+            groups.setdefault(key, []).append(doc)
+
+        # Groups larger than a bucket are pushed in bucket-sized slices
+        batches = [
+            (key, rows[i : i + max_readings]) for key, rows in groups.items() for i in range(0, len(rows), max_readings)
+        ]
+        for (serie, inicio), rows in batches:
+            times = [row[time_field] for row in rows]
+            push = {"t": {"$each": times}}
+            for field in self.layout["fields"]:
+                push[f"v.{field}"] = {"$each": [row.get(field) for row in rows]}
+            push["outros"] = {
+                "$each": [{k: v for k, v in row.items() if k not in self.known} or None for row in rows]
+            }
+            self.coll.update_one(
+                # only a bucket with room for the whole slice takes it
+                {series: serie, "inicio": inicio, "n": {"$lte": max_readings - len(rows)}},
+                {
+                    "$push": push,
+                    "$inc": {"n": len(rows)},
+                    "$min": {"primeiro": min(times)},
+                    "$max": {"ultimo": max(times)},
+                    "$setOnInsert": {"meta": {m: rows[0].get(m) for m in self.layout["meta"]}},
+                },
+                upsert=True,
+            )
+        return len(batches)
+
+    def insert_one(self, doc):
+        self.append([doc])
+
+    def insert_many(self, docs):
+        self.append(docs)
+
+
+# ==============================================================================
+# READ
+# ==============================================================================
+
+
+def unpack(buckets, name, with_ids=False):
+    """
+    Bucket documents -> one DataFrame row per reading. Columns are extended
+    array by array (no per-reading dicts); with_ids adds a stable string
+    `_id` ("<bucket id>:<position>") for de-duplication.
+    """
+    layout = LAYOUTS[name]
+    series, time_field = layout["series"], layout["time"]
+    columns = {c: [] for c in [time_field, series, *layout["meta"], *layout["fields"]]}
+    ids, extras = [], []
+
+    for bucket in buckets:
+        n = len(bucket["t"])
+        columns[time_field].extend(bucket["t"])
+        columns[series].extend([bucket[series]] * n)
+        meta = bucket.get("meta") or {}
+        for field in layout["meta"]:
+            columns[field].extend([meta.get(field)] * n)
+        values = bucket.get("v") or {}
+        for field in layout["fields"]:
+            column = values.get(field) or []
+            columns[field].extend(column[:n] + [None] * (n - len(column)))
+        outros = bucket.get("outros") or []
+        extras.extend(outros[:n] + [None] * (n - len(outros)))
+        if with_ids:
+            ids.extend(f"{bucket['_id']}:{i}" for i in range(n))
+
+    if not columns[time_field]:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(columns)
+    df[time_field] = pd.to_datetime(df[time_field])
+    if any(extra for extra in extras):
+        df = pd.concat([df, pd.DataFrame([extra or {} for extra in extras])], axis=1)
+    if with_ids:
+        df.insert(0, "_id", ids)
+    return df
+
+
+def iter_latest(coll, name, query=None, chunk_size=10000, limit=0):
+    """
+    Newest-first readings as DataFrames of `chunk_size` rows, stopping after
+    `limit` rows (0 = all). Buckets of different series overlap in time, so
+    a chunk is only emitted once no bucket still unread can hold a newer
+    reading (every unread bucket has `ultimo` <= the current one's).
+    """
+    time_field = LAYOUTS[name]["time"]
+    cursor = coll.find(query or {}).sort("ultimo", -1)
+
+    buffer, pending, rows, total = pd.DataFrame(), [], 0, 0
+
+    def take(ready_before=None):
+        nonlocal buffer, pending, total
+        if pending:
+            buffer = pd.concat([buffer, unpack(pending, name)], ignore_index=True)
+            buffer = buffer.sort_values(time_field, ascending=False, ignore_index=True)
+            pending = []
+        ready = len(buffer) if ready_before is None else int((buffer[time_field] > ready_before).sum())
+        while ready and (ready >= chunk_size or ready_before is None):
+            n = min(chunk_size, ready, limit - total) if limit else min(chunk_size, ready)
+            yield buffer.iloc[:n].reset_index(drop=True)
+            buffer = buffer.iloc[n:].reset_index(drop=True)
+            ready -= n
+            total += n
+            if limit and total >= limit:
+                return
+
+    for bucket in cursor:
+        if rows >= chunk_size:
+            yield from take(pd.Timestamp(bucket["ultimo"]))
+            if limit and total >= limit:
+                return
+            rows = len(buffer)
+        pending.append(bucket)
+        rows += len(bucket["t"])
+
+    yield from take()
+
+
+def read_latest(coll, name, query=None, limit=0):
+    """The `limit` newest readings (0 = all) as one DataFrame."""
+    frames = list(iter_latest(coll, name, query, chunk_size=limit or 10000, limit=limit))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def count_since(coll, query=None, since=None, cap=0):
+    """
+    Readings newer than `since` (all when None), counted inside the buckets.
+    With `cap`, at most `cap` buckets are scanned and the result is capped.
+    """
+    match = dict(query or {})
+    if since is not None:
+        match["ultimo"] = {"$gt": since}
+    pipeline = [{"$match": match}]
+    if cap:
+        pipeline.append({"$limit": cap})
+    if since is not None:
+        newer = {"$size": {"$filter": {"input": "$t", "as": "ts", "cond": {"$gt": ["$$ts", since]}}}}
+    else:
+        newer = "$n"
+    pipeline += [{"$project": {"k": newer}}, {"$group": {"_id": None, "total": {"$sum": "$k"}}}]
+
+    doc = next(iter(coll.aggregate(pipeline)), None)
+    total = doc["total"] if doc else 0
+    return min(total, cap) if cap else total
+
+
+def _range_query(layout, start, end, query):
+    """(bucket query, post-unpack filters): the series field is filtered in MongoDB, others after."""
+    mongo_query = {"primeiro": {"$lt": end}, "ultimo": {"$gte": start}}
+    post = {}
+    for field, value in (query or {}).items():
+        if isinstance(value, dict) and set(value) != {"$in"}:
+            raise ValueError(f"Unsupported operator for bucketed data: {field}={value}")
+        if field == layout["series"]:
+            mongo_query[field] = value
+        else:
+            post[field] = value
+    return mongo_query, post
+
+
+def _range_filter(df, layout, start, end, post):
+    if df.empty:
+        return df
+    times = df[layout["time"]]
+    mask = ((times >= start) & (times < end)).to_numpy()
+    for field, value in post.items():
+        if field not in df.columns:
+            mask[:] = False
+        elif isinstance(value, dict):
+            mask &= df[field].isin(value["$in"]).to_numpy()
+        else:
+            mask &= (df[field] == value).to_numpy()
+    return df[mask].reset_index(drop=True)
+
+
+def find_range(coll, name, start, end, query=None, with_ids=False):
+    """
+    Readings in [start, end). `query` supports equality and $in filters; the
+    series field is filtered in MongoDB, other fields after unpacking.
+    """
+    layout = LAYOUTS[name]
+    mongo_query, post = _range_query(layout, start, end, query)
+    return _range_filter(unpack(coll.find(mongo_query), name, with_ids=with_ids), layout, start, end, post)
+
+
+def iter_range(coll, name, start, end, query=None, with_ids=False, chunk_size=10000):
+    """
+    find_range as a stream: DataFrames of about `chunk_size` readings (whole
+    buckets are unpacked together), not time-ordered across chunks.
+    """
+    layout = LAYOUTS[name]
+    mongo_query, post = _range_query(layout, start, end, query)
+    cursor = coll.find(mongo_query).batch_size(max(1, chunk_size // BUCKET_CONFIG["MAX_READINGS"]))
+
+    pending, rows = [], 0
+    for bucket in cursor:
+        pending.append(bucket)
+        rows += len(bucket["t"])
+        if rows >= chunk_size:
+            df = _range_filter(unpack(pending, name, with_ids=with_ids), layout, start, end, post)
+            if not df.empty:
+                yield df
+            pending, rows = [], 0
+    if pending:
+        df = _range_filter(unpack(pending, name, with_ids=with_ids), layout, start, end, post)
+        if not df.empty:
+            yield df
+
+
+def oldest(coll):
+    """Time of the oldest reading still in the bucket collection (None when empty)."""
+    doc = coll.find_one({}, {"primeiro": 1}, sort=[("primeiro", 1)])
+    return doc["primeiro"] if doc else None
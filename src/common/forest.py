@@ -0,0 +1,172 @@
+import sys
+
+import numpy as np
+
+# ==============================================================================
+# COMPILED FORESTS (NUMPY-ONLY INFERENCE)
+# ==============================================================================
+#
+# A fitted RandomForestRegressor is flattened into a handful of arrays
+# (feature, threshold, left/right child and leaf value per node, plus the
+# root node of each tree). Scoring then needs nothing but NumPy, so the
+# simulator and scoring workers can run without scikit-learn installed.
+#
+# scikit-learn compares `float32(x) <= threshold` in double precision; the
+# evaluator below does the same, and averages the trees in estimator order,
+# so predictions match `model.predict`.
+
+# Samples scored per block; bounds the (n_trees x block) node-index matrix.
+BLOCK_SIZE = 8192
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_outputs(self):
+        return self.value.shape[1]
+
+    def _as_matrix(self, X):
+        if hasattr(X, "columns") and self.feature_names is not None:
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X.astype(np.float64)
+
+    def _predict_block(self, X):
+        n_samples, n_features = X.shape
+        X_flat = X.ravel()
+        row_offset = (np.arange(n_samples) * n_features)[None, :]
+
+        nodes = np.repeat(self.roots[:, None], n_samples, axis=1)
+        for _ in range(self.max_depth):
+            x = X_flat[row_offset + self.feature[nodes]]
+            nodes = np.where(x <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+
+        leaf_values = self.value[nodes]  # (n_trees, n_samples, n_outputs)
+        out = np.zeros((n_samples, self.n_outputs), dtype=np.float64)
+        for tree_values in leaf_values:
+            out += tree_values
+        out /= self.n_trees
+        return out
+
+    def predict(self, X):
+        X = self._as_matrix(X)
+        out = np.empty((X.shape[0], self.n_outputs), dtype=np.float64)
+        for start in range(0, X.shape[0], BLOCK_SIZE):
+            out[start:start + BLOCK_SIZE] = self._predict_block(X[start:start + BLOCK_SIZE])
+        return out[:, 0] if self.n_outputs == 1 else out
+
+    def save(self, path):
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "roots": self.roots,
+            "max_depth": np.array(self.max_depth),
+        }
+        if self.feature_names is not None:
+            arrays["feature_names"] = np.array(self.feature_names, dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            feature_names = data["feature_names"].tolist() if "feature_names" in data.files else None
+            return cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                value=data["value"],
+                roots=data["roots"],
+                max_depth=data["max_depth"],
+                feature_names=feature_names,
+            )
+
+
+def compile_forest(model):
+    """
+    Flatten a fitted scikit-learn forest regressor into a CompiledForest.
+
+    Leaves point to themselves on both sides (feature 0, threshold +inf), so
+    the evaluator can walk every tree a fixed `max_depth` steps without
+    masking finished samples.
+
+    A TransformedTargetRegressor with a StandardScaler target is unwrapped:
+    the inverse scaling is linear, so it commutes with the tree average and
+    is folded into the compiled leaf values (the fitted model is untouched).
+    """
+    scale, shift = 1.0, 0.0
+    if hasattr(model, "regressor_"):
+        transformer = model.transformer_
+        if not hasattr(transformer, "scale_"):
+            raise ValueError(f"Only StandardScaler target transforms can be compiled, got {transformer!r}")
+        scale = transformer.scale_ if transformer.scale_ is not None else 1.0
+        shift = transformer.mean_ if transformer.mean_ is not None else 0.0
+        model = model.regressor_
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+        own_index = np.arange(n_nodes)
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+        lefts.append((np.where(is_leaf, own_index, tree.children_left) + offset).astype(np.int32))
+        rights.append((np.where(is_leaf, own_index, tree.children_right) + offset).astype(np.int32))
+        values.append(tree.value[:, :, 0].astype(np.float64))
+        roots.append(offset)
+
+        offset += n_nodes
+        max_depth = max(max_depth, tree.max_depth)
+
+    feature_names = getattr(model, "feature_names_in_", None)
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values) * scale + shift,
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max_depth,
+        feature_names=feature_names,
+    )
+
+
+def export_model_file(pkl_path, npz_path=None):
+    """Compile a joblib-pickled forest to the .npz format (needs scikit-learn)."""
+    import joblib
+
+    npz_path = npz_path or pkl_path.rsplit(".", 1)[0] + ".npz"
+    compile_forest(joblib.load(pkl_path)).save(npz_path)
+    return npz_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python src/common/forest.py model_twin.pkl [model_pm25.pkl ...]")
+        sys.exit(1)
+
+    for pkl_file in sys.argv[1:]:
+        print(f"📦 {pkl_file} -> {export_model_file(pkl_file)}")
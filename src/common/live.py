@@ -0,0 +1,130 @@
+import os
+import time
+import queue
+import logging
+import threading
+import configparser
+from datetime import datetime
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from common import mongo
+
+# ==============================================================================
+# SHARED TAIL OF THE LATEST-STATE COLLECTION
+# ==============================================================================
+#
+# One background tail of Estado_Atual_Setores per process, used by the SSE
+# endpoint (ingestion/live_api.py) and the dashboard's live mode. Subscribers
+# get a bounded queue of updated sector documents.
+
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+LIVE_CONFIG = {
+    "POLL_SECONDS": config.getint("Live", "poll_seconds", fallback=5),
+    "HEARTBEAT_SECONDS": config.getint("Live", "heartbeat_seconds", fallback=15),
+    "CLIENT_QUEUE_SIZE": config.getint("Live", "client_queue_size", fallback=100),
+}
+
+logger = logging.getLogger(__name__)
+
+
+class LiveFeed:
+    """
+    One background tail of Estado_Atual_Setores per process, fanned out to
+    every connected client, so N viewers cost one change stream (or one poll
+    loop) instead of N. Change streams need a replica set (Atlas has one);
+    elsewhere it falls back to polling `atualizado_em`. The tail stops when
+    the last client leaves.
+    """
+
+    def __init__(self, coll):
+        self.coll = coll
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=LIVE_CONFIG["CLIENT_QUEUE_SIZE"])
+        with self.lock:
+            self.clients.add(q)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+                self.thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.clients.discard(q)
+
+    def publish(self, doc):
+        with self.lock:
+            clients = list(self.clients)
+        for q in clients:
+            try:
+                q.put_nowait(doc)
+            except queue.Full:
+                # Too slow: end its stream (None); the subscriber re-subscribes and takes a fresh snapshot
+                self.unsubscribe(q)
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+
+    def _active(self):
+        with self.lock:
+            if not self.clients:
+                if self.thread is threading.current_thread():
+                    self.thread = None
+                return False
+            return True
+
+    def _run(self):
+        try:
+            while self._active():
+                try:
+                    self._watch()
+                except OperationFailure as e:
+                    logger.info(f"Change streams unavailable ({e}); polling every {LIVE_CONFIG['POLL_SECONDS']}s")
+                    self._poll()
+                except PyMongoError as e:
+                    logger.warning(f"Live feed interrupted: {e}")
+                    time.sleep(LIVE_CONFIG["POLL_SECONDS"])
+                except Exception as e:
+                    logger.warning(f"Change stream failed ({e}); polling every {LIVE_CONFIG['POLL_SECONDS']}s")
+                    self._poll()
+        finally:
+            with self.lock:
+                if self.thread is threading.current_thread():
+                    self.thread = None
+
+    def _watch(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        with self.coll.watch(
+            pipeline, full_document="updateLookup", max_await_time_ms=LIVE_CONFIG["POLL_SECONDS"] * 1000
+        ) as stream:
+            while self._active():
+                change = stream.try_next()
+                if change is not None and change.get("fullDocument"):
+                    self.publish(change["fullDocument"])
+
+    def _poll(self):
+        since = datetime.now()
+        while self._active():
+            for doc in self.coll.find({"atualizado_em": {"$gt": since}}).sort("atualizado_em", 1):
+                since = max(since, doc["atualizado_em"])
+                self.publish(doc)
+            time.sleep(LIVE_CONFIG["POLL_SECONDS"])
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_feed():
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            _feed = LiveFeed(mongo.get_collection("latest", workload="dashboard"))
+    return _feed
@@ -0,0 +1,159 @@
+import os
+import threading
+import configparser
+from urllib.parse import quote_plus
+
+from pymongo import MongoClient
+
+# ==============================================================================
+# SHARED MONGODB ACCESS LAYER
+# ==============================================================================
+#
+# One place for URIs, database/collection names and client settings. Clients
+# are cached per (process, target, workload), so every module in a process
+# shares the same connection pool instead of opening its own at import time.
+#
+#   from common.mongo import get_collection
+#   raw = get_collection("raw", workload="ingest")
+
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+
+def _atlas_uri():
+    # [MongoAtlas] uri lets tests / local runs point at a local mongod instead of Atlas
+    uri = config.get("MongoAtlas", "uri", fallback="").strip()
+    if uri:
+        return uri
+    user = quote_plus(config.get("MongoAtlas", "user", fallback=""))
+    password = quote_plus(config.get("MongoAtlas", "password", fallback=""))
+    cluster = config.get("MongoAtlas", "cluster", fallback="localhost")
+    return f"mongodb+srv://{user}:{password}@{cluster}/"
+
+
+# Deployments: target -> (uri, database)
+TARGETS = {
+    "atlas": (_atlas_uri(), config.get("MongoAtlas", "db_monitoramento", fallback="Monitoramento_do_Ar")),
+    "iot": (
+        config.get("MongoIot", "uri", fallback="mongodb://localhost:27017/"),
+        config.get("MongoIot", "db", fallback="iot_db"),
+    ),
+    "local": (
+        config.get("MongoLocal", "uri", fallback="mongodb://localhost:27017/"),
+        config.get("MongoLocal", "db", fallback="IOTIA2"),
+    ),
+}
+
+# Logical collection names -> (target, collection)
+COLLECTIONS = {
+    "raw": ("atlas", config.get("MongoAtlas", "collection_sensores", fallback="Leituras_Sensores")),
+    "analytics": ("atlas", config.get("MongoAtlas", "collection_analiticas", fallback="Leituras_Analiticas")),
+    "cells": ("atlas", config.get("MongoAtlas", "collection_celulas", fallback="Mapa_Celulas")),
+    "metrics": ("atlas", config.get("MongoAtlas", "collection_metricas", fallback="Pipeline_Metricas")),
+    "forecast": ("atlas", config.get("Forecast", "collection", fallback="Previsoes_Setores")),
+    "shards": ("atlas", config.get("Sharding", "collection_shards", fallback="Pipeline_Shards")),
+    "alerts": ("atlas", config.get("Alerts", "collection", fallback="Alertas_Estado")),
+    "latest": ("atlas", config.get("MongoAtlas", "collection_estado_atual", fallback="Estado_Atual_Setores")),
+    "iot_raw": ("iot", config.get("MongoIot", "collection_raw", fallback="leituras_brutas")),
+    "local_sensores": ("local", config.get("MongoLocal", "collection_sensores", fallback="sensores")),
+    # Bucketed layout of the raw collections (common/buckets.py)
+    "raw_buckets": ("atlas", config.get("Buckets", "collection_raw", fallback="Leituras_Sensores_Buckets")),
+    "iot_raw_buckets": ("iot", config.get("Buckets", "collection_iot_raw", fallback="leituras_brutas_buckets")),
+    "local_sensores_buckets": ("local", config.get("Buckets", "collection_local_sensores", fallback="sensores_buckets")),
+}
+
+
+def _write_concern(value):
+    return int(value) if value.isdigit() else value
+
+
+# Client settings per workload:
+#   ingest    - many small raw writes: large pool, w=1
+#   analytics - pipeline / batch jobs: small pool, w=majority
+#   dashboard - read-mostly (dashboard, export APIs): may read from secondaries
+WORKLOADS = {
+    name: {
+        "maxPoolSize": config.getint("MongoPool", f"{name}_max_pool_size", fallback=pool),
+        "minPoolSize": config.getint("MongoPool", "min_pool_size", fallback=0),
+        "w": _write_concern(config.get("MongoPool", f"{name}_write_concern", fallback=w)),
+        "readPreference": config.get("MongoPool", f"{name}_read_preference", fallback=read_pref),
+        "serverSelectionTimeoutMS": config.getint("MongoPool", "server_selection_timeout_ms", fallback=5000),
+        "connectTimeoutMS": config.getint("MongoPool", "connect_timeout_ms", fallback=5000),
+        "socketTimeoutMS": config.getint("MongoPool", f"{name}_socket_timeout_ms", fallback=socket_ms),
+        "maxIdleTimeMS": config.getint("MongoPool", "max_idle_time_ms", fallback=300000),
+        "retryWrites": True,
+    }
+    for name, pool, w, read_pref, socket_ms in [
+        ("ingest", 50, "1", "primary", 10000),
+        ("analytics", 10, "majority", "primary", 120000),
+        ("dashboard", 20, "majority", "primaryPreferred", 30000),
+    ]
+}
+
+_clients = {}
+_overrides = {}
+_lock = threading.Lock()
+
+
+def get_client(target="atlas", workload="analytics", appname=None):
+    """Pooled MongoClient for a deployment and workload, shared within the process."""
+    if target in _overrides:
+        return _overrides[target]
+
+    # PyMongo clients are not fork-safe: child processes get their own
+    key = (os.getpid(), target, workload, appname)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            options = dict(WORKLOADS[workload])
+            if appname:
+                options["appname"] = appname
+            client = MongoClient(TARGETS[target][0], **options)
+            _clients[key] = client
+    return client
+
+
+def get_database(target="atlas", workload="analytics", appname=None):
+    return get_client(target, workload, appname)[TARGETS[target][1]]
+
+
+def get_collection(name, workload="analytics", appname=None):
+    target, collection = COLLECTIONS[name]
+    return get_database(target, workload, appname)[collection]
+
+
+def get_async_client(target="atlas", workload="analytics", appname=None):
+    """
+    Async client with the same settings, for asyncio services. Uses PyMongo's
+    native AsyncMongoClient (PyMongo >= 4.10) or Motor. Not cached: async
+    clients are bound to the event loop they are created in.
+    """
+    try:
+        from pymongo import AsyncMongoClient
+    except ImportError:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+
+    options = dict(WORKLOADS[workload])
+    if appname:
+        options["appname"] = appname
+    return AsyncMongoClient(TARGETS[target][0], **options)
+
+
+def get_async_collection(client, name):
+    target, collection = COLLECTIONS[name]
+    return client[TARGETS[target][1]][collection]
+
+
+def use_client(target, client):
+    """Route every workload of `target` to `client` (e.g. mongomock or a local mongod in tests)."""
+    _overrides[target] = client
+
+
+def close_all():
+    with _lock:
+        for key, client in list(_clients.items()):
+            if key[0] == os.getpid():
+                client.close()
+            del _clients[key]
+        _overrides.clear()
@@ -0,0 +1,119 @@
+import math
+import time
+import logging
+
+# ==============================================================================
+# FIXED-RATE, LOAD-AWARE SCHEDULER
+# ==============================================================================
+#
+# Ticks are scheduled from the previous *scheduled* tick (not from when the
+# job finished), so the cadence does not drift by the job's run time. Jobs
+# never overlap: ticks that pass while a job is still running are skipped
+# and counted. With a `backlog_fn`, the interval halves while the backlog is
+# at or above `backlog_high`, grows by 1.5x while it is at or below
+# `backlog_low`, and otherwise drifts back towards `base_interval`. The
+# backlog is measured when the tick fires, before the job drains it, so it
+# reflects what arrived during the last interval.
+
+
+class AdaptiveScheduler:
+    def __init__(
+        self,
+        job,
+        base_interval,
+        min_interval=None,
+        max_interval=None,
+        backlog_fn=None,
+        backlog_high=500,
+        backlog_low=0,
+        on_metrics=None,
+        name="job",
+        logger=None,
+    ):
+        self.job = job
+        self.base_interval = float(base_interval)
+        self.min_interval = float(min_interval or base_interval)
+        self.max_interval = float(max_interval or base_interval)
+        self.backlog_fn = backlog_fn
+        self.backlog_high = backlog_high
+        self.backlog_low = backlog_low
+        self.on_metrics = on_metrics
+        self.name = name
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.interval = self.base_interval
+        self.metrics = {
+            "ticks": 0,
+            "skipped_ticks": 0,
+            "lag_s": 0.0,
+            "max_lag_s": 0.0,
+            "duration_s": 0.0,
+            "backlog": None,
+            "interval_s": self.interval,
+        }
+
+    def next_interval(self, backlog):
+        if backlog is None:
+            return self.interval
+        if backlog >= self.backlog_high:
+            return max(self.min_interval, self.interval / 2)
+        if backlog <= self.backlog_low:
+            return min(self.max_interval, self.interval * 1.5)
+        # Moderate load: move halfway back to the base cadence
+        return self.interval + (self.base_interval - self.interval) / 2
+
+    def tick(self, scheduled):
+        """Run one job at `scheduled` (monotonic time) and return the next tick time."""
+        started = time.monotonic()
+        lag = max(0.0, started - scheduled)
+
+        backlog = None
+        if self.backlog_fn is not None:
+            try:
+                backlog = self.backlog_fn()
+            except Exception as e:
+                self.logger.warning(f"[{self.name}] Could not measure backlog: {e}")
+
+        try:
+            self.job()
+        except Exception as e:
+            self.logger.error(f"[{self.name}] Job failed: {e}")
+        duration = time.monotonic() - started
+
+        self.interval = self.next_interval(backlog)
+        next_tick = scheduled + self.interval
+
+        now = time.monotonic()
+        skipped = 0
+        if now > next_tick:
+            skipped = math.ceil((now - next_tick) / self.interval)
+            next_tick += skipped * self.interval
+
+        self.metrics.update(
+            ticks=self.metrics["ticks"] + 1,
+            skipped_ticks=self.metrics["skipped_ticks"] + skipped,
+            lag_s=round(lag, 3),
+            max_lag_s=round(max(self.metrics["max_lag_s"], lag), 3),
+            duration_s=round(duration, 3),
+            backlog=backlog,
+            interval_s=round(self.interval, 1),
+        )
+        self.logger.info(
+            f"⏱️ [{self.name}] lag={lag:.2f}s run={duration:.2f}s backlog={backlog} "
+            f"next in {max(0.0, next_tick - now):.0f}s (interval {self.interval:.0f}s, skipped {skipped})"
+        )
+        if self.on_metrics is not None:
+            try:
+                self.on_metrics(dict(self.metrics))
+            except Exception as e:
+                self.logger.warning(f"[{self.name}] Could not publish metrics: {e}")
+
+        return next_tick
+
+    def run_forever(self):
+        next_tick = time.monotonic()
+        while True:
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_tick = self.tick(next_tick)
@@ -1,13 +1,17 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import pydeck as pdk
-from pymongo import MongoClient
-import urllib.parse
 from datetime import datetime, time, timedelta
 import configparser
 import os
+import sys
+import queue
+import threading
+
+import figures
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common import mongo
+from common.live import get_feed
 
 # ==============================================================================
 # 1. INITIAL CONFIG
@@ -18,59 +22,59 @@ st.set_page_config(
     layout="wide",
 )
 
-TEMPLATE_GRAFICO = "plotly_dark"
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
 
-COORDENADAS_FIXAS = {
-    "Setor Central": {"lat": -16.6805, "lon": -49.2563},
-    "Setor Bueno": {"lat": -16.6972, "lon": -49.2770},
-    "Setor Jaó": {"lat": -16.6502, "lon": -49.2285},
-    "Jardim Goiás": {"lat": -16.7041, "lon": -49.2386},
-    "Setor Norte Ferroviário": {"lat": -16.6595, "lon": -49.2597},
-}
-
-RAIOS_SETORES = {
-    "Setor Central": 900,
-    "Setor Bueno": 1300,
-    "Setor Jaó": 1600,
-    "Jardim Goiás": 1100,
-    "Setor Norte Ferroviário": 1000,
-}
+# Live mode: seconds between partial refreshes of KPIs, map and time series (0 = off)
+INTERVALO_AO_VIVO = config.getint("Live", "dashboard_refresh_seconds", fallback=30)
+# Seconds the analytics window (and every figure built from it) is reused across reruns
+CACHE_DADOS = config.getint("Live", "dashboard_cache_seconds", fallback=60)
 
 
 @st.cache_resource
 def init_connection():
     """
-    Initialize MongoDB Atlas connection using credentials from config.ini.
+    Shared read-mostly MongoDB Atlas pool (common/mongo.py), kept across reruns.
     """
-    config = configparser.ConfigParser()
-    config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
-    config.read(config_path, encoding="utf-8")
+    return mongo.get_client("atlas", workload="dashboard")
 
-    mongo_user = config.get("MongoAtlas", "user")
-    mongo_pass = config.get("MongoAtlas", "password")
-    mongo_cluster = config.get("MongoAtlas", "cluster")
 
-    username = urllib.parse.quote_plus(mongo_user)
-    password = urllib.parse.quote_plus(mongo_pass)
-    uri = f"mongodb+srv://{username}:{password}@{mongo_cluster}/?retryWrites=true&w=majority"
-    return MongoClient(uri)
+client = init_connection()
 
 
-client = init_connection()
+def get_collection(name):
+    target, collection = mongo.COLLECTIONS[name]
+    return client[mongo.TARGETS[target][1]][collection]
 
 
+@st.cache_data(ttl=CACHE_DADOS)
 def get_data():
     """
     Fetch analytics data from MongoDB with performance limit.
     """
-    db = client["Monitoramento_do_Ar"]
-    coll = db["Leituras_Analiticas"]
+    coll = get_collection("analytics")
 
     cursor = coll.find({}, {"_id": 0}).sort("timestamp", -1).limit(15000)
     data = list(cursor)
 
-    df = pd.DataFrame(data)
+    return preparar_leituras(pd.DataFrame(data))
+
+
+def get_new_rows(desde):
+    """
+    Analytics rows newer than `desde` only (incremental read for live mode).
+    """
+    coll = get_collection("analytics")
+
+    query = {"timestamp": {"$gt": pd.Timestamp(desde).to_pydatetime()}}
+
+    cursor = coll.find(query, {"_id": 0}).sort("timestamp", 1).limit(15000)
+
+    return preparar_leituras(pd.DataFrame(list(cursor)))
 
+
+def preparar_leituras(df):
     if not df.empty:
         df["timestamp"] = pd.to_datetime(df["timestamp"])
         df = df.sort_values("timestamp")
@@ -81,26 +85,164 @@ def get_data():
     return df
 
 
-def definir_cor_indicador(valor):
-    if valor < 50:
-        return [0, 100, 0, 180]  # Dark Green
-    elif valor < 75:
-        return [50, 205, 50, 180]  # Light Green
-    elif valor < 100:
-        return [255, 215, 0, 180]  # Yellow
-    else:
-        return [220, 20, 60, 180]  # Red
+def get_latest_state():
+    """
+    Latest reading, classification and open-anomaly count per sector,
+    maintained by the pipeline (Estado_Atual_Setores): one document per sector.
+    """
+    coll = get_collection("latest")
 
+    return preparar_estado(coll.find({}, {"_id": 0}))
 
-def definir_status_texto(valor):
-    if valor < 50:
-        return "Excelente"
-    elif valor < 75:
-        return "Boa"
-    elif valor < 100:
-        return "Moderada"
-    else:
-        return "Ruim"
+
+def preparar_estado(docs):
+    df = pd.DataFrame(list(docs))
+
+    if not df.empty:
+        df = df.drop(columns=["_id"], errors="ignore")
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+    return df
+
+
+class AoVivoCompartilhado:
+    """
+    Live-mode data shared by every viewer of this process: one subscription
+    to the shared tail of Estado_Atual_Setores (common/live.py). Sector
+    states come from the tail; when it reports a pipeline update, the first
+    viewer to refresh reads the new analytics rows once for everybody, so
+    Mongo sees one incremental query per pipeline cycle, not one per viewer
+    and tick.
+    """
+
+    def __init__(self, df_hoje):
+        self.lock = threading.Lock()
+        self.feed = get_feed()
+        self.fila = self.feed.subscribe()  # before the snapshot, so no update falls in between
+        self.estado = {doc["localizacao"]: doc for doc in self.feed.coll.find({})}
+        self.df = df_hoje
+        self.marca = df_hoje["timestamp"].max()
+
+    def atualizar(self):
+        docs = []
+        while True:
+            try:
+                doc = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if doc is None:
+                # Dropped by the feed for falling behind: subscribe again and resync
+                self.fila = self.feed.subscribe()
+                docs = list(self.feed.coll.find({}))
+            else:
+                docs.append(doc)
+        if not docs:
+            return
+
+        for doc in docs:
+            self.estado[doc["localizacao"]] = doc
+        novos = get_new_rows(self.marca)
+        if not novos.empty:
+            df = pd.concat([self.df, novos], ignore_index=True)
+            # Same window as the static view: the current day
+            self.df = df[df["timestamp"] >= df["timestamp"].max().normalize()]
+            self.marca = novos["timestamp"].max()
+
+    def leituras(self, filtro_local):
+        """(readings of the current day, sector states) after applying any pending update."""
+        with self.lock:
+            self.atualizar()
+            df, estado = self.df, list(self.estado.values())
+        if filtro_local != "Todos":
+            df = df[df["localizacao"] == filtro_local]
+        return df, preparar_estado(estado)
+
+
+@st.cache_resource
+def ao_vivo_compartilhado(_df_raw):
+    """One AoVivoCompartilhado per process, seeded with the current day of the first loaded window."""
+    return AoVivoCompartilhado(_df_raw[_df_raw["timestamp"] >= _df_raw["timestamp"].max().normalize()])
+
+
+@st.cache_data(ttl=300)
+def get_forecast():
+    """
+    Fetch the per-sector forecast batch-computed by the pipeline (Previsoes_Setores).
+    """
+    coll = get_collection("forecast")
+
+    df = pd.DataFrame(list(coll.find({}, {"_id": 0})))
+
+    if not df.empty:
+        df["timestamp_previsto"] = pd.to_datetime(df["timestamp_previsto"])
+        df = df.sort_values("timestamp_previsto")
+
+    return df
+
+
+@st.cache_data(ttl=300)
+def get_cells():
+    """
+    Fetch per-geohash-cell aggregates pre-computed by the pipeline (Mapa_Celulas).
+    """
+    coll = get_collection("cells")
+
+    return pd.DataFrame(list(coll.find({}, {"_id": 0, "centro": 0})))
+
+
+# ==============================================================================
+# 3. MEMOIZED SECTIONS
+# ==============================================================================
+#
+# Each section is built by a pure function in figures.py and cached by the
+# inputs it depends on: `versao` identifies the loaded analytics window, the
+# rest are the filters. Arguments starting with "_" are not hashed, so a
+# slider change never rebuilds the availability histogram and a sector
+# change only rebuilds the sections of that sector.
+
+
+def versao_dados(df_raw):
+    return (df_raw["timestamp"].max(), len(df_raw))
+
+
+@st.cache_data(max_entries=4)
+def secao_disponibilidade(versao, _df_raw):
+    return figures.figura_disponibilidade(_df_raw)
+
+
+@st.cache_data(max_entries=32)
+def secao_leituras(versao, inicio, fim, filtro_local, _df_raw):
+    # Cached values are pickled and copied on every hit: keep the boolean
+    # mask (one byte per row), not a filtered copy of the DataFrame
+    return figures.mascara_leituras(_df_raw, inicio, fim, filtro_local)
+
+
+def montar_mapa(df_view, filtro_local, usar_estado, df_estado=None):
+    """KPIs, anomaly count and map deck (latest state when usar_estado, read here unless given)."""
+    if df_estado is None:
+        df_estado = get_latest_state() if usar_estado else pd.DataFrame()
+    df_mapa, n_anomalias = figures.dados_mapa(df_view, df_estado, filtro_local)
+    return figures.kpis(df_mapa), n_anomalias, figures.deck_mapa(df_mapa, get_cells(), filtro_local)
+
+
+@st.cache_data(max_entries=32)
+def secao_mapa(versao, inicio, fim, filtro_local, usar_estado, _df_view):
+    return montar_mapa(_df_view, filtro_local, usar_estado)
+
+
+@st.cache_data(max_entries=32)
+def secao_evolucao(versao, inicio, fim, filtro_local, _df_view):
+    return figures.figura_evolucao(_df_view, get_forecast(), filtro_local)
+
+
+@st.cache_data(max_entries=64)
+def secao_barras(versao, inicio, fim, filtro_local, coluna, titulo, unidade, escala, _df_view):
+    return figures.figura_barras(_df_view, coluna, titulo, unidade, escala)
+
+
+@st.cache_data(max_entries=32)
+def secao_alertas(versao, inicio, fim, filtro_local, _df_view):
+    return figures.tabela_alertas(_df_view)
 
 
 # ==============================================================================
@@ -122,38 +264,8 @@ if df_raw.empty:
 st.sidebar.markdown("### 📅 Disponibilidade")
 st.sidebar.caption("Barras = Dados coletados.")
 
-df_hist = (
-    df_raw.set_index("timestamp")
-    .resample("H")
-    .size()
-    .reset_index(name="count")
-)
-df_hist = df_hist[df_hist["count"] > 0]
-
-fig_timeline = px.bar(
-    df_hist, x="timestamp", y="count", color_discrete_sequence=["#00CC96"]
-)
-
-fig_timeline.update_layout(
-    plot_bgcolor="rgba(0,0,0,0)",
-    paper_bgcolor="rgba(0,0,0,0)",
-    xaxis=dict(
-        showgrid=False,
-        title=None,
-        tickformat="%d/%m",
-        nticks=4,
-        tickfont=dict(size=10, color="gray"),
-    ),
-    yaxis=dict(showgrid=False, showticklabels=False, title=None),
-    margin=dict(l=0, r=0, t=0, b=20),
-    height=80,
-    showlegend=False,
-    dragmode="select",
-    selectdirection="h",
-)
-fig_timeline.update_traces(
-    hovertemplate="<b>%{x|%d/%m %H:%M}</b><br>Leituras: %{y}<extra></extra>"
-)
+versao = versao_dados(df_raw)
+fig_timeline = secao_disponibilidade(versao, df_raw)
 
 selection = st.sidebar.plotly_chart(
     fig_timeline,
@@ -181,12 +293,14 @@ hora_inicio, hora_fim = st.sidebar.slider(
 hora_inicio_filtro = datetime.combine(data_selecionada, hora_inicio)
 hora_fim_filtro = datetime.combine(data_selecionada, hora_fim)
 
+zoom_ativo = False
 if (
     selection
     and "selection" in selection
     and "xrange" in selection["selection"]
     and selection["selection"]["xrange"]
 ):
+    zoom_ativo = True
     x_range = selection["selection"]["xrange"]
     hora_inicio_filtro = pd.to_datetime(x_range[0]).to_pydatetime()
     hora_fim_filtro = pd.to_datetime(x_range[1]).to_pydatetime()
@@ -194,26 +308,18 @@ if (
         f"🔎 Zoom: {hora_inicio_filtro.strftime('%H:%M')} - {hora_fim_filtro.strftime('%H:%M')}"
     )
 
-df_time = df_raw[
-    (df_raw["timestamp"] >= hora_inicio_filtro)
-    & (df_raw["timestamp"] <= hora_fim_filtro)
-]
+st.sidebar.markdown("### 📍 Local")
+setores = ["Todos"] + list(df_raw["localizacao"].unique())
+filtro_local = st.sidebar.selectbox("Bairro:", setores)
+
+df_view = df_raw[secao_leituras(versao, hora_inicio_filtro, hora_fim_filtro, filtro_local, df_raw)]
 
-if df_time.empty:
+if df_view.empty:
     st.warning(
         f"❌ Sem dados para este período ({data_selecionada.strftime('%d/%m')}). Tente expandir o horário."
     )
     st.stop()
 
-st.sidebar.markdown("### 📍 Local")
-setores = ["Todos"] + list(df_raw["localizacao"].unique())
-filtro_local = st.sidebar.selectbox("Bairro:", setores)
-
-if filtro_local != "Todos":
-    df_view = df_time[df_time["localizacao"] == filtro_local]
-else:
-    df_view = df_time
-
 st.sidebar.markdown("---")
 st.sidebar.caption("Legenda de Qualidade:")
 st.sidebar.markdown(
@@ -228,192 +334,135 @@ st.sidebar.markdown(
     unsafe_allow_html=True,
 )
 
-df_view = df_view.copy()
-df_view["color_rgb"] = df_view["carga_poluente"].apply(definir_cor_indicador)
-df_view["classificacao_ar"] = df_view["carga_poluente"].apply(definir_status_texto)
-
-df_mapa = df_view.groupby("localizacao").last().reset_index()
-
-df_mapa["latitude"] = df_mapa["localizacao"].map(
-    lambda x: COORDENADAS_FIXAS.get(x, {}).get("lat", -16.68)
+# Default "today" view: map + KPIs come from the pipeline's per-sector latest state
+visao_atual = (
+    not zoom_ativo
+    and data_selecionada == data_max_db
+    and (hora_inicio, hora_fim) == (time(0, 0), time(23, 59))
 )
-df_mapa["longitude"] = df_mapa["localizacao"].map(
-    lambda x: COORDENADAS_FIXAS.get(x, {}).get("lon", -49.26)
+
+ao_vivo = INTERVALO_AO_VIVO > 0 and st.sidebar.toggle(
+    "🔴 Ao vivo",
+    value=True,
+    disabled=not visao_atual,
+    help="Atualiza KPIs, mapa e série temporal a cada "
+    f"{INTERVALO_AO_VIVO}s com as leituras novas (apenas na visão do dia atual, sem zoom).",
 )
+ao_vivo = ao_vivo and visao_atual
 
-df_mapa["raio_visual"] = df_mapa["localizacao"].map(RAIOS_SETORES).fillna(1000)
 
-st.title("🏭 Qualidade do Ar: Goiânia")
-st.caption(
-    f"Visualizando dados de: **{hora_inicio_filtro.strftime('%d/%m %H:%M')}** até **{hora_fim_filtro.strftime('%H:%M')}**"
-)
+def painel_tempo_real(df_view, filtro_local, usar_estado, chave=None, df_estado=None):
+    """
+    KPIs, map and time series: the part of the page live mode refreshes.
+    With `chave` (versao, inicio, fim) the pieces come from the memoized
+    sections; live mode passes none (and the sector states it already has)
+    and rebuilds them on every tick.
+    """
+    if chave is not None:
+        resumo, n_anomalias, deck = secao_mapa(*chave, filtro_local, usar_estado, df_view)
+        fig_line = secao_evolucao(*chave, filtro_local, df_view)
+    else:
+        resumo, n_anomalias, deck = montar_mapa(df_view, filtro_local, usar_estado, df_estado)
+        fig_line = figures.figura_evolucao(df_view, get_forecast(), filtro_local)
 
-c1, c2, c3, c4 = st.columns(4)
+    c1, c2, c3, c4 = st.columns(4)
 
-poluicao_media = df_mapa["carga_poluente"].mean()
-c1.metric(
-    "Índice Geral (Médio)",
-    f"{poluicao_media:.0f}",
-    delta=f"{100-poluicao_media:.0f} margem",
-    delta_color="normal",
-)
+    poluicao_media = resumo["poluicao_media"]
+    c1.metric(
+        "Índice Geral (Médio)",
+        f"{poluicao_media:.0f}",
+        delta=f"{100-poluicao_media:.0f} margem",
+        delta_color="normal",
+    )
 
-temp_media = df_mapa["temperatura"].mean()
-c2.metric("Temperatura", f"{temp_media:.1f}°C")
+    c2.metric("Temperatura", f"{resumo['temp_media']:.1f}°C")
 
-pm25_medio = df_mapa["pm25"].mean()
-c3.metric("PM2.5", f"{pm25_medio:.1f} µg/m³")
+    c3.metric("PM2.5", f"{resumo['pm25_medio']:.1f} µg/m³")
 
-anomalias_reais = len(
-    df_view[
-        (df_view["anomalia_detectada"] == True)
-        & (df_view["tipo_anomalia"] != "Desvio Estatístico")
-    ]
-)
-c4.metric("Anomalias/Alertas", anomalias_reais, delta_color="inverse")
-
-st.divider()
-
-st.subheader("🗺️ Mapa em Tempo Real")
-layer_setores = pdk.Layer(
-    "ScatterplotLayer",
-    data=df_mapa,
-    get_position="[longitude, latitude]",
-    get_fill_color="color_rgb",
-    get_line_color=[255, 255, 255],
-    get_line_width=20,
-    get_radius="raio_visual",
-    pickable=True,
-    opacity=0.8,
-    stroked=True,
-    filled=True,
-)
+    c4.metric("Anomalias/Alertas", n_anomalias, delta_color="inverse")
 
-lat_centro = df_mapa["latitude"].mean()
-lon_centro = df_mapa["longitude"].mean()
+    st.divider()
 
-view_state = pdk.ViewState(
-    latitude=lat_centro, longitude=lon_centro, zoom=11.5, pitch=30
-)
+    st.subheader("🗺️ Mapa em Tempo Real")
+    st.pydeck_chart(deck)
 
-st.pydeck_chart(
-    pdk.Deck(
-        map_style="https://basemaps.cartocdn.com/gl/dark-matter-gl-style/style.json",
-        initial_view_state=view_state,
-        layers=[layer_setores],
-        tooltip={
-            "html": "<b>{localizacao}</b><br/>Índice: {carga_poluente}<br/>Status: {classificacao_ar}<br/>Temp: {temperatura}°C",
-            "style": {"backgroundColor": "#111", "color": "white"},
-        },
-    )
-)
+    st.divider()
 
-st.divider()
+    st.subheader("📈 Evolução Temporal e Previsão IA")
+    st.plotly_chart(fig_line, use_container_width=True)
 
-st.subheader("📈 Evolução Temporal e Previsão IA")
 
-fig_line = go.Figure()
-fig_line.add_trace(
-    go.Scatter(
-        x=df_view["timestamp"],
-        y=df_view["carga_poluente"],
-        name="Poluição Medida",
-        line=dict(color="#ff4b4b", width=3),
-        mode="lines",
-    )
-)
-fig_line.add_trace(
-    go.Scatter(
-        x=df_view["timestamp"],
-        y=df_view["carga_estimada"],
-        name="IA Esperada (Baseline)",
-        line=dict(color="#00cc96", dash="dot", width=2),
-    )
-)
+@st.fragment(run_every=INTERVALO_AO_VIVO or None)
+def painel_ao_vivo(filtro_local):
+    """
+    Partial rerun every INTERVALO_AO_VIVO s: redraws KPIs, map and time
+    series from the process-wide live data (AoVivoCompartilhado).
+    """
+    df_live, df_estado = ao_vivo_compartilhado(df_raw).leituras(filtro_local)
 
-fig_line.update_layout(
-    template=TEMPLATE_GRAFICO,
-    height=350,
-    hovermode="x unified",
-    xaxis_title="Horário",
-    yaxis_title="Índice Unificado",
-    legend=dict(orientation="h", y=1.1),
+    painel_tempo_real(df_live, filtro_local, usar_estado=True, df_estado=df_estado)
+    st.caption(f"🔴 Ao vivo · atualizado às {datetime.now().strftime('%H:%M:%S')}")
+
+
+st.title("🏭 Qualidade do Ar: Goiânia")
+st.caption(
+    f"Visualizando dados de: **{hora_inicio_filtro.strftime('%d/%m %H:%M')}** até **{hora_fim_filtro.strftime('%H:%M')}**"
 )
-st.plotly_chart(fig_line, use_container_width=True)
 
-col_pm, col_gas = st.columns(2)
+chave = (versao, hora_inicio_filtro, hora_fim_filtro)
 
-with col_pm:
-    df_pm = (
-        df_view.groupby("localizacao")["pm25"]
-        .mean()
-        .sort_values()
-        .reset_index()
-    )
-    fig_pm = px.bar(
-        df_pm,
-        x="pm25",
-        y="localizacao",
-        orientation="h",
-        title="Poeira Fina (PM2.5)",
-        labels={"pm25": "µg/m³", "localizacao": ""},
-        color="pm25",
-        color_continuous_scale="Blues",
-        template=TEMPLATE_GRAFICO,
-    )
-    fig_pm.update_layout(coloraxis_showscale=False)
-    st.plotly_chart(fig_pm, use_container_width=True)
-
-with col_gas:
-    df_gas = (
-        df_view.groupby("localizacao")["gases_ppm"]
-        .mean()
-        .sort_values()
-        .reset_index()
-    )
-    fig_gas = px.bar(
-        df_gas,
-        x="gases_ppm",
-        y="localizacao",
-        orientation="h",
-        title="Gases Tóxicos (MQ-135)",
-        labels={"gases_ppm": "PPM", "localizacao": ""},
-        color="gases_ppm",
-        color_continuous_scale="Oranges",
-        template=TEMPLATE_GRAFICO,
-    )
-    fig_gas.update_layout(coloraxis_showscale=False)
-    st.plotly_chart(fig_gas, use_container_width=True)
-
-st.subheader("🚨 Histórico de Alertas")
-df_anomalias = df_view[
-    (df_view["anomalia_detectada"] == True)
-    & (df_view["tipo_anomalia"] != "Desvio Estatístico")
-].sort_values("timestamp", ascending=False)
-
-if not df_anomalias.empty:
-    st.dataframe(
-        df_anomalias[
-            [
-                "timestamp",
-                "localizacao",
-                "tipo_anomalia",
-                "carga_poluente",
-                "pm25",
-                "gases_ppm",
-            ]
-        ],
-        use_container_width=True,
-        hide_index=True,
-        column_config={
-            "timestamp": st.column_config.DatetimeColumn(
-                "Horário", format="DD/MM HH:mm"
-            ),
-            "carga_poluente": st.column_config.NumberColumn("Índice", format="%.0f"),
-            "pm25": st.column_config.NumberColumn("PM2.5", format="%.1f"),
-            "gases_ppm": st.column_config.NumberColumn("Gases", format="%.0f"),
-        },
-    )
+if ao_vivo:
+    painel_ao_vivo(filtro_local)
 else:
-    st.success("✅ Nenhuma anomalia crítica detectada no período selecionado.")
+    painel_tempo_real(df_view, filtro_local, visao_atual, chave)
+
+
+@st.fragment
+def painel_detalhes(df_view, filtro_local, chave):
+    """
+    Per-sector breakdowns and alert history, rendered on demand: only the
+    selected view is built, and switching views reruns just this fragment.
+    """
+    secao = st.radio(
+        "Detalhes:",
+        ["📊 Por setor", "🚨 Histórico de Alertas"],
+        horizontal=True,
+        label_visibility="collapsed",
+    )
+
+    if secao == "📊 Por setor":
+        col_pm, col_gas = st.columns(2)
+        with col_pm:
+            fig_pm = secao_barras(
+                *chave, filtro_local, "pm25", "Poeira Fina (PM2.5)", "µg/m³", "Blues", df_view
+            )
+            st.plotly_chart(fig_pm, use_container_width=True)
+        with col_gas:
+            fig_gas = secao_barras(
+                *chave, filtro_local, "gases_ppm", "Gases Tóxicos (MQ-135)", "PPM", "Oranges", df_view
+            )
+            st.plotly_chart(fig_gas, use_container_width=True)
+        return
+
+    st.subheader("🚨 Histórico de Alertas")
+    df_anomalias = secao_alertas(*chave, filtro_local, df_view)
+
+    if not df_anomalias.empty:
+        st.dataframe(
+            df_anomalias,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "timestamp": st.column_config.DatetimeColumn(
+                    "Horário", format="DD/MM HH:mm"
+                ),
+                "carga_poluente": st.column_config.NumberColumn("Índice", format="%.0f"),
+                "pm25": st.column_config.NumberColumn("PM2.5", format="%.1f"),
+                "gases_ppm": st.column_config.NumberColumn("Gases", format="%.0f"),
+            },
+        )
+    else:
+        st.success("✅ Nenhuma anomalia crítica detectada no período selecionado.")
+
 
+painel_detalhes(df_view, filtro_local, chave)
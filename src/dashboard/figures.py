@@ -0,0 +1,260 @@
+import plotly.express as px
+import plotly.graph_objects as go
+import pydeck as pdk
+
+# ==============================================================================
+# FIGURE BUILDERS (NO STREAMLIT)
+# ==============================================================================
+#
+# Pure functions: DataFrames in, figures / tables out. app.py memoizes each
+# one by the filter inputs it depends on, and benchmarks/bench_dashboard.py
+# times them without a Streamlit server.
+
+TEMPLATE_GRAFICO = "plotly_dark"
+
+CENTRO_PADRAO = {"lat": -16.68, "lon": -49.26}
+
+RAIOS_SETORES = {
+    "Setor Central": 900,
+    "Setor Bueno": 1300,
+    "Setor Jaó": 1600,
+    "Jardim Goiás": 1100,
+    "Setor Norte Ferroviário": 1000,
+}
+
+COLUNAS_ALERTAS = ["timestamp", "localizacao", "tipo_anomalia", "carga_poluente", "pm25", "gases_ppm"]
+
+
+def definir_cor_indicador(valor):
+    if valor < 50:
+        return [0, 100, 0, 180]  # Dark Green
+    elif valor < 75:
+        return [50, 205, 50, 180]  # Light Green
+    elif valor < 100:
+        return [255, 215, 0, 180]  # Yellow
+    else:
+        return [220, 20, 60, 180]  # Red
+
+
+def definir_status_texto(valor):
+    if valor < 50:
+        return "Excelente"
+    elif valor < 75:
+        return "Boa"
+    elif valor < 100:
+        return "Moderada"
+    else:
+        return "Ruim"
+
+
+def mascara_leituras(df_raw, inicio, fim, filtro_local):
+    """Boolean array selecting the rows of the window and sector ("Todos" = every sector)."""
+    mask = (df_raw["timestamp"] >= inicio) & (df_raw["timestamp"] <= fim)
+    if filtro_local != "Todos":
+        mask &= df_raw["localizacao"] == filtro_local
+    return mask.to_numpy()
+
+
+def filtrar_leituras(df_raw, inicio, fim, filtro_local):
+    """Rows of the selected window and sector ("Todos" = every sector)."""
+    return df_raw[mascara_leituras(df_raw, inicio, fim, filtro_local)]
+
+
+def anomalias_reais(df_view):
+    return df_view[
+        (df_view["anomalia_detectada"] == True)
+        & (df_view["tipo_anomalia"] != "Desvio Estatístico")
+    ]
+
+
+def figura_disponibilidade(df_raw):
+    """Hourly reading counts; a horizontal box selection zooms the time window."""
+    df_hist = (
+        df_raw.set_index("timestamp")
+        .resample("h")
+        .size()
+        .reset_index(name="count")
+    )
+    df_hist = df_hist[df_hist["count"] > 0]
+
+    fig_timeline = px.bar(
+        df_hist, x="timestamp", y="count", color_discrete_sequence=["#00CC96"]
+    )
+
+    fig_timeline.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        xaxis=dict(
+            showgrid=False,
+            title=None,
+            tickformat="%d/%m",
+            nticks=4,
+            tickfont=dict(size=10, color="gray"),
+        ),
+        yaxis=dict(showgrid=False, showticklabels=False, title=None),
+        margin=dict(l=0, r=0, t=0, b=20),
+        height=80,
+        showlegend=False,
+        dragmode="select",
+        selectdirection="h",
+    )
+    fig_timeline.update_traces(
+        hovertemplate="<b>%{x|%d/%m %H:%M}</b><br>Leituras: %{y}<extra></extra>"
+    )
+    return fig_timeline
+
+
+def dados_mapa(df_view, df_estado, filtro_local):
+    """
+    One marker per sector + anomaly count: the pipeline's latest state
+    (Estado_Atual_Setores) when df_estado has rows, otherwise grouped from df_view.
+    """
+    df_mapa = df_estado
+    if not df_mapa.empty and filtro_local != "Todos":
+        df_mapa = df_mapa[df_mapa["localizacao"] == filtro_local]
+
+    if not df_mapa.empty:
+        df_mapa = df_mapa.copy()
+        n_anomalias = int(df_mapa["anomalias_abertas"].sum())
+    else:
+        df_mapa = df_view.groupby("localizacao").last().reset_index()
+        n_anomalias = len(anomalias_reais(df_view))
+
+    df_mapa["color_rgb"] = df_mapa["carga_poluente"].apply(definir_cor_indicador)
+    df_mapa["classificacao_ar"] = df_mapa["carga_poluente"].apply(definir_status_texto)
+
+    # Real sensor coordinates (same as the simulator / devices report)
+    df_mapa["latitude"] = df_mapa["latitude"].fillna(CENTRO_PADRAO["lat"])
+    df_mapa["longitude"] = df_mapa["longitude"].fillna(CENTRO_PADRAO["lon"])
+
+    df_mapa["raio_visual"] = df_mapa["localizacao"].map(RAIOS_SETORES).fillna(1000)
+
+    return df_mapa, n_anomalias
+
+
+def kpis(df_mapa):
+    return {
+        "poluicao_media": df_mapa["carga_poluente"].mean(),
+        "temp_media": df_mapa["temperatura"].mean(),
+        "pm25_medio": df_mapa["pm25"].mean(),
+    }
+
+
+def deck_mapa(df_mapa, df_celulas, filtro_local):
+    """Sector markers over a heatmap of the pipeline's geohash cells."""
+    layer_setores = pdk.Layer(
+        "ScatterplotLayer",
+        data=df_mapa,
+        get_position="[longitude, latitude]",
+        get_fill_color="color_rgb",
+        get_line_color=[255, 255, 255],
+        get_line_width=20,
+        get_radius="raio_visual",
+        pickable=True,
+        opacity=0.8,
+        stroked=True,
+        filled=True,
+    )
+
+    camadas = [layer_setores]
+
+    if not df_celulas.empty:
+        if filtro_local != "Todos":
+            df_celulas = df_celulas[df_celulas["setores"].map(lambda s: filtro_local in s)]
+        layer_calor = pdk.Layer(
+            "HeatmapLayer",
+            data=df_celulas,
+            get_position="[lon_centro, lat_centro]",
+            get_weight="carga_poluente_media",
+            radius_pixels=60,
+            opacity=0.5,
+        )
+        camadas.insert(0, layer_calor)
+
+    view_state = pdk.ViewState(
+        latitude=df_mapa["latitude"].mean(), longitude=df_mapa["longitude"].mean(), zoom=11.5, pitch=30
+    )
+
+    return pdk.Deck(
+        map_style="https://basemaps.cartocdn.com/gl/dark-matter-gl-style/style.json",
+        initial_view_state=view_state,
+        layers=camadas,
+        tooltip={
+            "html": "<b>{localizacao}</b><br/>Índice: {carga_poluente}<br/>Status: {classificacao_ar}<br/>Temp: {temperatura}°C",
+            "style": {"backgroundColor": "#111", "color": "white"},
+        },
+    )
+
+
+def figura_evolucao(df_view, df_previsao, filtro_local):
+    """Measured vs expected index, plus the pipeline's next-hours forecast."""
+    fig_line = go.Figure()
+    fig_line.add_trace(
+        go.Scatter(
+            x=df_view["timestamp"],
+            y=df_view["carga_poluente"],
+            name="Poluição Medida",
+            line=dict(color="#ff4b4b", width=3),
+            mode="lines",
+        )
+    )
+    fig_line.add_trace(
+        go.Scatter(
+            x=df_view["timestamp"],
+            y=df_view["carga_estimada"],
+            name="IA Esperada (Baseline)",
+            line=dict(color="#00cc96", dash="dot", width=2),
+        )
+    )
+
+    if not df_previsao.empty:
+        if filtro_local != "Todos":
+            df_previsao = df_previsao[df_previsao["localizacao"] == filtro_local]
+        df_previsao = (
+            df_previsao.groupby("timestamp_previsto")["carga_poluente"].mean().reset_index()
+        )
+        fig_line.add_trace(
+            go.Scatter(
+                x=df_previsao["timestamp_previsto"],
+                y=df_previsao["carga_poluente"],
+                name="Previsão IA (próximas horas)",
+                line=dict(color="#ab63fa", dash="dash", width=2),
+            )
+        )
+
+    fig_line.update_layout(
+        template=TEMPLATE_GRAFICO,
+        height=350,
+        hovermode="x unified",
+        xaxis_title="Horário",
+        yaxis_title="Índice Unificado",
+        legend=dict(orientation="h", y=1.1),
+    )
+    return fig_line
+
+
+def figura_barras(df_view, coluna, titulo, unidade, escala):
+    """Per-sector mean of `coluna` as a horizontal bar chart."""
+    df_barras = (
+        df_view.groupby("localizacao")[coluna]
+        .mean()
+        .sort_values()
+        .reset_index()
+    )
+    fig = px.bar(
+        df_barras,
+        x=coluna,
+        y="localizacao",
+        orientation="h",
+        title=titulo,
+        labels={coluna: unidade, "localizacao": ""},
+        color=coluna,
+        color_continuous_scale=escala,
+        template=TEMPLATE_GRAFICO,
+    )
+    fig.update_layout(coloraxis_showscale=False)
+    return fig
+
+
+def tabela_alertas(df_view):
+    return anomalias_reais(df_view).sort_values("timestamp", ascending=False)[COLUNAS_ALERTAS]
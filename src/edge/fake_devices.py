@@ -0,0 +1,75 @@
+import os
+import sys
+import random
+import asyncio
+
+#============================
+# PTY-BASED FAKE ARDUINO DEVICES
+#============================
+# Each fake sensor owns a pseudo-terminal pair: the gateway opens the slave
+# side like a real /dev/ttyUSB* port, and we write frames on the master side
+# in exactly the same text format as the sketches in this folder.
+
+SENSOR_PERIODS = {
+    "mq135": 1.5,   # mq135_sensor.ino: delay(1500)
+    "pms5003": 1.0,  # PMS5003 streams ~1 frame/s
+    "dht11": 2.0,   # dht11_temp_humidity.ino: delay(2000)
+}
+
+
+def render_frame(sensor, rng=random):
+    if sensor == "mq135":
+        raw_adc = rng.randint(300, 2200)
+        return (
+            "-------------------------------\r\n"
+            f"ADC bruto: {raw_adc:.2f}\r\n"
+            f"RZero: {rng.uniform(60, 90):.2f}\r\n"
+            f"PPM estimado: {rng.uniform(120, 650):.2f}\r\n"
+        )
+    if sensor == "pms5003":
+        return f"Qualidade do Ar (PM 2.5): {rng.randint(3, 60)} ug/m3\r\n"
+    if sensor == "dht11":
+        if rng.random() < 0.02:
+            return "Falha ao ler o sensor DHT11!\r\n"
+        return f"Temperatura: {rng.uniform(18, 36):.2f} °C, Umidade: {rng.uniform(20, 90):.2f} %\r\n"
+    raise ValueError(f"Unknown sensor: {sensor}")
+
+
+async def run_fake_device(master_fd, sensor, period=None):
+    period = period or SENSOR_PERIODS[sensor]
+    while True:
+        os.write(master_fd, render_frame(sensor).encode("utf-8"))
+        await asyncio.sleep(period)
+
+
+def create_fake_devices(n_devices, sensors=("mq135", "pms5003", "dht11")):
+    """
+    Open one pty per (device, sensor).
+
+    Returns (streams, tasks): `streams` uses the gateway's
+    (device, sensor, path) layout and `tasks` are the writer coroutines.
+    """
+    streams, tasks = [], []
+    for index in range(n_devices):
+        device = f"fake-{index:02d}"
+        for sensor in sensors:
+            master_fd, slave_fd = os.openpty()
+            path = os.ttyname(slave_fd)
+            streams.append((device, sensor, path))
+            tasks.append(run_fake_device(master_fd, sensor))
+    return streams, tasks
+
+
+async def _main(n_devices):
+    streams, tasks = create_fake_devices(n_devices)
+    for device, sensor, path in streams:
+        print(f"{device}:{sensor}:{path}")
+    print("\n[INFO] Paste the lines above into [Gateway] streams (comma separated). Ctrl+C to stop.")
+    await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 1))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,311 @@
+import os
+import re
+import ssl
+import sys
+import gzip
+import json
+import time
+import tty
+import termios
+import asyncio
+import argparse
+import configparser
+from collections import deque
+from datetime import datetime
+
+#============================
+# LOAD CONFIG FROM ROOT config.ini
+#============================
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+# device:sensor:path entries, comma separated
+# e.g. "esp32-01:mq135:/dev/ttyUSB0, esp32-01:dht11:/dev/ttyUSB1"
+GATEWAY_STREAMS = config.get("Gateway", "streams", fallback="")
+GATEWAY_BAUDRATE = config.getint("Gateway", "baudrate", fallback=115200)
+GATEWAY_INTERVAL = config.getint("Gateway", "interval", fallback=60)
+GATEWAY_TARGET = config.get("Gateway", "target", fallback="mqtt")
+GATEWAY_HTTP_URL = config.get("Gateway", "http_url", fallback="http://localhost:8080/api/sensors/batch")
+GATEWAY_MQTT_TOPIC = config.get("Gateway", "mqtt_topic", fallback="sensores/ar/lote")
+GATEWAY_MAX_PENDING = config.getint("Gateway", "max_pending_batches", fallback=100)
+
+BAUDRATES = {
+    9600: termios.B9600,
+    19200: termios.B19200,
+    38400: termios.B38400,
+    57600: termios.B57600,
+    115200: termios.B115200,
+}
+
+#============================
+# FRAME PARSERS (one per Arduino sketch)
+#============================
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+
+SENSOR_PARSERS = {
+    # mq135_sensor.ino -> "PPM estimado: 123.45"
+    "mq135": [(re.compile(r"PPM estimado:\s*" + _NUMBER), "gases_ppm")],
+    # pms5003_pm25.ino -> "Qualidade do Ar (PM 2.5): 12 ug/m3"
+    "pms5003": [(re.compile(r"PM 2\.5\):\s*" + _NUMBER), "pm25")],
+    # dht11_temp_humidity.ino -> "Temperatura: 25.00 °C, Umidade: 60.00 %"
+    "dht11": [
+        (re.compile(r"Temperatura:\s*" + _NUMBER), "temperatura"),
+        (re.compile(r"Umidade:\s*" + _NUMBER), "humidade"),
+    ],
+}
+
+
+def parse_frame(sensor, line):
+    """Extract {field: value} from one serial line. Banner/debug lines yield {}."""
+    values = {}
+    for pattern, field in SENSOR_PARSERS[sensor]:
+        match = pattern.search(line)
+        if match:
+            values[field] = float(match.group(1))
+    return values
+
+
+def parse_streams(raw):
+    streams = []
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        device, sensor, path = entry.split(":", 2)
+        if sensor not in SENSOR_PARSERS:
+            raise ValueError(f"Unknown sensor type '{sensor}' in [Gateway] streams")
+        streams.append((device.strip(), sensor.strip(), path.strip()))
+    return streams
+
+
+#============================
+# AGGREGATION
+#============================
+class IntervalAggregator:
+    """Running min/sum/max/count per device and field for the current interval."""
+
+    def __init__(self):
+        self.stats = {}
+
+    def add(self, device, values):
+        fields = self.stats.setdefault(device, {})
+        for field, value in values.items():
+            st = fields.get(field)
+            if st is None:
+                fields[field] = [value, value, value, 1]  # min, sum, max, count
+            else:
+                st[0] = min(st[0], value)
+                st[1] += value
+                st[2] = max(st[2], value)
+                st[3] += 1
+
+    def flush(self, interval_end, interval_seconds):
+        """Return one merged reading per device and reset the window."""
+        readings = []
+        for device, fields in self.stats.items():
+            reading = {
+                "dispositivo": device,
+                "timestamp": interval_end.isoformat(),
+                "intervalo_s": interval_seconds,
+                "amostras": {},
+            }
+            for field, (vmin, vsum, vmax, count) in fields.items():
+                reading[field] = round(vsum / count, 2)
+                reading[f"{field}_min"] = round(vmin, 2)
+                reading[f"{field}_max"] = round(vmax, 2)
+                reading["amostras"][field] = count
+            readings.append(reading)
+        self.stats = {}
+        return readings
+
+
+def compress_batch(readings):
+    return gzip.compress(json.dumps(readings, separators=(",", ":")).encode("utf-8"))
+
+
+#============================
+# SERIAL / PTY STREAMS
+#============================
+def open_serial(path, baudrate):
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    speed = BAUDRATES.get(baudrate, termios.B115200)
+    attrs[4] = attrs[5] = speed  # ispeed / ospeed
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    return fd
+
+
+async def read_stream(device, sensor, path, aggregator, baudrate=GATEWAY_BAUDRATE):
+    """Read lines from one serial/pty stream and feed the aggregator. Reopens on error."""
+    loop = asyncio.get_running_loop()
+
+    while True:
+        try:
+            fd = open_serial(path, baudrate)
+        except OSError as e:
+            print(f"[ERROR] {device}/{sensor}: cannot open {path}: {e}. Retrying in 5s...")
+            await asyncio.sleep(5)
+            continue
+
+        print(f"[OK] {device}/{sensor} <- {path}")
+        lines = asyncio.Queue()
+        buffer = bytearray()
+
+        def on_readable():
+            try:
+                chunk = os.read(fd, 4096)
+            except BlockingIOError:
+                return
+            except OSError:
+                chunk = b""
+            if not chunk:
+                loop.remove_reader(fd)
+                lines.put_nowait(None)  # device gone
+                return
+            buffer.extend(chunk)
+            while b"\n" in buffer:
+                line, _, rest = buffer.partition(b"\n")
+                buffer[:] = rest
+                lines.put_nowait(line.decode("utf-8", errors="replace").strip())
+
+        loop.add_reader(fd, on_readable)
+        try:
+            while True:
+                line = await lines.get()
+                if line is None:
+                    break
+                values = parse_frame(sensor, line)
+                if values:
+                    aggregator.add(device, values)
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+
+        print(f"[WARN] {device}/{sensor}: stream closed. Reopening in 5s...")
+        await asyncio.sleep(5)
+
+
+#============================
+# PUBLISHERS
+#============================
+class HttpPublisher:
+    def __init__(self, url):
+        import requests
+
+        self.session = requests.Session()
+        self.url = url
+
+    def publish(self, payload):
+        response = self.session.post(
+            self.url,
+            data=payload,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+            timeout=10,
+        )
+        response.raise_for_status()
+
+
+class MqttPublisher:
+    def __init__(self, topic):
+        import paho.mqtt.client as mqtt
+
+        self.topic = topic
+        self.client = mqtt.Client()
+        self.client.username_pw_set(config.get("MQTT", "user"), config.get("MQTT", "password"))
+        self.client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLS)
+        self.client.connect(config.get("MQTT", "broker"), config.getint("MQTT", "port"), keepalive=60)
+        self.client.loop_start()
+
+    def publish(self, payload):
+        info = self.client.publish(self.topic, payload, qos=1)
+        info.wait_for_publish(timeout=10)
+        if not info.is_published():
+            raise RuntimeError(f"MQTT publish not acknowledged (rc={info.rc})")
+
+
+def build_publisher(target):
+    if target == "http":
+        return HttpPublisher(GATEWAY_HTTP_URL)
+    if target == "mqtt":
+        return MqttPublisher(GATEWAY_MQTT_TOPIC)
+    raise ValueError(f"Unknown gateway target: {target}")
+
+
+async def flush_loop(aggregator, publisher, interval=GATEWAY_INTERVAL):
+    """Every `interval` seconds merge the window and publish one compressed batch."""
+    pending = deque(maxlen=GATEWAY_MAX_PENDING)  # batches kept while the uplink is down
+    next_tick = time.monotonic() + interval
+
+    while True:
+        await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+        next_tick += interval
+
+        readings = aggregator.flush(datetime.now(), interval)
+        if readings:
+            pending.append(compress_batch(readings))
+            print(f"[INFO] {len(readings)} device readings aggregated.")
+
+        while pending:
+            try:
+                await asyncio.to_thread(publisher.publish, pending[0])
+                pending.popleft()
+            except Exception as e:
+                print(f"[ERROR] Publish failed ({len(pending)} batches pending): {e}")
+                break
+
+
+async def run_gateway(streams, publisher, interval=GATEWAY_INTERVAL):
+    aggregator = IntervalAggregator()
+    tasks = [read_stream(device, sensor, path, aggregator) for device, sensor, path in streams]
+    tasks.append(flush_loop(aggregator, publisher, interval))
+    await asyncio.gather(*tasks)
+
+
+class PrintPublisher:
+    """Dry-run target: decompress and print batches instead of sending them."""
+
+    def publish(self, payload):
+        readings = json.loads(gzip.decompress(payload))
+        print(f"[DRY-RUN] {len(payload)} bytes gzip -> {json.dumps(readings, ensure_ascii=False)}")
+
+
+#============================
+# MAIN
+#============================
+async def _main(args):
+    streams = parse_streams(GATEWAY_STREAMS)
+    fake_tasks = []
+
+    if args.fake:
+        from fake_devices import create_fake_devices
+
+        streams, fake_tasks = create_fake_devices(args.fake)
+
+    if not streams:
+        print("[ERROR] No streams configured ([Gateway] streams or --fake).")
+        return
+
+    publisher = PrintPublisher() if args.dry_run else build_publisher(args.target)
+    await asyncio.gather(run_gateway(streams, publisher, args.interval), *fake_tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Edge gateway: serial sensors -> aggregated batches")
+    parser.add_argument("--target", choices=["mqtt", "http"], default=GATEWAY_TARGET)
+    parser.add_argument("--interval", type=int, default=GATEWAY_INTERVAL)
+    parser.add_argument("--dry-run", action="store_true", help="Print batches instead of publishing")
+    parser.add_argument(
+        "--fake",
+        type=int,
+        metavar="N_DEVICES",
+        help="Spawn N pty-based fake devices (MQ-135 + PMS5003 + DHT11 each)",
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        print("\n[INFO] Gateway stopped.")
+        sys.exit(0)
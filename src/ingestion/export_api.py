@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import hashlib
+import itertools
+import configparser
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Blueprint, Response, request, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common import mongo
+
+#============================
+# LOAD CONFIG FROM ROOT config.ini
+#============================
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+BATCH_ROWS = config.getint("Export", "batch_rows", fallback=10000)
+
+export_bp = Blueprint("export", __name__, url_prefix="/api/export")
+_indexes_ready = False
+
+#============================
+# SCHEMAS
+#============================
+# Fixed schemas keep every streamed batch compatible with the first one
+ANALYTICS_SCHEMA = pa.schema(
+    [
+        ("timestamp", pa.timestamp("ms")),
+        ("localizacao", pa.string()),
+        ("temperatura", pa.float64()),
+        ("humidade", pa.float64()),
+        ("gases_ppm", pa.float64()),
+        ("pm25", pa.float64()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("geohash", pa.string()),
+        ("classificacao_ar", pa.string()),
+        ("carga_poluente", pa.float64()),
+        ("carga_estimada", pa.float64()),
+        ("desvio_modelo", pa.float64()),
+        ("anomalia_detectada", pa.bool_()),
+        ("tipo_anomalia", pa.string()),
+        ("origem_dado", pa.string()),
+    ]
+)
+
+ROLLUP_SCHEMA = pa.schema(
+    [
+        ("periodo", pa.timestamp("ms")),
+        ("localizacao", pa.string()),
+        ("n_leituras", pa.int64()),
+        ("carga_poluente_media", pa.float64()),
+        ("carga_poluente_max", pa.float64()),
+        ("pm25_media", pa.float64()),
+        ("gases_ppm_media", pa.float64()),
+        ("anomalias", pa.int64()),
+    ]
+)
+
+# Date parts grouped on for each rollup period (works on any MongoDB version)
+ROLLUP_PARTS = {
+    "hour": ["year", "month", "dayOfMonth", "hour"],
+    "day": ["year", "month", "dayOfMonth"],
+}
+
+MIMETYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "ndjson": "application/x-ndjson",
+}
+
+
+#============================
+# STREAMING WRITERS
+#============================
+class _ChunkSink:
+    """Write-only file object whose buffered bytes are drained after every batch."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _batches(docs, schema):
+    """Cursor -> Arrow record batches of BATCH_ROWS rows; only one batch is in memory at a time."""
+    docs = iter(docs)
+    while True:
+        chunk = list(itertools.islice(docs, BATCH_ROWS))
+        if not chunk:
+            return
+        yield pa.RecordBatch.from_pylist(chunk, schema=schema)
+
+
+def stream_arrow(docs, schema):
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _batches(docs, schema):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_parquet(docs, schema):
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in _batches(docs, schema):
+            writer.write_batch(batch)  # one row group per batch
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_ndjson(docs, schema):
+    names = schema.names
+    docs = iter(docs)
+    while True:
+        chunk = list(itertools.islice(docs, BATCH_ROWS))
+        if not chunk:
+            return
+        lines = [
+            json.dumps({k: doc.get(k) for k in names}, default=_json_default, ensure_ascii=False)
+            for doc in chunk
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+STREAMERS = {"arrow": stream_arrow, "parquet": stream_parquet, "ndjson": stream_ndjson}
+
+
+#============================
+# REQUEST HELPERS
+#============================
+def _parse_args():
+    try:
+        start = datetime.fromisoformat(request.args["start"])
+        end = datetime.fromisoformat(request.args["end"])
+    except KeyError:
+        raise ValueError("Query parameters 'start' and 'end' are required (ISO 8601)")
+
+    fmt = request.args.get("format", "arrow")
+    if fmt not in STREAMERS:
+        raise ValueError(f"Unsupported format '{fmt}' (use {', '.join(STREAMERS)})")
+
+    query = {"timestamp": {"$gte": start, "$lt": end}}
+    setores = request.args.getlist("setor")
+    if setores:
+        query["localizacao"] = {"$in": setores}
+    return query, fmt
+
+
+def _select(schema):
+    columns = request.args.get("columns")
+    if not columns:
+        return schema
+    names = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in names if c not in schema.names]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return pa.schema([schema.field(c) for c in names])
+
+
+def _etag(coll, query):
+    """
+    Version of the result: request + row count + newest _id in range. The
+    pipeline rewrites analytics rows each cycle, so new ObjectIds change it.
+    """
+    newest = coll.find_one(query, {"_id": 1}, sort=[("_id", -1)])
+    count = coll.count_documents(query)
+    key = f"{request.full_path}|{count}|{newest['_id'] if newest else ''}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _respond(coll, query, fmt, schema, docs_fn, name):
+    global _indexes_ready
+    if not _indexes_ready:
+        # Range + sector scans for the exports and the ETag count
+        coll.create_index([("timestamp", 1), ("localizacao", 1)])
+        _indexes_ready = True
+
+    etag = _etag(coll, query)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = Response(STREAMERS[fmt](docs_fn(), schema), mimetype=MIMETYPES[fmt])
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"  # cache, but revalidate with If-None-Match
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+
+#============================
+# ENDPOINTS
+#============================
+@export_bp.route("/analytics", methods=["GET"])
+def export_analytics():
+    """Analytics rows for [start, end), optionally filtered by setor (repeatable) and columns."""
+    try:
+        query, fmt = _parse_args()
+        schema = _select(ANALYTICS_SCHEMA)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    coll = mongo.get_collection("analytics", workload="dashboard")
+    projection = {"_id": 0, **{name: 1 for name in schema.names}}
+
+    def docs():
+        return coll.find(query, projection).sort("timestamp", 1).batch_size(BATCH_ROWS)
+
+    return _respond(coll, query, fmt, schema, docs, "analytics")
+
+
+@export_bp.route("/rollups", methods=["GET"])
+def export_rollups():
+    """Per-sector hourly or daily aggregates for [start, end), computed by MongoDB."""
+    try:
+        query, fmt = _parse_args()
+        period = request.args.get("period", "hour")
+        if period not in ROLLUP_PARTS:
+            raise ValueError("period must be 'hour' or 'day'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    coll = mongo.get_collection("analytics", workload="dashboard")
+    parts = ROLLUP_PARTS[period]
+    pipeline = [
+        {"$match": query},
+        {
+            "$group": {
+                "_id": {"localizacao": "$localizacao", **{p: {f"${p}": "$timestamp"} for p in parts}},
+                "n_leituras": {"$sum": 1},
+                "carga_poluente_media": {"$avg": "$carga_poluente"},
+                "carga_poluente_max": {"$max": "$carga_poluente"},
+                "pm25_media": {"$avg": "$pm25"},
+                "gases_ppm_media": {"$avg": "$gases_ppm"},
+                "anomalias": {"$sum": {"$cond": ["$anomalia_detectada", 1, 0]}},
+            }
+        },
+        {"$sort": {**{f"_id.{p}": 1 for p in parts}, "_id.localizacao": 1}},
+    ]
+
+    def docs():
+        cursor = coll.aggregate(pipeline, allowDiskUse=True, batchSize=BATCH_ROWS)
+        for doc in cursor:
+            key = doc.pop("_id")
+            doc["localizacao"] = key["localizacao"]
+            doc["periodo"] = datetime(key["year"], key["month"], key["dayOfMonth"], key.get("hour", 0))
+            yield doc
+
+    return _respond(coll, query, fmt, ROLLUP_SCHEMA, docs, f"rollups_{period}")
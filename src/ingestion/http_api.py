@@ -1,59 +1,100 @@
-from flask import Flask, request, jsonify
-from pymongo import MongoClient
-from datetime import datetime
-import configparser
-import os
-
-app = Flask(__name__)
-
-# --- MONGODB CONNECTION ---
-config = configparser.ConfigParser()
-config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
-config.read(config_path, encoding="utf-8")
-
-MONGO_URI = config.get("MongoLocal", "uri", fallback="mongodb://localhost:27017/")
-DB_NAME = config.get("MongoLocal", "db", fallback="IOTIA2")
-COLLECTION_NAME = config.get("MongoLocal", "collection_sensores", fallback="sensores")
-
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-collection = db[COLLECTION_NAME]
-
-
-@app.route("/", methods=["GET"])
-def home():
-    return "API server is ON — send POST data to /api/sensors"
-
-
-@app.route("/api/sensors", methods=["POST"])
-def save_data():
-    try:
-        data = request.get_json()
-
-        expected_fields = ["temperatura", "umidade_ar", "umidade_solo"]
-        for field in expected_fields:
-            if field not in data:
-                return jsonify({"error": f"Field '{field}' is missing in JSON"}), 400
-
-        data["created_at"] = datetime.now()
-
-        result = collection.insert_one(data)
-
-        data.pop("_id", None)
-        data["created_at"] = data["created_at"].strftime("%Y-%m-%d %H:%M:%S")
-
-        return jsonify(
-            {
-                "message": "Data received and stored successfully.",
-                "id": str(result.inserted_id),
-                "data": data,
-            }
-        ), 201
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
-
-
-if __name__ == "__main__":
-    app.run(host="192.168.1.103", port=8080, debug=True)
-
+from flask import Flask, request, jsonify
+from datetime import datetime
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common import mongo, buckets
+from export_api import export_bp
+from live_api import live_bp
+from wire_format import parse_timestamp
+
+app = Flask(__name__)
+app.register_blueprint(export_bp)  # read endpoints: /api/export/...
+app.register_blueprint(live_bp)  # SSE feed: /api/live/stream
+
+# --- MONGODB CONNECTION (shared ingest pool, see common/mongo.py) ---
+collection = mongo.get_collection("local_sensores", workload="ingest")
+# Optional bucketed layout (common/buckets.py): readings appended to per-device buckets
+bucket_writer = buckets.BucketWriter("local_sensores") if buckets.enabled("local_sensores") else None
+
+
+@app.route("/", methods=["GET"])
+def home():
+    return "API server is ON — send POST data to /api/sensors"
+
+
+@app.route("/api/sensors", methods=["POST"])
+def save_data():
+    try:
+        data = request.get_json()
+
+        expected_fields = ["temperatura", "umidade_ar", "umidade_solo"]
+        for field in expected_fields:
+            if field not in data:
+                return jsonify({"error": f"Field '{field}' is missing in JSON"}), 400
+
+        data["created_at"] = datetime.now()
+
+        if bucket_writer is not None:
+            bucket_writer.append([data])
+            inserted_id = None  # readings inside a bucket have no id of their own
+        else:
+            inserted_id = str(collection.insert_one(data).inserted_id)
+
+        data.pop("_id", None)
+        data["created_at"] = data["created_at"].strftime("%Y-%m-%d %H:%M:%S")
+
+        return jsonify(
+            {
+                "message": "Data received and stored successfully.",
+                "id": inserted_id,
+                "data": data,
+            }
+        ), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/sensors/batch", methods=["POST"])
+def save_batch():
+    """Batch of aggregated readings (e.g. from the edge gateway), optionally gzip-encoded."""
+    try:
+        body = request.get_data()
+        if request.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        readings = json.loads(body)
+        if not isinstance(readings, list) or not readings:
+            return jsonify({"error": "Expected a non-empty JSON array"}), 400
+
+        created_at = datetime.now()
+        for reading in readings:
+            if "dispositivo" not in reading:
+                return jsonify({"error": "Field 'dispositivo' is missing in a reading"}), 400
+            if "timestamp" in reading:
+                reading["timestamp"] = parse_timestamp(reading["timestamp"])
+            reading["created_at"] = created_at
+
+        if bucket_writer is not None:
+            bucket_writer.append(readings)
+        else:
+            collection.insert_many(readings)
+
+        return jsonify(
+            {
+                "message": "Batch received and stored successfully.",
+                "count": len(readings),
+            }
+        ), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+if __name__ == "__main__":
+    app.run(host="192.168.1.103", port=8080, debug=True)
+
@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import queue
+from datetime import datetime
+
+from flask import Blueprint, Response, request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common.live import LIVE_CONFIG, get_feed
+
+live_bp = Blueprint("live", __name__, url_prefix="/api/live")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _event(name, doc):
+    doc = {k: v for k, v in doc.items() if k != "_id"}
+    return f"event: {name}\ndata: {json.dumps(doc, default=_json_default, ensure_ascii=False)}\n\n"
+
+
+#============================
+# ENDPOINTS
+#============================
+@live_bp.route("/stream", methods=["GET"])
+def stream():
+    """
+    Server-Sent Events: an `estado` event per sector on connect (snapshot),
+    then one every time the pipeline updates a sector. Optional repeatable
+    `setor` filter. Comment lines keep idle connections open.
+    """
+    setores = request.args.getlist("setor")
+    feed = get_feed()
+
+    def events():
+        q = feed.subscribe()  # before the snapshot, so no update falls in between
+        try:
+            yield f"retry: {LIVE_CONFIG['POLL_SECONDS'] * 1000}\n\n"
+            query = {"localizacao": {"$in": setores}} if setores else {}
+            for doc in feed.coll.find(query):
+                yield _event("estado", doc)
+
+            while True:
+                try:
+                    doc = q.get(timeout=LIVE_CONFIG["HEARTBEAT_SECONDS"])
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if doc is None:
+                    return
+                if setores and doc.get("localizacao") not in setores:
+                    continue
+                yield _event("estado", doc)
+        finally:
+            feed.unsubscribe(q)
+
+    response = Response(events(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # no proxy buffering (nginx)
+    return response
@@ -1,99 +1,281 @@
-import json
-import paho.mqtt.client as mqtt
-from pymongo import MongoClient
-from datetime import datetime
-import ssl
-import time
-import configparser
-import os
-
-#============================
-# LOAD CONFIG FROM ROOT config.ini
-#============================
-config = configparser.ConfigParser()
-config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
-config.read(config_path, encoding="utf-8")
-
-#============================
-# MONGODB ATLAS CONFIG
-#============================
-MONGO_URI = config.get("MongoIot", "uri")
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client[config.get("MongoIot", "db", fallback="iot_db")]
-collection = db[config.get("MongoIot", "collection_raw", fallback="leituras_brutas")]  # raw data collection
-
-#============================
-# MQTT (HIVEMQ CLOUD) CONFIG
-#============================
-MQTT_BROKER = config.get("MQTT", "broker")
-MQTT_PORT = config.getint("MQTT", "port")
-MQTT_USER = config.get("MQTT", "user")
-MQTT_PASS = config.get("MQTT", "password")
-
-MQTT_TOPIC = config.get("MQTT", "topic")
-
-
-#============================
-# CALLBACK: on connect
-#============================
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
-        print("[OK] Connected to HiveMQ!")
-        client.subscribe(MQTT_TOPIC)
-        print(f"[OK] Subscribed to topic: {MQTT_TOPIC}")
-    else:
-        print(f"[ERROR] Connection failed. Code: {rc}")
-
-
-#============================
-# CALLBACK: on message
-#============================
-def on_message(client, userdata, msg):
-    try:
-        payload = msg.payload.decode()
-        data = json.loads(payload)
-
-        # Add reception timestamp
-        data["received_at"] = datetime.utcnow()
-
-        # Save to MongoDB Atlas
-        collection.insert_one(data)
-
-        print(f"[MongoDB] Inserted: {data}")
-
-    except json.JSONDecodeError:
-        print("[ERROR] Received message is not valid JSON:")
-        print(msg.payload.decode())
-
-    except Exception as e:
-        print("[ERROR] Failed to save to Mongo or process message:", e)
-
-
-#============================
-# CREATE MQTT CLIENT
-#============================
-client = mqtt.Client()
-
-client.username_pw_set(MQTT_USER, MQTT_PASS)
-client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLS)
-
-client.on_connect = on_connect
-client.on_message = on_message
-
-
-#============================
-# MAIN LOOP WITH RECONNECT
-#============================
-if __name__ == "__main__":
-    while True:
-        try:
-            print("[INFO] Connecting to HiveMQ...")
-            client.connect(MQTT_BROKER, MQTT_PORT, keepalive=60)
-            client.loop_forever()
-
-        except Exception as e:
-            print("[ERROR] Connection lost. Reconnecting in 5 seconds...")
-            print("Details:", e)
-            time.sleep(5)
-
-
+import json
+import gzip
+import paho.mqtt.client as mqtt
+from datetime import datetime
+import ssl
+import sys
+import time
+import signal
+import socket
+import argparse
+import configparser
+import multiprocessing
+import os
+
+from wire_format import is_binary, decode_columns, columns_to_documents, parse_timestamp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common import mongo, buckets
+
+#============================
+# LOAD CONFIG FROM ROOT config.ini
+#============================
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+#============================
+# MQTT (HIVEMQ CLOUD) CONFIG
+#============================
+MQTT_BROKER = config.get("MQTT", "broker")
+MQTT_PORT = config.getint("MQTT", "port")
+MQTT_USER = config.get("MQTT", "user", fallback="")
+MQTT_PASS = config.get("MQTT", "password", fallback=None)
+MQTT_TLS = config.getboolean("MQTT", "tls", fallback=True)
+
+MQTT_TOPIC = config.get("MQTT", "topic")
+
+# Scale-out: N workers join the shared subscription $share/<group>/<topic>,
+# and the broker hands each message to exactly one of them
+BRIDGE_WORKERS = config.getint("MQTT", "workers", fallback=1)
+SHARE_GROUP = config.get("MQTT", "share_group", fallback="").strip()
+STATS_INTERVAL = config.getint("MQTT", "stats_interval", fallback=30)
+LOG_MESSAGES = config.getboolean("MQTT", "log_messages", fallback=True)
+
+
+def subscriptions(share_group=None):
+    """
+    Main topic + sub-topics (batches, e.g. sensores/ar/lote), optionally as a
+    shared subscription. "<topic>/#" alone also matches "<topic>"; subscribing
+    to both would deliver those messages twice (to two workers when shared).
+    """
+    topic = f"{MQTT_TOPIC}/#"
+    if share_group:
+        topic = f"$share/{share_group}/{topic}"
+    return [(topic, 0)]
+
+
+#============================
+# CALLBACK: on connect
+#============================
+def on_connect(client, userdata, flags, rc):
+    if rc == 0:
+        print(f"[OK] {userdata.name} connected to the broker!")
+        topics = subscriptions(userdata.share_group)
+        client.subscribe(topics)
+        print(f"[OK] {userdata.name} subscribed to: {', '.join(t for t, _ in topics)}")
+    else:
+        print(f"[ERROR] {userdata.name}: connection failed. Code: {rc}")
+
+
+#============================
+# CALLBACK: on message
+#============================
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def on_message(client, userdata, msg):
+    userdata.messages += 1
+    try:
+        raw = msg.payload
+        if raw[:2] == GZIP_MAGIC:
+            raw = gzip.decompress(raw)
+
+        if is_binary(raw, msg.topic):
+            # Compact struct layout: decoded in batch into column arrays
+            docs = columns_to_documents(decode_columns(raw))
+        else:
+            payload = raw.decode()
+            data = json.loads(payload)
+
+            # A message may hold a single reading or a batch (JSON array)
+            docs = data if isinstance(data, list) else [data]
+
+        received_at = datetime.utcnow()
+        for doc in docs:
+            # Add reception timestamp
+            doc["received_at"] = received_at
+            if "timestamp" in doc:
+                doc["timestamp"] = parse_timestamp(doc["timestamp"])
+
+        # Save to MongoDB Atlas
+        if len(docs) == 1:
+            userdata.collection.insert_one(docs[0])
+            if LOG_MESSAGES:
+                print(f"[MongoDB] Inserted: {docs[0]}")
+        elif docs:
+            userdata.collection.insert_many(docs)
+            if LOG_MESSAGES:
+                print(f"[MongoDB] Inserted batch of {len(docs)} readings from {msg.topic}")
+        userdata.readings += len(docs)
+
+    except json.JSONDecodeError:
+        userdata.errors += 1
+        print("[ERROR] Received message is not valid JSON:")
+        print(msg.payload.decode(errors="replace"))
+
+    except Exception as e:
+        userdata.errors += 1
+        print("[ERROR] Failed to save to Mongo or process message:", e)
+
+
+#============================
+# WORKER
+#============================
+class BridgeWorker:
+    """
+    One MQTT client (paho network loop in a background thread) writing to
+    the raw collection. Keeps message / reading / error counters and
+    reports throughput every STATS_INTERVAL seconds, to stdout and to
+    Pipeline_Metricas (_id = mqtt_bridge:<host>:<index>).
+    """
+
+    def __init__(self, worker_index, broker, port, tls=True, share_group=None):
+        self.name = f"bridge-{worker_index}"
+        self.worker_id = f"{socket.gethostname()}:{worker_index}"
+        self.broker, self.port = broker, port
+        self.share_group = share_group
+        if buckets.enabled("iot_raw"):
+            self.collection = buckets.BucketWriter("iot_raw", workload="ingest")  # per-device buckets
+        else:
+            self.collection = mongo.get_collection("iot_raw", workload="ingest")  # raw data collection
+        self.metrics = mongo.get_collection("metrics", workload="ingest")
+        self.messages = self.readings = self.errors = 0
+
+        # Unique id per worker: the broker drops an older session with the same id
+        self.client = mqtt.Client(client_id=f"mqtt-bridge-{socket.gethostname()}-{worker_index}-{os.getpid()}")
+        # Credentials and TLS are independent: a local broker may require a login without TLS
+        if MQTT_USER:
+            self.client.username_pw_set(MQTT_USER, MQTT_PASS)
+        if tls:
+            self.client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLS)
+        self.client.user_data_set(self)
+        self.client.on_connect = on_connect
+        self.client.on_message = on_message
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+
+    def connect(self):
+        while True:
+            try:
+                print(f"[INFO] {self.name}: connecting to {self.broker}:{self.port}...")
+                self.client.connect(self.broker, self.port, keepalive=60)
+                return
+            except Exception as e:
+                print(f"[ERROR] {self.name}: connection failed. Retrying in 5 seconds...")
+                print("Details:", e)
+                time.sleep(5)
+
+    def report(self, elapsed, last):
+        msgs, readings = self.messages - last[0], self.readings - last[1]
+        stats = {
+            "worker": self.worker_id,
+            "mensagens": self.messages,
+            "leituras": self.readings,
+            "erros": self.errors,
+            "msgs_por_s": round(msgs / elapsed, 1),
+            "leituras_por_s": round(readings / elapsed, 1),
+            "conectado": self.client.is_connected(),
+            "atualizado_em": datetime.now(),
+        }
+        print(
+            f"[STATS] {self.name}: {stats['msgs_por_s']} msg/s | {stats['leituras_por_s']} leituras/s | "
+            f"total {self.messages} msgs, {self.readings} leituras, {self.errors} erros"
+        )
+        try:
+            self.metrics.update_one({"_id": f"mqtt_bridge:{self.worker_id}"}, {"$set": stats}, upsert=True)
+        except Exception as e:
+            print(f"[WARN] {self.name}: could not publish stats: {e}")
+
+    def run(self, stop_event=None):
+        self.connect()
+        self.client.loop_start()  # paho reconnects on its own after this
+        last, started = (0, 0), time.monotonic()
+        try:
+            while stop_event is None or not stop_event.is_set():
+                time.sleep(STATS_INTERVAL)
+                now = time.monotonic()
+                self.report(now - started, last)
+                last, started = (self.messages, self.readings), now
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.client.disconnect()
+            self.client.loop_stop()
+            print(f"[INFO] {self.name} stopped.")
+
+
+def run_worker(worker_index, broker, port, tls, share_group):
+    BridgeWorker(worker_index, broker, port, tls, share_group).run()
+
+
+def _supervised_worker(*args):
+    # Stopped by the supervisor (SIGTERM -> KeyboardInterrupt), not by the terminal's Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(*args)
+
+
+#============================
+# SUPERVISOR
+#============================
+def start_supervisor(num_workers, broker, port, tls, share_group):
+    """Spawn N bridge processes on the same shared subscription and restart any that die."""
+    print(f"[INFO] MQTT bridge: {num_workers} workers on {subscriptions(share_group)[0][0]}")
+    processes = {}
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM (systemd, docker stop) behaves like Ctrl+C; the workers inherit the handler
+    signal.signal(signal.SIGTERM, stop)
+
+    def spawn(index):
+        proc = multiprocessing.Process(
+            target=_supervised_worker, args=(index, broker, port, tls, share_group), name=f"mqtt-bridge-{index}"
+        )
+        proc.start()
+        processes[index] = proc
+
+    for index in range(num_workers):
+        spawn(index)
+
+    try:
+        while True:
+            time.sleep(5)
+            for index, proc in list(processes.items()):
+                if not proc.is_alive():
+                    print(f"[WARN] Worker {index} exited (code {proc.exitcode}). Restarting...")
+                    spawn(index)
+    except KeyboardInterrupt:
+        print("[INFO] Stopping workers...")
+        for proc in processes.values():
+            proc.terminate()
+        for proc in processes.values():
+            proc.join(timeout=30)
+
+
+#============================
+# MAIN
+#============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MQTT -> MongoDB bridge")
+    parser.add_argument("--workers", type=int, default=BRIDGE_WORKERS)
+    parser.add_argument(
+        "--worker-only",
+        type=int,
+        metavar="INDEX",
+        help="Run a single worker in this process (e.g. on another host); joins the shared group",
+    )
+    parser.add_argument("--share-group", default=SHARE_GROUP, help="Shared subscription group (default: bridge)")
+    parser.add_argument("--broker", default=MQTT_BROKER)
+    parser.add_argument("--port", type=int, default=MQTT_PORT)
+    parser.add_argument("--no-tls", action="store_true", help="Plain MQTT (local mosquitto)")
+    args = parser.parse_args()
+
+    tls = MQTT_TLS and not args.no_tls
+    if args.worker_only is not None:
+        run_worker(args.worker_only, args.broker, args.port, tls, args.share_group or "bridge")
+    elif args.workers > 1:
+        start_supervisor(args.workers, args.broker, args.port, tls, args.share_group or "bridge")
+    else:
+        # Single process: plain subscription unless a share group is configured
+        run_worker(0, args.broker, args.port, tls, args.share_group or None)
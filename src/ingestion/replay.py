@@ -0,0 +1,385 @@
+import os
+import ssl
+import sys
+import json
+import time
+import uuid
+import base64
+import argparse
+import threading
+import configparser
+from datetime import datetime
+
+import numpy as np
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common import mongo, buckets
+
+#============================
+# LOAD CONFIG FROM ROOT config.ini
+#============================
+config = configparser.ConfigParser()
+config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
+config.read(config_path, encoding="utf-8")
+
+# Mongo collection (common/mongo.py logical name) written by each ingestion target
+TARGET_COLLECTIONS = {
+    "mqtt": "iot_raw",
+    "http": "local_sensores",
+}
+
+#============================
+# RECORDING FORMAT
+#============================
+# JSON Lines, one inbound message per line:
+#   {"t": <seconds since first message>, "topic": "...", "payload": "<base64>"}
+# Payloads are kept byte-exact (JSON, gzip or binary wire format).
+
+
+def _line(t, topic, payload):
+    return json.dumps({"t": round(t, 6), "topic": topic, "payload": base64.b64encode(payload).decode()})
+
+
+def load_recording(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+#============================
+# RECORDERS
+#============================
+def record_mqtt(out_path, duration, broker, port, tls=True):
+    """Subscribe to the ingestion topic and record messages with their arrival offsets."""
+    import paho.mqtt.client as mqtt
+
+    topic = config.get("MQTT", "topic")
+    started = None
+    count = 0
+    lock = threading.Lock()
+    out = open(out_path, "w", encoding="utf-8")
+
+    def on_connect(client, userdata, flags, rc):
+        client.subscribe(f"{topic}/#", 0)  # also matches the topic itself
+        print(f"[OK] Recording {topic}/# -> {out_path}")
+
+    def on_message(client, userdata, msg):
+        nonlocal started, count
+        now = time.monotonic()
+        with lock:
+            if started is None:
+                started = now
+            out.write(_line(now - started, msg.topic, msg.payload) + "\n")
+            count += 1
+
+    client = _mqtt_client(tls)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(broker, port, keepalive=60)
+    client.loop_start()
+    try:
+        time.sleep(duration)
+    except KeyboardInterrupt:
+        pass
+    client.loop_stop()
+    out.close()
+    print(f"[INFO] {count} messages recorded.")
+
+
+def record_mongo(out_path, target, start, end):
+    """
+    Rebuild a recording from documents already stored by an ingestion
+    target, using their reception timestamps as the timing.
+    """
+    time_field = "received_at" if target == "mqtt" else "created_at"
+    name = TARGET_COLLECTIONS[target]
+    topic = config.get("MQTT", "topic", fallback="sensores/ar")
+
+    if buckets.enabled(name):
+        coll = buckets.get_collection(name, workload="dashboard")
+        df = buckets.find_range(coll, name, start, end).sort_values(time_field)
+        cursor = (
+            {k: v for k, v in row.items() if v is not None and v == v}
+            for row in df.astype(object).to_dict("records")
+        )
+    else:
+        coll = mongo.get_collection(name, workload="dashboard")
+        cursor = coll.find({time_field: {"$gte": start, "$lt": end}}, {"_id": 0}).sort(time_field, 1)
+    first = None
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for doc in cursor:
+            arrived = doc.pop(time_field)
+            arrived = arrived.to_pydatetime() if hasattr(arrived, "to_pydatetime") else arrived
+            first = first or arrived
+            for key in ("_replay_run", "_replay_seq"):
+                doc.pop(key, None)
+            payload = json.dumps(doc, default=str).encode()
+            out.write(_line((arrived - first).total_seconds(), topic, payload) + "\n")
+            count += 1
+    print(f"[INFO] {count} messages rebuilt from {coll.full_name} -> {out_path}")
+
+
+#============================
+# REPLAY
+#============================
+def tag_payload(payload, run_id, seq):
+    """Inject replay markers into JSON payloads. Binary/gzip payloads are sent untracked."""
+    try:
+        data = json.loads(payload.decode())
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return payload, False
+
+    docs = data if isinstance(data, list) else [data]
+    for doc in docs:
+        doc["_replay_run"] = run_id
+        doc["_replay_seq"] = seq
+    return json.dumps(data).encode(), True
+
+
+class VisibilityWatcher(threading.Thread):
+    """Polls Mongo for replayed documents and records publish -> visible latency."""
+
+    def __init__(self, coll, run_id, poll_interval=0.02, bucketed=False):
+        super().__init__(daemon=True)
+        self.coll = coll
+        self.bucketed = bucketed
+        self.run_id = run_id
+        self.poll_interval = poll_interval
+        self.pending = {}  # seq -> publish time (perf_counter)
+        self.latencies = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def published(self, seq, at):
+        with self.lock:
+            self.pending[seq] = at
+
+    def run(self):
+        while not self.stopped.is_set():
+            with self.lock:
+                seqs = list(self.pending)
+            if seqs:
+                found = self._visible(seqs)
+                now = time.perf_counter()
+                with self.lock:
+                    for seq in found:
+                        sent = self.pending.pop(seq, None)
+                        if sent is not None:
+                            self.latencies.append(now - sent)
+            time.sleep(self.poll_interval)
+
+    def _visible(self, seqs):
+        if not self.bucketed:
+            found = self.coll.find(
+                {"_replay_run": self.run_id, "_replay_seq": {"$in": seqs}}, {"_replay_seq": 1}
+            )
+            return [doc["_replay_seq"] for doc in found]
+
+        # Bucketed layout: replay markers live in the per-reading `outros` array
+        found = self.coll.find(
+            {"outros": {"$elemMatch": {"_replay_run": self.run_id, "_replay_seq": {"$in": seqs}}}},
+            {"outros": 1},
+        )
+        return [
+            extra["_replay_seq"]
+            for bucket in found
+            for extra in bucket.get("outros") or []
+            if extra and extra.get("_replay_run") == self.run_id
+        ]
+
+    def wait_idle(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if not self.pending:
+                    return
+            time.sleep(0.05)
+
+
+class MqttSender:
+    def __init__(self, broker, port, tls):
+        self.client = _mqtt_client(tls)
+        self.client.connect(broker, port, keepalive=60)
+        self.client.loop_start()
+
+    def send(self, topic, payload):
+        self.client.publish(topic, payload, qos=1)
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class HttpSender:
+    """POSTs to a running API (--http-url) or straight into the Flask app in-process."""
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url
+        if base_url:
+            import requests
+
+            self.session = requests.Session()
+        else:
+            from http_api import app
+
+            self.client = app.test_client()
+
+    def send(self, topic, payload):
+        route = "/api/sensors/batch" if payload[:1] == b"[" else "/api/sensors"
+        headers = {"Content-Type": "application/json"}
+        if self.base_url:
+            response = self.session.post(self.base_url.rstrip("/") + route, data=payload, headers=headers)
+            status = response.status_code
+        else:
+            status = self.client.post(route, data=payload, headers=headers).status_code
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status}")
+
+    def close(self):
+        pass
+
+
+def _mqtt_client(tls):
+    import paho.mqtt.client as mqtt
+
+    client = mqtt.Client()
+    # Credentials and TLS are independent: a local broker may require a login without TLS
+    if config.get("MQTT", "user", fallback=""):
+        client.username_pw_set(config.get("MQTT", "user"), config.get("MQTT", "password", fallback=None))
+    if tls:
+        client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLS)
+    return client
+
+
+def replay(messages, sender, watcher, speed, run_id):
+    """Send messages on the recorded schedule divided by `speed` (0 = as fast as possible)."""
+    sent = tracked = errors = 0
+    started = time.perf_counter()
+
+    for seq, message in enumerate(messages):
+        if speed:
+            delay = started + message["t"] / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        payload, is_tracked = tag_payload(base64.b64decode(message["payload"]), run_id, seq)
+        try:
+            at = time.perf_counter()
+            if is_tracked:
+                watcher.published(seq, at)
+            sender.send(message["topic"], payload)
+            sent += 1
+            tracked += is_tracked
+        except Exception as e:
+            errors += 1
+            with watcher.lock:
+                watcher.pending.pop(seq, None)
+            if errors <= 5:
+                print(f"[ERROR] message {seq}: {e}")
+
+    return sent, tracked, errors, time.perf_counter() - started
+
+
+def report(sent, tracked, errors, elapsed, latencies, lost):
+    print("\n========== REPLAY REPORT ==========")
+    print(f"Sent: {sent} ({tracked} tracked) | errors: {errors} | not visible: {lost}")
+    print(f"Send duration: {elapsed:.2f}s ({sent / max(elapsed, 1e-9):,.0f} msg/s)")
+    if latencies:
+        ms = np.array(latencies) * 1000
+        p50, p90, p95, p99 = np.percentile(ms, [50, 90, 95, 99])
+        print(
+            f"Publish -> visible in Mongo (ms): p50={p50:.1f} p90={p90:.1f} "
+            f"p95={p95:.1f} p99={p99:.1f} max={ms.max():.1f}"
+        )
+
+
+def run_replay(args):
+    messages = load_recording(args.recording)
+    if not messages:
+        print("[ERROR] Empty recording.")
+        return
+
+    name = TARGET_COLLECTIONS[args.target]
+    bucketed = buckets.enabled(name)
+    if bucketed:
+        name = f"{name}_buckets"
+    if args.mongo_uri:
+        target, coll_name = mongo.COLLECTIONS[name]
+        coll = MongoClient(args.mongo_uri)[mongo.TARGETS[target][1]][coll_name]
+    else:
+        coll = mongo.get_collection(name, workload="ingest")
+    if bucketed:
+        coll.create_index([("outros._replay_run", 1), ("outros._replay_seq", 1)], sparse=True)
+    else:
+        coll.create_index([("_replay_run", 1), ("_replay_seq", 1)], sparse=True)
+
+    run_id = f"replay-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    speed = 0 if args.speed == "max" else float(args.speed)
+    print(f"[INFO] {run_id}: {len(messages)} messages -> {args.target} at {args.speed}x")
+
+    if args.target == "mqtt":
+        sender = MqttSender(args.broker, args.port, tls=not args.no_tls)
+    else:
+        sender = HttpSender(args.http_url)
+
+    watcher = VisibilityWatcher(coll, run_id, bucketed=bucketed)
+    watcher.start()
+    try:
+        sent, tracked, errors, elapsed = replay(messages, sender, watcher, speed, run_id)
+        watcher.wait_idle(args.timeout)
+    finally:
+        watcher.stopped.set()
+        sender.close()
+
+    report(sent, tracked, errors, elapsed, watcher.latencies, len(watcher.pending))
+
+    if args.cleanup and bucketed:
+        # Replayed readings share buckets with real ones; parallel arrays cannot be pulled per reading
+        print("[WARN] Cleanup skipped: bucketed collections keep replayed readings (marked in 'outros').")
+    elif args.cleanup:
+        deleted = coll.delete_many({"_replay_run": run_id}).deleted_count
+        print(f"[INFO] Cleanup: {deleted} replayed documents removed.")
+
+
+#============================
+# MAIN
+#============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record / replay ingestion traffic")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Record inbound traffic to a JSONL file")
+    rec.add_argument("source", choices=["mqtt", "mongo"])
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--duration", type=float, default=300, help="mqtt: seconds to record")
+    rec.add_argument("--target", choices=list(TARGET_COLLECTIONS), default="mqtt", help="mongo: collection to rebuild from")
+    rec.add_argument("--start", type=datetime.fromisoformat)
+    rec.add_argument("--end", type=datetime.fromisoformat)
+    rec.add_argument("--broker", default=config.get("MQTT", "broker", fallback="localhost"))
+    rec.add_argument("--port", type=int, default=config.getint("MQTT", "port", fallback=8883))
+    rec.add_argument("--no-tls", action="store_true")
+
+    rep = sub.add_parser("replay", help="Replay a recording and report latency percentiles")
+    rep.add_argument("recording")
+    rep.add_argument("--target", choices=["mqtt", "http"], default="mqtt")
+    rep.add_argument("--speed", default="1", help="1, 10, ... or max")
+    rep.add_argument("--broker", default="localhost")
+    rep.add_argument("--port", type=int, default=1883)
+    rep.add_argument("--no-tls", action="store_true", help="Plain MQTT (local mosquitto)")
+    rep.add_argument("--http-url", help="Running API base URL (default: Flask app in-process)")
+    rep.add_argument("--mongo-uri", help="Override the Mongo URI watched for visibility")
+    rep.add_argument("--timeout", type=float, default=30, help="Seconds to wait for stragglers")
+    rep.add_argument("--cleanup", action="store_true", help="Delete replayed documents afterwards")
+
+    args = parser.parse_args()
+
+    if args.command == "record" and args.source == "mqtt":
+        record_mqtt(args.out, args.duration, args.broker, args.port, tls=not args.no_tls)
+    elif args.command == "record":
+        if not (args.start and args.end):
+            print("[ERROR] --start and --end are required for 'record mongo'.")
+            sys.exit(1)
+        record_mongo(args.out, args.target, args.start, args.end)
+    else:
+        run_replay(args)
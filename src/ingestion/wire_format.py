@@ -0,0 +1,126 @@
+import struct
+import calendar
+from datetime import datetime
+
+import numpy as np
+
+#============================
+# COMPACT BINARY WIRE FORMAT
+#============================
+# Fixed little-endian struct layout, many readings per message:
+#
+#   header  (8 bytes)  magic 0xA7 | version | reserved (2) | uint32 count
+#   record  (36 bytes) uint32 timestamp (epoch s, UTC) | 16s dispositivo
+#                      float32 temperatura | humidade | gases_ppm | pm25
+#
+# The first byte cannot start a JSON document or a gzip stream, so the
+# bridge can tell the formats apart by header byte alone (or by the
+# "/bin" topic suffix). Records decode in one np.frombuffer call straight
+# into column arrays.
+
+MAGIC = 0xA7
+VERSION = 1
+BINARY_TOPIC_SUFFIX = "/bin"
+
+HEADER = struct.Struct("<BBHI")
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "<u4"),
+        ("dispositivo", "S16"),
+        ("temperatura", "<f4"),
+        ("humidade", "<f4"),
+        ("gases_ppm", "<f4"),
+        ("pm25", "<f4"),
+    ]
+)
+
+MEASUREMENTS = ["temperatura", "humidade", "gases_ppm", "pm25"]
+
+
+def is_binary(payload, topic=""):
+    return topic.endswith(BINARY_TOPIC_SUFFIX) or payload[:1] == bytes([MAGIC])
+
+
+def device_bytes(dispositivo):
+    """UTF-8 device id cut to 16 bytes on a character boundary (never half a multi-byte char)."""
+    return str(dispositivo).encode("utf-8")[:16].decode("utf-8", "ignore").encode("utf-8")
+
+
+def encode_readings(readings):
+    """
+    Pack a list of reading dicts (timestamp as datetime or epoch seconds).
+    Naive datetimes are taken as UTC, like `received_at` in the bridge.
+    """
+    records = np.zeros(len(readings), dtype=RECORD_DTYPE)
+    for i, reading in enumerate(readings):
+        ts = reading["timestamp"]
+        records[i]["timestamp"] = (
+            calendar.timegm(ts.utctimetuple()) if isinstance(ts, datetime) else int(ts)
+        )
+        records[i]["dispositivo"] = device_bytes(reading.get("dispositivo", ""))
+        for field in MEASUREMENTS:
+            records[i][field] = reading.get(field, np.nan)
+    return HEADER.pack(MAGIC, VERSION, 0, len(records)) + records.tobytes()
+
+
+def encode_columns(columns):
+    """Pack column arrays (same keys as RECORD_DTYPE) without a per-row Python loop."""
+    count = len(columns["timestamp"])
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    for field in RECORD_DTYPE.names:
+        records[field] = columns[field]
+    return HEADER.pack(MAGIC, VERSION, 0, count) + records.tobytes()
+
+
+def decode_columns(payload):
+    """Decode a binary message into {field: np.ndarray}."""
+    magic, version, _, count = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Invalid binary header byte: {magic:#x}")
+    if version != VERSION:
+        raise ValueError(f"Unsupported wire format version: {version}")
+
+    expected = HEADER.size + count * RECORD_DTYPE.itemsize
+    if len(payload) != expected:
+        raise ValueError(f"Truncated binary payload: {len(payload)} bytes, expected {expected}")
+
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+    return {field: records[field] for field in RECORD_DTYPE.names}
+
+
+def columns_to_documents(columns):
+    """Column arrays -> list of Mongo documents (column-wise conversion, then zip)."""
+    timestamps = columns["timestamp"].astype("datetime64[s]").tolist()
+    # "replace": a payload from an older / foreign encoder must not drop the whole batch
+    devices = np.char.decode(columns["dispositivo"], "utf-8", errors="replace").tolist()
+    values = [np.round(columns[field].astype(np.float64), 2).tolist() for field in MEASUREMENTS]
+
+    return [
+        {
+            "timestamp": ts,
+            "dispositivo": device,
+            "temperatura": temp,
+            "humidade": hum,
+            "gases_ppm": gas,
+            "pm25": pm,
+        }
+        for ts, device, temp, hum, gas, pm in zip(timestamps, devices, *values)
+    ]
+
+
+#============================
+# JSON READINGS
+#============================
+def parse_timestamp(value):
+    """
+    ISO 8601 string -> datetime. Anything else (legacy device formats such
+    as "19/10/2026 10:00") is returned unchanged and stored as sent, so one
+    odd reading never drops the rest of its batch.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return value
@@ -1,15 +1,17 @@
 import time
 import requests
 import datetime
-import urllib.parse
 import os
+import sys
 import numpy as np
 import pandas as pd
-import joblib  # Para salvar/carregar o modelo (pip install joblib)
-from pymongo import MongoClient
-from sklearn.ensemble import RandomForestRegressor
 import configparser
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from common.forest import CompiledForest, compile_forest
+from common.scheduler import AdaptiveScheduler
+from common import mongo, buckets
+
 # ==============================================================================
 # 1. CONFIGURAÇÕES
 # ==============================================================================
@@ -19,21 +21,19 @@ config = configparser.ConfigParser()
 config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config.ini")
 config.read(config_path, encoding="utf-8")
 
-MONGO_USER = config.get("MongoAtlas", "user")
-MONGO_PASS = config.get("MongoAtlas", "password")
-MONGO_CLUSTER = config.get("MongoAtlas", "cluster")
 MONGO_APP_NAME = config.get("MongoAtlas", "app_name_sim", fallback="Quality-of-Air-Sim")
 
-username = urllib.parse.quote_plus(MONGO_USER)
-password = urllib.parse.quote_plus(MONGO_PASS)
-
-MONGO_URI = f"mongodb+srv://{username}:{password}@{MONGO_CLUSTER}/?retryWrites=true&w=majority&appName={MONGO_APP_NAME}"
-
-DB_NAME = config.get("MongoAtlas", "db_monitoramento", fallback="Monitoramento_do_Ar")
-COLLECTION_NAME = config.get("MongoAtlas", "collection_sensores", fallback="Leituras_Sensores")
-
 INTERVALO_LEITURA = 300
 
+SIM_CONFIG = {
+    # separado = duas florestas (mais precisas nos gases) | multi = uma floresta multi-saída (PM2.5 + gases)
+    "TWIN_MODE": config.get("Simulation", "twin_mode", fallback="separado"),
+    "SYNTHETIC_ROWS": config.getint("Simulation", "synthetic_rows", fallback=6000),
+    "SYNTHETIC_SEED": config.getint("Simulation", "synthetic_seed", fallback=42),
+    "SYNTHETIC_CHUNK_ROWS": config.getint("Simulation", "synthetic_chunk_rows", fallback=500000),
+    "N_JOBS": config.getint("Simulation", "n_jobs", fallback=-1),
+}
+
 GOIANIA_LAT = float(config.get("Geo", "goiania_lat", fallback="-16.6869"))
 GOIANIA_LON = float(config.get("Geo", "goiania_lon", fallback="-49.2648"))
 
@@ -42,36 +42,28 @@ GOIANIA_LON = float(config.get("Geo", "goiania_lon", fallback="-49.2648"))
 # ==============================================================================
 
 
-class DigitalTwinAI:
-    def __init__(self):
-        print("\n🧠 [AI] Inicializando Motor V4 (Pico de Almoço Suavizado)...")
-        self.model_pm25 = None
-        self.model_gases = None
-        self.file_pm25 = "model_pm25.pkl"
-        self.file_gases = "model_gases.pkl"
+FEATURES = ["hora", "dia_semana", "temp", "umidade", "fator_local"]
 
-        # Tenta carregar modelos existentes para economizar tempo
-        if os.path.exists(self.file_pm25) and os.path.exists(self.file_gases):
-            print("📂 [AI] Carregando modelos pré-treinados do disco...")
-            self.model_pm25 = joblib.load(self.file_pm25)
-            self.model_gases = joblib.load(self.file_gases)
-        else:
-            print("⚙️ [AI] Modelos não encontrados. Iniciando treinamento...")
-            self._treinar_modelos()
-            print("✅ [AI] Modelos treinados e salvos no disco.\n")
-
-    def _gerar_dados_sinteticos(self):
-        """
-        Gera dados onde o almoço é um 'bump' suave, não um pico agressivo.
-        """
-        n_samples = 6000
-        np.random.seed(42)
-
-        hora = np.random.randint(0, 24, n_samples)
-        dia_semana = np.random.randint(0, 7, n_samples)
-        temp = np.random.normal(30, 4, n_samples)
-        umidade = np.random.uniform(15, 90, n_samples)
-        fator_local = np.random.choice([0.8, 1.0, 1.2, 1.4], n_samples)
+
+def gerar_corpus_sintetico(n_samples=None, seed=None, chunk_size=None):
+    """
+    Corpus sintético em blocos vetorizados de até `chunk_size` linhas:
+    produz (X, y_pm25, y_gases) por bloco, reprodutível pela `seed`.
+    O almoço é um 'bump' suave, não um pico agressivo.
+    """
+    n_samples = n_samples or SIM_CONFIG["SYNTHETIC_ROWS"]
+    seed = SIM_CONFIG["SYNTHETIC_SEED"] if seed is None else seed
+    chunk_size = chunk_size or SIM_CONFIG["SYNTHETIC_CHUNK_ROWS"]
+    rng = np.random.default_rng(seed)
+
+    for inicio in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - inicio)
+
+        hora = rng.integers(0, 24, n)
+        dia_semana = rng.integers(0, 7, n)
+        temp = rng.normal(30, 4, n)
+        umidade = rng.uniform(15, 90, n)
+        fator_local = rng.choice([0.8, 1.0, 1.2, 1.4], n)
 
         # --- FÍSICA DE TRÁFEGO V4 ---
         is_fds = dia_semana >= 5
@@ -96,7 +88,7 @@ class DigitalTwinAI:
         # 1. GASES (MQ-135)
         y_gases = (120 + (trafego_base * 320)) * fator_local
         y_gases += temp * 3
-        y_gases += np.random.normal(0, 15, n_samples)
+        y_gases += rng.normal(0, 15, n)
         y_gases = np.clip(y_gases, 40, 750)
 
         # 2. PM2.5 (Poeira Fina)
@@ -106,71 +98,174 @@ class DigitalTwinAI:
         fator_limpeza = np.where(umidade > 80, 0.6, 1.0 - (umidade / 450))
         y_pm25 = y_pm25 * fator_limpeza
 
-        y_pm25 += np.random.normal(0, 1.5, n_samples)
+        y_pm25 += rng.normal(0, 1.5, n)
 
         # CLIP: Teto realista para dias comuns
         y_pm25 = np.clip(y_pm25, 1, 90)
 
-        X = pd.DataFrame(
-            {
-                "hora": hora,
-                "dia_semana": dia_semana,
-                "temp": temp,
-                "umidade": umidade,
-                "fator_local": fator_local,
-            }
-        )
-        return X, y_pm25, y_gases
+        X = np.column_stack([hora, dia_semana, temp, umidade, fator_local]).astype(np.float32)
+        yield X, y_pm25, y_gases
+
+
+class DigitalTwinAI:
+    """
+    Gêmeo digital: prevê PM2.5 e gases a partir de hora, dia da semana,
+    clima e fator local do setor.
+
+    Modo "separado" (padrão): duas florestas (formato V4). Modo "multi":
+    uma única floresta multi-saída prevê as duas variáveis em uma chamada,
+    mais rápida, porém com erro maior nos gases.
+    """
+
+    def __init__(self, modo=None):
+        print("\n🧠 [AI] Inicializando Motor V4 (Pico de Almoço Suavizado)...")
+        self.modo = modo or SIM_CONFIG["TWIN_MODE"]
+        self.model_twin = None
+        self.model_pm25 = None
+        self.model_gases = None
+        self.file_twin = "model_twin.pkl"
+        self.file_pm25 = "model_pm25.pkl"
+        self.file_gases = "model_gases.pkl"
+        # Formato compilado (somente NumPy): dispensa o scikit-learn em runtime
+        self.file_twin_npz = "model_twin.npz"
+        self.file_pm25_npz = "model_pm25.npz"
+        self.file_gases_npz = "model_gases.npz"
+
+        # Tenta carregar modelos existentes para economizar tempo
+        if self.modo == "multi":
+            if os.path.exists(self.file_twin_npz):
+                print("📂 [AI] Carregando modelo multi-saída compilado (NumPy) do disco...")
+                self.model_twin = CompiledForest.load(self.file_twin_npz)
+                return
+            if os.path.exists(self.file_twin):
+                import joblib
+
+                print("📂 [AI] Carregando modelo multi-saída pré-treinado do disco...")
+                self.model_twin = joblib.load(self.file_twin)
+                self._exportar_compilados()
+                return
+        elif os.path.exists(self.file_pm25_npz) and os.path.exists(self.file_gases_npz):
+            print("📂 [AI] Carregando modelos compilados (NumPy) do disco...")
+            self.model_pm25 = CompiledForest.load(self.file_pm25_npz)
+            self.model_gases = CompiledForest.load(self.file_gases_npz)
+            return
+        elif os.path.exists(self.file_pm25) and os.path.exists(self.file_gases):
+            import joblib
+
+            print("📂 [AI] Carregando modelos pré-treinados do disco...")
+            self.model_pm25 = joblib.load(self.file_pm25)
+            self.model_gases = joblib.load(self.file_gases)
+            self._exportar_compilados()
+            return
+
+        print("⚙️ [AI] Modelos não encontrados. Iniciando treinamento...")
+        self._treinar_modelos()
+        print("✅ [AI] Modelos treinados e salvos no disco.\n")
+
+    def _gerar_dados_sinteticos(self, n_samples=None, seed=None):
+        """Monta o corpus inteiro em matrizes pré-alocadas, bloco a bloco."""
+        n_samples = n_samples or SIM_CONFIG["SYNTHETIC_ROWS"]
+        X = np.empty((n_samples, len(FEATURES)), dtype=np.float32)
+        y_pm25 = np.empty(n_samples)
+        y_gases = np.empty(n_samples)
+
+        inicio = 0
+        for X_bloco, pm_bloco, gases_bloco in gerar_corpus_sintetico(n_samples, seed):
+            fim = inicio + len(X_bloco)
+            X[inicio:fim], y_pm25[inicio:fim], y_gases[inicio:fim] = X_bloco, pm_bloco, gases_bloco
+            inicio = fim
+
+        return pd.DataFrame(X, columns=FEATURES), y_pm25, y_gases
 
     def _treinar_modelos(self):
+        # Treino exige scikit-learn; a inferência usa apenas os arquivos .npz
+        import joblib
+        from sklearn.compose import TransformedTargetRegressor
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+
         X, y_pm25, y_gases = self._gerar_dados_sinteticos()
+        inicio = time.perf_counter()
+
+        if self.modo == "multi":
+            # Alvos padronizados: sem isso o erro dos gases (centenas de ppm)
+            # domina as divisões e o PM2.5 perde precisão. predict() desfaz a
+            # escala, então já sai em µg/m³ e ppm.
+            self.model_twin = TransformedTargetRegressor(
+                regressor=RandomForestRegressor(
+                    n_estimators=50, max_depth=10, random_state=42, n_jobs=SIM_CONFIG["N_JOBS"]
+                ),
+                transformer=StandardScaler(),
+            )
+            self.model_twin.fit(X, np.column_stack([y_pm25, y_gases]))
+            joblib.dump(self.model_twin, self.file_twin)
+        else:
+            self.model_pm25 = RandomForestRegressor(
+                n_estimators=50, max_depth=10, random_state=42, n_jobs=SIM_CONFIG["N_JOBS"]
+            )
+            self.model_gases = RandomForestRegressor(
+                n_estimators=50, max_depth=10, random_state=42, n_jobs=SIM_CONFIG["N_JOBS"]
+            )
 
-        self.model_pm25 = RandomForestRegressor(
-            n_estimators=50, max_depth=10, random_state=42
-        )
-        self.model_gases = RandomForestRegressor(
-            n_estimators=50, max_depth=10, random_state=42
-        )
+            self.model_pm25.fit(X, y_pm25)
+            self.model_gases.fit(X, y_gases)
 
-        self.model_pm25.fit(X, y_pm25)
-        self.model_gases.fit(X, y_gases)
+            # Salva os modelos para uso futuro
+            joblib.dump(self.model_pm25, self.file_pm25)
+            joblib.dump(self.model_gases, self.file_gases)
 
-        # Salva os modelos para uso futuro
-        joblib.dump(self.model_pm25, self.file_pm25)
-        joblib.dump(self.model_gases, self.file_gases)
+        print(f"⏱️ [AI] Treino ({self.modo}, {len(X):,} linhas): {time.perf_counter() - inicio:.2f}s")
+        self._exportar_compilados()
 
-    def prever(self, data_hora, temp_real, hum_real, fator_local):
+    def _exportar_compilados(self):
+        if self.model_twin is not None:
+            compile_forest(self.model_twin).save(self.file_twin_npz)
+        else:
+            compile_forest(self.model_pm25).save(self.file_pm25_npz)
+            compile_forest(self.model_gases).save(self.file_gases_npz)
+
+    def prever_base(self, X):
+        """Previsão sem ruído para uma matriz de features (colunas FEATURES): (pm25, gases)."""
+        if self.model_twin is not None:
+            pred = self.model_twin.predict(X)
+            return pred[:, 0], pred[:, 1]
+        return self.model_pm25.predict(X), self.model_gases.predict(X)
+
+    def prever_lote(self, data_hora, temps, hums, fatores):
+        """Previsão com jitter para vários setores no mesmo instante, em uma chamada ao modelo."""
+        n = len(temps)
         entrada = pd.DataFrame(
-            [
-                {
-                    "hora": data_hora.hour,
-                    "dia_semana": data_hora.weekday(),
-                    "temp": temp_real,
-                    "umidade": hum_real,
-                    "fator_local": fator_local,
-                }
-            ]
+            {
+                "hora": np.full(n, data_hora.hour),
+                "dia_semana": np.full(n, data_hora.weekday()),
+                "temp": temps,
+                "umidade": hums,
+                "fator_local": fatores,
+            }
         )
 
         # 1. Previsão Base (Padrão Matemático)
-        pred_pm25 = self.model_pm25.predict(entrada)[0]
-        pred_gases = self.model_gases.predict(entrada)[0]
+        pred_pm25, pred_gases = self.prever_base(entrada)
 
         # 2. JITTER / RUÍDO (Simulação de Realismo)
         # Adiciona uma pequena variação aleatória para evitar dados idênticos
         # mesmo quando temperatura e hora não mudam.
 
         # Variação de +/- 2.5 no PM2.5
-        ruido_pm = np.random.uniform(-2.5, 2.5)
+        ruido_pm = np.random.uniform(-2.5, 2.5, n)
 
         # Variação de +/- 15 nos gases
-        ruido_gases = np.random.randint(-15, 15)
+        ruido_gases = np.random.randint(-15, 15, n)
 
         # Aplica o ruído garantindo que não fique negativo
-        val_final_pm = max(0.5, pred_pm25 + ruido_pm)
-        val_final_gases = max(10, pred_gases + ruido_gases)
+        val_final_pm = np.maximum(0.5, pred_pm25 + ruido_pm)
+        val_final_gases = np.maximum(10, pred_gases + ruido_gases)
 
-        return round(val_final_pm, 2), int(val_final_gases)
+        return np.round(val_final_pm, 2), val_final_gases.astype(int)
+
+    def prever(self, data_hora, temp_real, hum_real, fator_local):
+        pm25, gases = self.prever_lote(data_hora, [temp_real], [hum_real], [fator_local])
+        return float(pm25[0]), int(gases[0])
 
 
 # ==============================================================================
@@ -244,76 +339,88 @@ def get_clima_real():
 # ==============================================================================
 
 
+def coletar_leituras(ai_engine, collection):
+    """Um ciclo do simulador: clima real + previsão da IA para cada setor -> MongoDB."""
+    timestamp_now = datetime.datetime.now()
+    print(f"\n[{timestamp_now.strftime('%H:%M:%S')}] Coletando dados ambientais...")
+
+    clima = get_clima_real()
+    print(
+        f"☁️  Clima Real: {clima['temp_base']}°C | Umidade: {clima['hum_base']}%"
+    )
+
+    novos_dados = []
+
+    # Uma única chamada ao modelo para todos os setores do tick
+    temps = [clima["temp_base"] + d["temp_offset"] for d in SETORES.values()]
+    pm25_lote, gases_lote = ai_engine.prever_lote(
+        timestamp_now,
+        temps,
+        [clima["hum_base"]] * len(SETORES),
+        [d["fator"] for d in SETORES.values()],
+    )
+
+    for (nome_setor, dados_setor), temp_local, pm25_ia, gases_ia in zip(
+        SETORES.items(), temps, pm25_lote.tolist(), gases_lote.tolist()
+    ):
+        payload = {
+            "timestamp": timestamp_now,
+            "localizacao": nome_setor,
+            "temperatura": round(temp_local, 2),
+            "humidade": clima["hum_base"],
+            "gases_ppm": gases_ia,
+            "pm25": pm25_ia,
+            "latitude": dados_setor["coords"]["lat"],
+            "longitude": dados_setor["coords"]["lon"],
+            "origem_dado": "AI_RandomForest_V4",
+        }
+
+        novos_dados.append(payload)
+
+        # Visualização de Debug (Escala US EPA)
+        if pm25_ia < 12:
+            estado = "🟢 BOM"
+        elif pm25_ia < 35:
+            estado = "🟡 MODERADO"
+        elif pm25_ia < 55:
+            estado = "🟠 RUIM (Sensíveis)"
+        else:
+            estado = "🔴 RUIM (Todos)"
+
+        print(f"   > {nome_setor:<25} | PM2.5: {pm25_ia:>5.1f} | {estado}")
+
+    if novos_dados:
+        collection.insert_many(novos_dados)
+        print("💾 Dados salvos.")
+
+
 def main():
     print(f"--- Sistema IoT: Goiânia (Powered by AI V4 - Com Jitter) ---")
 
     try:
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        collection = db[COLLECTION_NAME]
-        client.admin.command("ping")
+        collection = mongo.get_collection("raw", workload="ingest", appname=MONGO_APP_NAME)
+        collection.database.client.admin.command("ping")
         print("✅ MongoDB Atlas: CONECTADO")
     except Exception as e:
         print(f"❌ Erro Crítico MongoDB: {e}")
         return
 
-    ai_engine = DigitalTwinAI()
-
-    try:
-        while True:
-            timestamp_now = datetime.datetime.now()
-            print(f"\n[{timestamp_now.strftime('%H:%M:%S')}] Coletando dados ambientais...")
+    if buckets.enabled("raw"):
+        # Layout em buckets: um documento por setor e período, leituras em arrays
+        collection = buckets.BucketWriter("raw", workload="ingest", appname=MONGO_APP_NAME)
+        print("🪣 Gravando leituras em buckets por setor.")
 
-            clima = get_clima_real()
-            print(
-                f"☁️  Clima Real: {clima['temp_base']}°C | Umidade: {clima['hum_base']}%"
-            )
+    ai_engine = DigitalTwinAI()
 
-            novos_dados = []
-
-            for nome_setor, dados_setor in SETORES.items():
-                temp_local = clima["temp_base"] + dados_setor["temp_offset"]
-
-                pm25_ia, gases_ia = ai_engine.prever(
-                    data_hora=timestamp_now,
-                    temp_real=temp_local,
-                    hum_real=clima["hum_base"],
-                    fator_local=dados_setor["fator"],
-                )
-
-                payload = {
-                    "timestamp": timestamp_now,
-                    "localizacao": nome_setor,
-                    "temperatura": round(temp_local, 2),
-                    "humidade": clima["hum_base"],
-                    "gases_ppm": gases_ia,
-                    "pm25": pm25_ia,
-                    "latitude": dados_setor["coords"]["lat"],
-                    "longitude": dados_setor["coords"]["lon"],
-                    "origem_dado": "AI_RandomForest_V4",
-                }
-
-                novos_dados.append(payload)
-
-                # Visualização de Debug (Escala US EPA)
-                if pm25_ia < 12:
-                    estado = "🟢 BOM"
-                elif pm25_ia < 35:
-                    estado = "🟡 MODERADO"
-                elif pm25_ia < 55:
-                    estado = "🟠 RUIM (Sensíveis)"
-                else:
-                    estado = "🔴 RUIM (Todos)"
-
-                print(f"   > {nome_setor:<25} | PM2.5: {pm25_ia:>5.1f} | {estado}")
-
-            if novos_dados:
-                collection.insert_many(novos_dados)
-                print("💾 Dados salvos.")
-
-            print("⏳ Aguardando...")
-            time.sleep(INTERVALO_LEITURA)
+    # Ticks em taxa fixa: o tempo de coleta não desloca a cadência das leituras
+    agendador = AdaptiveScheduler(
+        lambda: coletar_leituras(ai_engine, collection),
+        base_interval=INTERVALO_LEITURA,
+        name="simulador",
+    )
 
+    try:
+        agendador.run_forever()
     except KeyboardInterrupt:
         print("\n🛑 Fim.")
 
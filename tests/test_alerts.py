@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "analytics"))
+from alerts import CRITICAL, ELEVATED, NORMAL, RECOVERING, next_state  # noqa: E402
+
+CFG = {
+    "ELEVATED_ENTER": 75.0,
+    "ELEVATED_EXIT": 60.0,
+    "CRITICAL_ENTER": 100.0,
+    "CRITICAL_EXIT": 85.0,
+    "RECOVERY_READINGS": 3,
+}
+
+
+def run(readings, state=NORMAL, calm=0):
+    states = []
+    for carga in readings:
+        state, calm = next_state(state, carga, calm, CFG)
+        states.append(state)
+    return states
+
+
+def test_hysteresis_between_normal_and_elevated():
+    assert run([74, 75, 65, 61, 59]) == [NORMAL, ELEVATED, ELEVATED, ELEVATED, NORMAL]
+
+
+def test_critical_recovers_after_consecutive_calm_readings():
+    assert run([105, 90, 84, 50, 50, 61, 50, 50, 50]) == [
+        CRITICAL, CRITICAL, RECOVERING, RECOVERING, RECOVERING,
+        RECOVERING, RECOVERING, RECOVERING, NORMAL,
+    ]
+
+
+def test_recovering_settles_in_elevated_band():
+    # Steady 70 after a critical episode is elevated, not "recovering" forever
+    assert run([105, 84, 70, 70, 70, 70, 70])[-1] == ELEVATED
+    assert run([105, 84, 70, 70, 70, 70, 70, 90, 95, 99])[-1] == ELEVATED
+
+
+def test_recovering_back_to_elevated_entry():
+    assert run([105, 84, 80]) == [CRITICAL, RECOVERING, ELEVATED]
+    assert run([105, 84, 100]) == [CRITICAL, RECOVERING, CRITICAL]
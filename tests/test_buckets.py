@@ -0,0 +1,82 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import mongomock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from common import buckets  # noqa: E402
+
+SECTORS = ["Setor Central", "Setor Bueno", "Setor Jaó"]
+NOW = datetime(2024, 5, 10, 12, 0)
+
+
+def readings(count):
+    """One reading every 5 minutes going back from NOW, round-robin over the sectors."""
+    return [
+        {
+            "timestamp": NOW - timedelta(minutes=5 * i),
+            "localizacao": SECTORS[i % len(SECTORS)],
+            "temperatura": 25.0 + i % 7,
+            "humidade": 50.0,
+            "gases_ppm": 100.0 + i,
+            "pm25": float(i % 80),
+            "latitude": -16.68,
+            "longitude": -49.25,
+            "origem_dado": "teste",
+        }
+        for i in range(count)
+    ]
+
+
+def writer(monkeypatch, max_readings):
+    monkeypatch.setitem(buckets.BUCKET_CONFIG, "MAX_READINGS", max_readings)
+    coll = mongomock.MongoClient().db["raw_buckets"]
+    return buckets.BucketWriter("raw", coll=coll), coll
+
+
+def test_append_never_overfills_a_bucket(monkeypatch):
+    w, coll = writer(monkeypatch, 10)
+    # all in the same sector and period
+    docs = [
+        dict(d, localizacao="Setor Central", timestamp=NOW + timedelta(seconds=i)) for i, d in enumerate(readings(12))
+    ]
+    w.append(docs[:9])
+    # 9 + 3 would pass a plain "n < max" filter; the slice must open a new bucket
+    w.append(docs[9:])
+    sizes = sorted(b["n"] for b in coll.find())
+    assert sizes == [3, 9]
+    assert all(len(b["t"]) == b["n"] for b in coll.find())
+
+    # a group larger than a bucket is split into bucket-sized slices
+    w, coll = writer(monkeypatch, 10)
+    w.append([dict(d, localizacao="Setor Central", timestamp=NOW) for d in readings(25)])
+    assert sorted(b["n"] for b in coll.find()) == [5, 10, 10]
+
+
+def test_round_trip_unpack_latest_and_count(monkeypatch):
+    w, coll = writer(monkeypatch, 10)
+    docs = readings(90)
+    for i in range(0, len(docs), 7):
+        w.append([dict(d) for d in docs[i : i + 7]])
+    assert max(b["n"] for b in coll.find()) <= 10
+
+    df = buckets.unpack(coll.find(), "raw", with_ids=True)
+    assert len(df) == len(docs)
+    assert df["_id"].is_unique
+    assert set(df["timestamp"]) == {d["timestamp"] for d in docs}
+    row = df[df["timestamp"] == NOW].iloc[0]
+    assert row["localizacao"] == SECTORS[0]
+    assert row["gases_ppm"] == 100.0
+    assert row["origem_dado"] == "teste"
+
+    chunks = list(buckets.iter_latest(coll, "raw", chunk_size=20, limit=50))
+    assert [len(c) for c in chunks] == [20, 20, 10]
+    latest = [ts for c in chunks for ts in c["timestamp"]]
+    assert latest == sorted(latest, reverse=True)
+    assert latest == sorted((d["timestamp"] for d in docs), reverse=True)[:50]
+
+    since = NOW - timedelta(hours=2)
+    assert buckets.count_since(coll, since=since) == sum(d["timestamp"] > since for d in docs)
+    assert buckets.count_since(coll) == len(docs)
+    assert buckets.count_since(coll, {"localizacao": SECTORS[1]}) == len(docs) // len(SECTORS)
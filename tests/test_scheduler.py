@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from common.scheduler import AdaptiveScheduler  # noqa: E402
+
+
+class FakeIngest:
+    """Readings arrive at a steady `rate` per second; the job processes everything pending."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.pending = 0
+
+    def arrive(self, seconds):
+        self.pending += int(self.rate * seconds)
+
+    def backlog(self):
+        return self.pending
+
+    def job(self):
+        self.pending = 0
+
+
+def run_ticks(ingest, scheduler, ticks):
+    intervals = []
+    scheduled = 0.0
+    for _ in range(ticks):
+        ingest.arrive(scheduler.interval)
+        scheduler.tick(scheduled)
+        intervals.append(scheduler.interval)
+        scheduled += scheduler.interval
+    return intervals
+
+
+def test_interval_shrinks_under_steady_ingest():
+    # 60 readings/s keeps even the 10 s minimum interval above backlog_high
+    ingest = FakeIngest(rate=60)
+    scheduler = AdaptiveScheduler(
+        ingest.job, 60, min_interval=10, max_interval=300, backlog_fn=ingest.backlog, backlog_high=500
+    )
+    intervals = run_ticks(ingest, scheduler, 5)
+    assert intervals == [30, 15, 10, 10, 10]
+    assert scheduler.metrics["backlog"] > 0
+
+
+def test_interval_grows_when_idle():
+    ingest = FakeIngest(rate=0)
+    scheduler = AdaptiveScheduler(
+        ingest.job, 60, min_interval=10, max_interval=300, backlog_fn=ingest.backlog, backlog_high=500
+    )
+    assert run_ticks(ingest, scheduler, 5)[-1] == 300
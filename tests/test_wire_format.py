@@ -0,0 +1,57 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "ingestion"))
+from wire_format import (  # noqa: E402
+    HEADER,
+    MAGIC,
+    RECORD_DTYPE,
+    VERSION,
+    columns_to_documents,
+    decode_columns,
+    encode_readings,
+    parse_timestamp,
+)
+
+
+def reading(dispositivo):
+    return {
+        "timestamp": datetime(2025, 1, 1, 12, 0, 0),
+        "dispositivo": dispositivo,
+        "temperatura": 25.5,
+        "humidade": 60.0,
+        "gases_ppm": 410.0,
+        "pm25": 12.25,
+    }
+
+
+def test_round_trip():
+    docs = columns_to_documents(decode_columns(encode_readings([reading("esp32-01")])))
+    assert docs == [reading("esp32-01")]
+
+
+def test_multibyte_device_id_is_cut_on_a_character_boundary():
+    # 15 ASCII bytes + "ó" (2 bytes): a plain 16-byte cut would split the "ó"
+    payload = encode_readings([reading("abcdefghijklmnoó")])
+    docs = columns_to_documents(decode_columns(payload))
+    assert docs[0]["dispositivo"] == "abcdefghijklmno"
+    assert docs[0]["pm25"] == 12.25
+
+
+def test_invalid_utf8_from_another_encoder_does_not_drop_the_batch():
+    records = np.zeros(2, dtype=RECORD_DTYPE)
+    records["dispositivo"] = [b"abcdefghijklmno\xc3", b"ok"]
+    payload = HEADER.pack(MAGIC, VERSION, 0, 2) + records.tobytes()
+
+    docs = columns_to_documents(decode_columns(payload))
+    assert [doc["dispositivo"] for doc in docs] == ["abcdefghijklmno�", "ok"]
+
+
+def test_parse_timestamp_keeps_non_iso_values():
+    assert parse_timestamp("2026-10-19T10:00:00") == datetime(2026, 10, 19, 10, 0, 0)
+    assert parse_timestamp("19/10/2026 10:00") == "19/10/2026 10:00"
+    assert parse_timestamp("n/a") == "n/a"
+    assert parse_timestamp(1760868000) == 1760868000